@@ -0,0 +1,147 @@
+"""
+Benchmark of the parsing of the compiler output by the linter.
+
+Times `compiler_output.parse_output` against the regex the linter used
+before, on the output of a `mix compile` run:
+
+    mix compile --force > /tmp/compile.log 2>&1
+    python3 benchmarks/compiler_output.py --output /tmp/compile.log
+
+Without an output, a synthetic one is made of the errors and warnings of a
+Phoenix app, with `--warnings` warnings and errors whose stack trace has
+`--trace` lines, and `--unlocated` errors whose trace doesn't have the line
+in their file. A quarter of the warnings and one error have Windows paths,
+with a drive.
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'super_elixir'))
+
+from compiler_output import parse_output  # noqa
+
+
+BASELINE_REGEX = re.compile('|'.join(r'^(?:%s)' % part for part in (
+    r"== Compilation error on file (?P<e_file1>.+) ==\n"
+    r"\*\* \(.+?\) (?P=e_file1):(?P<e_line1>\d+): (?P<e_msg1>.+)",
+    r"== Compilation error on file (?P<e_file2>.+) ==\n"
+    r"\*\* \(.+?\) (?P<e_msg2>.+)\n"
+    r"(.+\n)*?"
+    r"    (?P=e_file2):(?P<e_line2>\d+)",
+    r"\*\* \(.+?\) (?P<e_file3>.+):(?P<e_line3>\d+): (?P<e_msg3>.+)",
+    r"(?P<w_file1>.+):(?P<w_line1>\d+): warning: (?P<w_msg1>.+)",
+    r"warning: (?P<w_msg2>.+)\n"
+    r"  (?P<w_file2>.+):(?P<w_line2>\d+)",
+)), re.MULTILINE)
+
+BASELINE_DUMMY_REGEX = re.compile(
+    r"(?P<filename>.+):(?P<line>\d+):"
+    r"(?:(?P<error>error)|(?P<warning>warning)):(?P<message>.+)"
+)
+
+
+def baseline(output):
+    """The regex and dummy string matching the linter did for each match"""
+    diagnostics = []
+    for match in BASELINE_REGEX.finditer(output):
+        captures = match.groupdict()
+        for kind, severity in (('e', 'error'), ('w', 'warning')):
+            for i in (1, 2, 3):
+                if captures.get('%s_file%s' % (kind, i)) is not None:
+                    dummy = '%s:%s:%s:%s' % (
+                        captures['%s_file%s' % (kind, i)],
+                        captures['%s_line%s' % (kind, i)],
+                        severity,
+                        captures['%s_msg%s' % (kind, i)],
+                    )
+        diagnostics.append(BASELINE_DUMMY_REGEX.match(dummy).groupdict())
+    return diagnostics
+
+
+def trace(lines, file=None, line=None):
+    frames = [
+        '    (ecto) lib/ecto/schema.ex:%s: Ecto.Schema.put_struct_field/3' % i
+        for i in range(lines)
+    ]
+    if file is not None:
+        frames.insert(lines // 2, '    %s:%s: (module)' % (file, line))
+    return '\n'.join(frames)
+
+
+def synthetic_output(warnings, trace_lines, unlocated):
+    parts = ['Compiling 120 files (.ex)']
+    for i in range(warnings):
+        # as compiled on Windows
+        drive = 'c:/app/' if i % 4 > 1 else ''
+        if i % 2:
+            parts.append('%sweb/views/view_%s.ex:%s: warning: variable "conn" '
+                         'is unused' % (drive, i, i))
+        else:
+            parts.append('warning: function helper/%s is unused\n'
+                         '  %sweb/models/model_%s.ex:%s\n'
+                         % (i % 4, drive, i, i))
+    for i in range(5):
+        parts.append(
+            '== Compilation error on file web/models/user_%s.ex ==\n'
+            '** (ArgumentError) field/association :roles is already set '
+            'on schema\n%s' % (i, trace(trace_lines, 'web/models/user_%s.ex'
+                                        % i, 20))
+        )
+    # errors whose trace never reaches the file
+    for i in range(unlocated):
+        parts.insert(1 + i * warnings // max(unlocated, 1), (
+            '== Compilation error on file web/user_socket_%s.ex ==\n'
+            '** (UndefinedFunctionError) undefined function: '
+            'MyApp.Web.channel/0\n%s' % (i, trace(trace_lines // 10))
+        ))
+    parts.append(
+        '** (CompileError) web/router.ex:19: undefined function get/2\n%s'
+        % trace(trace_lines, 'lib/kernel/parallel_compiler.ex', 117)
+    )
+    parts.append(
+        '== Compilation error on file c:/app/web/endpoint.ex ==\n'
+        '** (CompileError) c:/app/web/endpoint.ex:7: undefined function '
+        'plug/1'
+    )
+    return '\n'.join(parts) + '\n'
+
+
+def timeit(function, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--output', help='file with the output of mix compile')
+    parser.add_argument('--warnings', type=int, default=2000)
+    parser.add_argument('--trace', type=int, default=2000)
+    parser.add_argument('--unlocated', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    if args.output:
+        with open(args.output) as f:
+            output = f.read()
+    else:
+        output = synthetic_output(args.warnings, args.trace, args.unlocated)
+
+    print('%d lines, %d bytes' % (output.count('\n'), len(output)))
+    for name, parse in (('baseline regex', baseline),
+                        ('state machine', parse_output)):
+        found = len(parse(output))
+        print('%-28s %10.3f ms, %s diagnostics' % (
+            name, timeit(lambda: parse(output), args.repeat), found
+        ))
+
+
+if __name__ == '__main__':
+    main()
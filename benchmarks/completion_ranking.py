@@ -0,0 +1,89 @@
+"""
+Micro-benchmark of the ranking of completions as the user types.
+
+Builds a `CompletionIndex` of synthetic suggestions once, then times ranking
+them for each prefix of a few words, as each keystroke does:
+
+    python3 benchmarks/completion_ranking.py --candidates 5000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'super_elixir'))
+
+from ranking import CompletionIndex  # noqa
+
+
+WORDS = [
+    'get', 'put', 'map', 'flat', 'reduce', 'filter', 'split', 'join', 'to',
+    'from', 'list', 'string', 'update', 'fetch', 'with', 'index', 'take',
+    'drop', 'chunk', 'by', 'while', 'all', 'any', 'count', 'sort', 'uniq',
+]
+
+QUERIES = ['flat_map', 'fm', 'get_in', 'sort_by', 'xyz']
+
+
+def suggestions(count):
+    random.seed(0)
+    result = [{'type': 'hint', 'value': ''}]
+    kinds = ['function', 'macro', 'module', 'variable', 'public_function']
+    for i in range(count):
+        name = '_'.join(random.sample(WORDS, random.randint(1, 3)))
+        result.append({
+            'type': kinds[i % len(kinds)],
+            'name': name if i % 5 != 2 else name.title().replace('_', ''),
+            'arity': i % 3,
+            'args': 'term,opts',
+            'origin': 'Module%s' % (i % 50),
+        })
+    return result
+
+
+def build_row(suggestion, hint):
+    return ['%s\t%s' % (suggestion['name'], suggestion['type']),
+            suggestion['name']]
+
+
+def timeit(function, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--candidates', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    data = suggestions(args.candidates)
+    print('%-28s %10.3f ms' % ('index', timeit(
+        lambda: CompletionIndex(data, build_row), args.repeat
+    )))
+
+    for query in QUERIES:
+        def type_query():
+            index = CompletionIndex(data, build_row)
+            start = time.perf_counter()
+            for end in range(1, len(query) + 1):
+                index.rank(query[:end])
+            times.append((time.perf_counter() - start) / len(query))
+
+        times = []
+        for _ in range(args.repeat):
+            type_query()
+        matches = len(CompletionIndex(data, build_row).rank(query))
+        print('%-28s %10.3f ms per keystroke, %s matches' % (
+            'typing %r' % query, min(times) * 1000, matches
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""
+Time from spawning elixir_sense until it is ready to accept connections.
+
+Needs elixir in the PATH. Every run is done with an empty cache of compiled
+modules (cold) and with the cache filled by the first run (warm):
+
+    python3 benchmarks/elixir_sense_startup.py [project_path] [--repeat N]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUN_EXS = os.path.join(ROOT, 'elixir_sense', 'run.exs')
+
+
+def start_time(project_path, cache_dir):
+    env = dict(os.environ, ELIXIR_SENSE_CACHE=cache_dir)
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        ['elixir', RUN_EXS, 'unix', '0', 'dev'],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL, cwd=project_path, env=env,
+    )
+    line = proc.stdout.readline()
+    elapsed = time.perf_counter() - start
+    proc.stdin.close()
+    proc.wait()
+    if not line.startswith(b'ok:'):
+        raise RuntimeError('elixir_sense did not start: %r' % line)
+    return elapsed * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('project_path', nargs='?', default='.')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    cold, warm = [], []
+    for _ in range(args.repeat):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cold.append(start_time(args.project_path, cache_dir))
+            warm.append(start_time(args.project_path, cache_dir))
+
+    print('%-6s %10s %10s' % ('cache', 'min', 'median'))
+    for name, times in (('cold', cold), ('warm', warm)):
+        print('%-6s %7.0f ms %7.0f ms' % (
+            name, min(times), statistics.median(times)
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+"""
+Micro-benchmark of `erlang.binary_to_term` on elixir_sense responses.
+
+Record the responses of a running elixir_sense (needs elixir in the PATH):
+
+    python3 benchmarks/erlang_decode.py record /tmp/payloads [project_path]
+
+Then time the decoder on them, optionally against another version of
+`erlang.py` (e.g. `git show <rev>:super_elixir/erlang.py > /tmp/old.py`):
+
+    python3 benchmarks/erlang_decode.py run /tmp/payloads --baseline /tmp/old.py
+
+Without a payloads directory, synthetic responses shaped like the ones of
+`suggestions` and `all_modules` are used.
+"""
+import argparse
+import glob
+import importlib.util
+import os
+import re
+import socket
+import struct
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'super_elixir'))
+
+import erlang  # noqa
+
+
+REQUESTS = {
+    'suggestions_empty': ('suggestions', {
+        'buffer': 'defmodule A do\n  \nend', 'line': 2, 'column': 3,
+    }),
+    'suggestions_kernel': ('suggestions', {
+        'buffer': 'Kernel.', 'line': 1, 'column': 8,
+    }),
+    'suggestions_enum': ('suggestions', {
+        'buffer': 'Enum.', 'line': 1, 'column': 6,
+    }),
+    'docs_enum_map': ('docs', {
+        'buffer': 'Enum.map', 'line': 1, 'column': 6,
+    }),
+    'expand_full': ('expand_full', {
+        'buffer': '', 'line': 1,
+        'selected_code': 'defmodule A do\n  use GenServer\nend',
+    }),
+    'all_modules': ('all_modules', {}),
+}
+
+
+def record(directory, project_path):
+    proc = subprocess.Popen(
+        ['elixir', os.path.join(ROOT, 'elixir_sense', 'run.exs'),
+         'unix', '0', 'dev'],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, cwd=project_path,
+    )
+    socket_path = re.match(
+        rb'ok:localhost:(.+)\n', proc.stdout.readline()
+    ).group(1)
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.connect(socket_path)
+
+    def recv_exactly(length):
+        data = b''
+        while len(data) < length:
+            data += sock.recv(length - len(data))
+        return data
+
+    os.makedirs(directory, exist_ok=True)
+    for request_id, (name, (request, payload)) in enumerate(
+            sorted(REQUESTS.items()), 1):
+        data = erlang.term_to_binary({
+            'request_id': request_id,
+            'auth_token': None,
+            'request': request,
+            'payload': payload,
+        })
+        sock.sendall(struct.pack('!I', len(data)) + data)
+        (length,) = struct.unpack('!I', recv_exactly(4))
+        with open(os.path.join(directory, name + '.etf'), 'wb') as f:
+            f.write(recv_exactly(length))
+        print('recorded', name, length, 'bytes')
+
+    sock.close()
+    proc.terminate()
+
+
+def synthetic_payloads():
+    atom = erlang.OtpErlangAtom
+
+    def response(payload):
+        return erlang.term_to_binary({
+            atom(b'request_id'): 1,
+            atom(b'payload'): payload,
+            atom(b'error'): None,
+        })
+
+    functions = [{atom(b'type'): atom(b'hint'), atom(b'value'): 'Kernel.'}]
+    for i in range(3000):
+        functions.append({
+            atom(b'type'): 'function',
+            atom(b'name'): 'function_%s' % i,
+            atom(b'arity'): i % 4,
+            atom(b'args'): 'term,opts',
+            atom(b'origin'): 'Kernel',
+            atom(b'spec'): '@spec function(term, keyword) :: term',
+            atom(b'summary'): 'Returns the result of applying the function.',
+        })
+    modules = ['Module%s.Submodule%s' % (i, i % 7) for i in range(5000)]
+
+    return {
+        'suggestions (synthetic)': response(functions),
+        'all_modules (synthetic)': response(modules),
+    }
+
+
+def timeit(function, data, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(data)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def run(directory, baseline, repeat):
+    if directory:
+        payloads = {}
+        for path in sorted(glob.glob(os.path.join(directory, '*.etf'))):
+            with open(path, 'rb') as f:
+                payloads[os.path.basename(path)] = f.read()
+    else:
+        payloads = synthetic_payloads()
+
+    decoders = [
+        ('binary_to_term', erlang.binary_to_term),
+        ('native', lambda data: erlang.binary_to_term(data, native=True)),
+    ]
+    if baseline:
+        spec = importlib.util.spec_from_file_location('baseline', baseline)
+        old = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(old)
+        decoders.insert(0, ('baseline', old.binary_to_term))
+
+    print('%-28s %10s' % ('payload', 'bytes') + ''.join(
+        '%16s' % name for name, _ in decoders
+    ))
+    for name, data in sorted(payloads.items()):
+        times = [timeit(decode, data, repeat) for _, decode in decoders]
+        print('%-28s %10s' % (name, len(data)) + ''.join(
+            '%13.2f ms' % t for t in times
+        ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    commands = parser.add_subparsers(dest='command')
+
+    record_parser = commands.add_parser('record')
+    record_parser.add_argument('directory')
+    record_parser.add_argument('project_path', nargs='?', default='.')
+
+    run_parser = commands.add_parser('run')
+    run_parser.add_argument('directory', nargs='?')
+    run_parser.add_argument('--baseline')
+    run_parser.add_argument('--repeat', type=int, default=20)
+
+    args = parser.parse_args()
+    if args.command == 'record':
+        record(args.directory, args.project_path)
+    else:
+        run(getattr(args, 'directory', None), getattr(args, 'baseline', None),
+            getattr(args, 'repeat', 20))
+
+
+if __name__ == '__main__':
+    main()
@@ -4,6 +4,7 @@ defmodule Alchemist.Helpers.Complete do
 
   alias Alchemist.Helpers.ModuleInfo
   alias ElixirSense.Core.Introspection
+  alias ElixirSense.Core.ModuleIndex
 
   @moduledoc false
 
@@ -263,15 +264,19 @@ defmodule Alchemist.Helpers.Complete do
     for mod <- match_modules(base, module === Elixir),
     parts = String.split(mod, "."),
     depth <= length(parts) do
-      mod_as_atom = mod |> String.to_atom
-      desc = Introspection.get_module_docs_summary(mod_as_atom)
-      subtype = Introspection.get_module_subtype(mod_as_atom)
+      {desc, subtype} = mod |> String.to_atom |> module_summary_and_subtype()
       %{kind: :module, type: :elixir, name: Enum.at(parts, depth - 1),
         desc: desc, subtype: subtype}
     end
     |> Enum.uniq_by(fn %{name: name} -> name end)
   end
 
+  defp module_summary_and_subtype(module) do
+    ModuleIndex.fetch(:summary_and_subtype, module, fn ->
+      {Introspection.get_module_docs_summary(module), Introspection.get_module_subtype(module)}
+    end)
+  end
+
   ## Helpers
 
    defp normalize_module(mod) do
@@ -284,12 +289,15 @@ defmodule Alchemist.Helpers.Complete do
 
   defp match_modules(hint, root) do
     root
-    |> get_modules()
-    |> :lists.usort()
+    |> sorted_modules()
     |> Enum.drop_while(& not starts_with?(&1, hint))
     |> Enum.take_while(& starts_with?(&1, hint))
   end
 
+  defp sorted_modules(root) do
+    ModuleIndex.modules(root, fn -> root |> get_modules() |> :lists.usort() end)
+  end
+
   defp get_modules(true) do
     ["Elixir.Elixir"] ++ get_modules(false)
   end
@@ -322,25 +330,35 @@ defmodule Alchemist.Helpers.Complete do
   defp match_module_funs(mod, hint) do
     case ensure_loaded(mod) do
       {:module, _} ->
-        falist = get_module_funs(mod)
+        for {name, arities, func_kind, docs, specs} <- indexed_module_funs(mod),
+        starts_with?(name, hint) do
+          %{kind: :function, name: name, arities: arities, module: mod,
+            func_kind: func_kind, docs: docs, specs: specs}
+        end |> :lists.sort()
+
+      _otherwise -> []
+    end
+  end
+
+  # The functions of the module grouped by name, with the arguments and
+  # summary already extracted from the docs
+  defp indexed_module_funs(mod) do
+    ModuleIndex.fetch(:funs, mod, fn ->
+      falist = get_module_funs(mod)
 
       list = Enum.reduce falist, [], fn {f, a, func_kind, doc, spec}, acc ->
+        args_desc = Introspection.extract_fun_args_and_desc(doc)
         case :lists.keyfind(f, 1, acc) do
           {f, aa, func_kind, docs, specs} ->
-            :lists.keyreplace(f, 1, acc, {f, [a|aa], func_kind, [doc|docs], [spec|specs]})
-          false -> [{f, [a], func_kind, [doc], [spec]}|acc]
+            :lists.keyreplace(f, 1, acc, {f, [a|aa], func_kind, [args_desc|docs], [spec|specs]})
+          false -> [{f, [a], func_kind, [args_desc], [spec]}|acc]
         end
       end
 
-      for {fun, arities, func_kind, docs, specs} <- list,
-      name = Atom.to_string(fun),
-      starts_with?(name, hint) do
-        %{kind: :function, name: name, arities: arities, module: mod,
-          func_kind: func_kind, docs: docs, specs: specs}
-      end |> :lists.sort()
-
-      _otherwise -> []
-    end
+      for {fun, arities, func_kind, docs, specs} <- list do
+        {Atom.to_string(fun), arities, func_kind, docs, specs}
+      end
+    end)
   end
 
   defp get_module_funs(mod) do
@@ -391,8 +409,7 @@ defmodule Alchemist.Helpers.Complete do
     docs_specs = docs |> Enum.zip(specs)
     arities_docs_specs = arities |> Enum.zip(docs_specs)
 
-    for {a, {doc, spec}} <- arities_docs_specs do
-      {fun_args, desc} = Introspection.extract_fun_args_and_desc(doc)
+    for {a, {{fun_args, desc}, spec}} <- arities_docs_specs do
       kind = case func_kind do
         :defmacro -> "macro"
         _         -> "function"
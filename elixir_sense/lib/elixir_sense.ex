@@ -18,9 +18,11 @@ defmodule ElixirSense do
   alias ElixirSense.Providers.Signature
   alias ElixirSense.Providers.Expand
   alias ElixirSense.Providers.Eval
+  alias ElixirSense.Providers.Diagnostics
 
   @doc ~S"""
-  Returns all documentation related a module or function, including types and callback information.
+  Returns all documentation related a module or function, including types and callback information,
+  and the symbol the subject resolved to.
 
   ## Example
 
@@ -35,8 +37,10 @@ defmodule ElixirSense do
       "Converts `enumerable` to a list."
       iex> types |> String.split("\n") |> Enum.at(0)
       "  `@type t :: Enumerable.t"
+      iex> ElixirSense.docs(code, 3, 11).symbol
+      %{module: Enum, function: :to_list}
   """
-  @spec docs(String.t, pos_integer, pos_integer) :: %{subject: String.t, actual_subject: String.t, docs: Introspection.docs}
+  @spec docs(String.t, pos_integer, pos_integer) :: %{subject: String.t, actual_subject: String.t, docs: Introspection.docs, symbol: Docs.symbol}
   def docs(code, line, column) do
     subject = Source.subject(code, line, column)
     metadata = Parser.parse_string(code, true, true, line)
@@ -46,8 +50,8 @@ defmodule ElixirSense do
       module: module
     } = Metadata.get_env(metadata, line)
 
-    {actual_subject, docs} = Docs.all(subject, imports, aliases, module)
-    %{subject: subject, actual_subject: actual_subject, docs: docs}
+    {actual_subject, docs, symbol} = Docs.all(subject, imports, aliases, module)
+    %{subject: subject, actual_subject: actual_subject, docs: docs, symbol: symbol}
   end
 
   @doc ~S"""
@@ -147,6 +151,29 @@ defmodule ElixirSense do
     Suggestion.find(hint, [module|imports], aliases, vars, attributes, behaviours, scope)
   end
 
+  @doc """
+  Like `suggestions/3`, but ranks the suggestions and keeps the hint and the best
+  `max_results` of the others. See `ElixirSense.Providers.Suggestion.top/4`.
+
+  ## Example
+
+      iex> code = ~S'''
+      ...> defmodule MyModule do
+      ...>   List.fi
+      ...> end
+      ...> '''
+      iex> %{suggestions: [hint, first], truncated: false} = ElixirSense.top_suggestions(code, 2, 10, :relevance, 5)
+      iex> {hint.value, first.name}
+      {"List.first", "first"}
+  """
+  @spec top_suggestions(String.t, non_neg_integer, non_neg_integer, Suggestion.ranking, non_neg_integer) :: %{suggestions: [Suggestion.suggestion], truncated: boolean}
+  def top_suggestions(buffer, line, column, ranking, max_results) do
+    hint = Source.prefix(buffer, line, column)
+    buffer
+    |> suggestions(line, column)
+    |> Suggestion.top(hint, ranking, max_results)
+  end
+
   @doc """
   Returns the signature info from the function when inside a function call.
 
@@ -272,6 +299,26 @@ defmodule ElixirSense do
     Expand.expand_full(code, requires, imports, module)
   end
 
+  @doc ~S"""
+  Returns the errors and warnings of compiling a buffer as the file `file`, without
+  replacing the compiled modules of the project. `.exs` files are only parsed.
+
+  ## Example
+
+      iex> code = ~S'''
+      ...> defmodule MyModule do
+      ...>   def run(list), do: :ok
+      ...> end
+      ...> '''
+      iex> [%{severity: :warning, line: 2, message: message}] = ElixirSense.diagnostics(code, "lib/my_module.ex")
+      iex> message
+      "variable \"list\" is unused"
+  """
+  @spec diagnostics(String.t, String.t) :: [Diagnostics.diagnostic]
+  def diagnostics(buffer, file) do
+    Diagnostics.find(buffer, file)
+  end
+
   @doc """
   Converts a string to its quoted form.
   """
@@ -9,6 +9,7 @@ defmodule ElixirSense.Core.Introspection do
 
   alias Kernel.Typespec
   alias Alchemist.Helpers.ModuleInfo
+  alias ElixirSense.Core.ModuleIndex
 
   @type mod_fun :: {mod :: module | nil, fun :: atom | nil}
   @type markdown :: String.t
@@ -475,13 +476,15 @@ defmodule ElixirSense.Core.Introspection do
   end
 
   def module_functions_info(module) do
-    docs = Code.get_docs(module, :docs) || []
-    specs = get_module_specs(module)
-    for {{f, a}, _line, func_kind, _sign, doc} = func_doc <- docs, doc != false, into: %{} do
-      spec = Map.get(specs, {f, a}, "")
-      {fun_args, desc} = extract_fun_args_and_desc(func_doc)
-      {{f, a}, {func_kind, fun_args, desc, spec}}
-    end
+    ModuleIndex.fetch(:functions_info, module, fn ->
+      docs = Code.get_docs(module, :docs) || []
+      specs = get_module_specs(module)
+      for {{f, a}, _line, func_kind, _sign, doc} = func_doc <- docs, doc != false, into: %{} do
+        spec = Map.get(specs, {f, a}, "")
+        {fun_args, desc} = extract_fun_args_and_desc(func_doc)
+        {{f, a}, {func_kind, fun_args, desc, spec}}
+      end
+    end)
   end
 
   def get_callback_ast(module, callback, arity) do
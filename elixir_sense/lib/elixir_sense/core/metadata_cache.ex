@@ -0,0 +1,91 @@
+defmodule ElixirSense.Core.MetadataCache do
+  @moduledoc """
+  Bounded LRU cache of the metadata built by `ElixirSense.Core.Parser`, so
+  requests on the same buffer share the parsing.
+
+  It also keeps the last metadata of each file that parsed without errors,
+  to fall back on while the file is being edited and does not parse.
+
+  The cache lives in public ETS tables owned by this process, when it is
+  not started every lookup is a miss.
+  """
+  use GenServer
+
+  alias ElixirSense.Core.Metadata
+
+  @table :elixir_sense_metadata_cache
+  @last_good_table :elixir_sense_last_good_metadata
+  @max_entries 32
+
+  def start_link do
+    GenServer.start_link(__MODULE__, nil, [name: __MODULE__])
+  end
+
+  def init(nil) do
+    :ets.new(@table, [:named_table, :public, :set, read_concurrency: true])
+    :ets.new(@last_good_table, [:named_table, :public, :set, read_concurrency: true])
+    {:ok, nil}
+  end
+
+  @doc """
+  Returns the metadata cached under `key`, or builds it with `fun` and caches it.
+  """
+  @spec fetch(term, (() -> %Metadata{})) :: %Metadata{}
+  def fetch(key, fun) do
+    if started?() do
+      case :ets.lookup(@table, key) do
+        [{^key, metadata, _}] ->
+          :ets.update_element(@table, key, {3, access()})
+          metadata
+        [] ->
+          metadata = fun.()
+          :ets.insert(@table, {key, metadata, access()})
+          evict()
+          metadata
+      end
+    else
+      fun.()
+    end
+  end
+
+  @spec put_last_good(String.t, %Metadata{}) :: boolean
+  def put_last_good(file_id, %Metadata{error: nil} = metadata) do
+    started?() and :ets.insert(@last_good_table, {file_id, metadata})
+  end
+
+  @spec last_good(String.t) :: %Metadata{} | nil
+  def last_good(file_id) do
+    with true <- started?(),
+         [{^file_id, metadata}] <- :ets.lookup(@last_good_table, file_id) do
+      metadata
+    else
+      _ -> nil
+    end
+  end
+
+  @spec forget(String.t) :: boolean
+  def forget(file_id) do
+    started?() and :ets.delete(@last_good_table, file_id)
+  end
+
+  defp started? do
+    :ets.info(@table, :size) != :undefined
+  end
+
+  defp access do
+    :erlang.unique_integer([:monotonic])
+  end
+
+  defp evict do
+    if :ets.info(@table, :size) > @max_entries do
+      {key, _} =
+        :ets.foldl(fn
+          {key, _, access}, {_, oldest} when access < oldest -> {key, access}
+          _, acc -> acc
+        end, {nil, access()}, @table)
+      :ets.delete(@table, key)
+      evict()
+    end
+  end
+
+end
@@ -0,0 +1,95 @@
+defmodule ElixirSense.Core.ModuleIndex do
+  @moduledoc """
+  Index of what completions need to know about modules: their functions with
+  arities, arguments, specs and summaries, their summary and subtype, and the
+  sorted list of all the available modules.
+
+  Entries are built lazily and live in a public ETS table owned by this
+  process. The entries of a module are dropped when the `ContextLoader`
+  reloads it, and the list of modules whenever anything is reloaded. When the
+  index is not started every lookup is a miss.
+  """
+  use GenServer
+
+  @table :elixir_sense_module_index
+
+  def start_link do
+    GenServer.start_link(__MODULE__, nil, [name: __MODULE__])
+  end
+
+  def init(nil) do
+    :ets.new(@table, [:named_table, :public, :ordered_set, read_concurrency: true])
+    {:ok, nil}
+  end
+
+  @doc """
+  Returns the entry `kind` of `module`, building it with `fun` if needed.
+  """
+  @spec fetch(atom, module, (() -> term)) :: term
+  def fetch(kind, module, fun) do
+    case lookup({module, kind}) do
+      {:ok, value} ->
+        value
+      :error ->
+        value = fun.()
+        insert({module, kind}, value)
+        value
+    end
+  end
+
+  @doc """
+  Returns the sorted names of the available modules, `fun` builds them.
+
+  The list is built again when modules are loaded or reloaded.
+  """
+  @spec modules(term, (() -> [String.t])) :: [String.t]
+  def modules(key, fun) do
+    loaded = length(:erlang.loaded())
+    case lookup({:modules, key}) do
+      {:ok, {^loaded, modules}} ->
+        modules
+      _ ->
+        modules = fun.()
+        insert({:modules, key}, {loaded, modules})
+        modules
+    end
+  end
+
+  # Entries are keyed by `{module, kind}` in an ordered set, so the ones of a
+  # module are deleted without scanning the whole table
+  @spec invalidate(module) :: :ok
+  def invalidate(module) do
+    if started?() do
+      :ets.match_delete(@table, {{module, :_}, :_})
+    end
+    :ok
+  end
+
+  @spec invalidate_modules() :: :ok
+  def invalidate_modules do
+    if started?() do
+      :ets.match_delete(@table, {{:modules, :_}, :_})
+    end
+    :ok
+  end
+
+  defp lookup(key) do
+    if started?() do
+      case :ets.lookup(@table, key) do
+        [{^key, value}] -> {:ok, value}
+        [] -> :error
+      end
+    else
+      :error
+    end
+  end
+
+  defp insert(key, value) do
+    started?() and :ets.insert(@table, {key, value})
+  end
+
+  defp started? do
+    :ets.info(@table, :size) != :undefined
+  end
+
+end
@@ -5,41 +5,117 @@ defmodule ElixirSense.Core.Parser do
 
   alias ElixirSense.Core.MetadataBuilder
   alias ElixirSense.Core.Metadata
+  alias ElixirSense.Core.MetadataCache
+
+  @file_key :elixir_sense_parser_file_id
 
   def parse_file(file, try_to_fix_parse_error, try_to_fix_line_not_found, cursor_line_number) do
     case File.read(file) do
       {:ok, source} ->
-        parse_string(source, try_to_fix_parse_error, try_to_fix_line_not_found, cursor_line_number)
+        parse_source(source, try_to_fix_parse_error, try_to_fix_line_not_found, cursor_line_number)
       error -> error
     end
   end
 
+  @doc """
+  Parses the source and builds its metadata.
+
+  The metadata is cached by the content of the source, and by the cursor line
+  as well when the source had to be fixed to be parsed. When the source can't
+  be parsed, within `with_file/2`, the last metadata of the file that could
+  be parsed is returned instead.
+  """
   def parse_string(source, try_to_fix_parse_error, try_to_fix_line_not_found, cursor_line_number) do
-    case string_to_ast(source, try_to_fix_parse_error, cursor_line_number) do
-      {:ok, ast} ->
-        acc = MetadataBuilder.build(ast)
-        if Map.has_key?(acc.lines_to_env, cursor_line_number) or !try_to_fix_line_not_found  do
-          %Metadata{
-            source: source,
-            mods_funs_to_lines: acc.mods_funs_to_lines,
-            lines_to_env: acc.lines_to_env
-          }
+    source
+    |> parse_source(try_to_fix_parse_error, try_to_fix_line_not_found, cursor_line_number)
+    |> with_last_good(Process.get(@file_key))
+  end
+
+  @doc """
+  Runs `fun` with `file_id` as the file of the sources parsed by it.
+  """
+  def with_file(file_id, fun) do
+    previous_file_id = Process.put(@file_key, file_id)
+    try do
+      fun.()
+    after
+      Process.put(@file_key, previous_file_id)
+    end
+  end
+
+  defp parse_source(source, try_to_fix_parse_error, try_to_fix_line_not_found, cursor_line_number) do
+    hash = :erlang.md5(source)
+    metadata = MetadataCache.fetch(hash, fn ->
+      build_metadata(source, Code.string_to_quoted(source))
+    end)
+
+    cond do
+      metadata.error != nil and !try_to_fix_parse_error ->
+        metadata
+      metadata.error == nil and (!try_to_fix_line_not_found or Map.has_key?(metadata.lines_to_env, cursor_line_number)) ->
+        metadata
+      true ->
+        key = {hash, cursor_line_number, try_to_fix_parse_error, try_to_fix_line_not_found}
+        MetadataCache.fetch(key, fn ->
+          fix_metadata(metadata, try_to_fix_parse_error, try_to_fix_line_not_found, cursor_line_number)
+        end)
+    end
+  end
+
+  defp with_last_good(metadata, nil) do
+    metadata
+  end
+
+  defp with_last_good(%Metadata{error: nil} = metadata, file_id) do
+    MetadataCache.put_last_good(file_id, metadata)
+    metadata
+  end
+
+  defp with_last_good(metadata, file_id) do
+    MetadataCache.last_good(file_id) || metadata
+  end
+
+  defp fix_metadata(%Metadata{source: source, error: nil}, _, _, cursor_line_number) do
+    # IO.puts :stderr, "LINE NOT FOUND"
+    fixed_source = fix_line_not_found(source, cursor_line_number)
+    build_metadata(fixed_source, Code.string_to_quoted(fixed_source))
+  end
+
+  defp fix_metadata(%Metadata{source: source, error: error}, true, try_to_fix_line_not_found, cursor_line_number) do
+    ast = source
+    |> fix_parse_error(cursor_line_number, {:error, error})
+    |> string_to_ast(false, cursor_line_number)
+
+    case build_metadata(source, ast) do
+      %Metadata{error: nil, lines_to_env: lines_to_env} = metadata ->
+        if Map.has_key?(lines_to_env, cursor_line_number) or !try_to_fix_line_not_found do
+          metadata
         else
-          # IO.puts :stderr, "LINE NOT FOUND"
-          source
-          |> fix_line_not_found(cursor_line_number)
-          |> parse_string(false, false, cursor_line_number)
+          fix_metadata(metadata, false, false, cursor_line_number)
         end
-      {:error, error} ->
-        # IO.puts :stderr, "CAN'T FIX IT"
-        # IO.inspect :stderr, error, []
-        %Metadata{
-          source: source,
-          error: error
-        }
+      metadata ->
+        metadata
     end
   end
 
+  defp build_metadata(source, {:ok, ast}) do
+    acc = MetadataBuilder.build(ast)
+    %Metadata{
+      source: source,
+      mods_funs_to_lines: acc.mods_funs_to_lines,
+      lines_to_env: acc.lines_to_env
+    }
+  end
+
+  defp build_metadata(source, {:error, error}) do
+    # IO.puts :stderr, "CAN'T FIX IT"
+    # IO.inspect :stderr, error, []
+    %Metadata{
+      source: source,
+      error: error
+    }
+  end
+
   defp string_to_ast(source, try_to_fix_parse_error, cursor_line_number) do
     case Code.string_to_quoted(source) do
       {:ok, ast} ->
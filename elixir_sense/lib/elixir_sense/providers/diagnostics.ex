@@ -0,0 +1,184 @@
+defmodule ElixirSense.Providers.Diagnostics do
+
+  @moduledoc """
+  Provider responsible for the errors and warnings of a buffer.
+
+  `.exs` buffers are only parsed, as compiling a script runs it. Other
+  buffers are compiled, then the modules they defined are deleted and loaded
+  again from the code path, so the project keeps its compiled version.
+  Compilations run one at a time.
+
+  Warnings are returned since Elixir 1.6, which gives them to the caller of
+  the parallel compiler. Before, the compiler only prints them to stderr.
+  The parallel compiler only compiles files, so the buffer is compiled from
+  a temporary file, where `__DIR__` and `__ENV__` are replaced to tell the
+  real file.
+  """
+
+  alias ElixirSense.Core.ModuleIndex
+
+  @type severity :: :error | :warning
+  @type diagnostic :: %{
+    file: String.t,
+    line: pos_integer | nil,
+    column: pos_integer | nil,
+    severity: severity,
+    message: String.t
+  }
+
+  @doc """
+  Returns the errors and warnings of compiling `buffer` as the file `file`.
+  """
+  @spec find(String.t, String.t) :: [diagnostic]
+  def find(buffer, file) do
+    case Code.string_to_quoted(buffer, file: file) do
+      {:ok, ast} ->
+        if Path.extname(file) == ".exs" do
+          []
+        else
+          :global.trans({__MODULE__, self()}, fn -> compile(buffer, file, ast) end, [node()])
+        end
+      {:error, {line, message, token}} ->
+        [diagnostic(file, line, :error, "#{format_message(message)}#{token}")]
+    end
+  end
+
+  defp compile(buffer, file, ast) do
+    options = Code.compiler_options()
+    Code.compiler_options(ignore_module_conflict: true)
+    try do
+      if Code.ensure_loaded?(Kernel.ParallelCompiler) and
+          function_exported?(Kernel.ParallelCompiler, :compile, 2) do
+        compile_file(buffer, file)
+      else
+        compile_string(buffer, file)
+      end
+    after
+      Code.compiler_options(options)
+      ast |> defined_modules(nil) |> Enum.each(&restore_module/1)
+    end
+  end
+
+  # Since Elixir 1.6 the parallel compiler returns the errors and warnings
+  # of the files, it needs the buffer in a file
+  defp compile_file(buffer, file) do
+    dir = Path.join(System.tmp_dir!(), "elixir_sense_diagnostics_#{System.unique_integer([:positive])}")
+    tmp_file = Path.join(dir, Path.basename(file))
+    File.mkdir_p!(dir)
+    try do
+      File.write!(tmp_file, locate_in(buffer, file))
+      {errors, warnings} =
+        case apply(Kernel.ParallelCompiler, :compile, [[tmp_file], []]) do
+          {:ok, _modules, warnings} -> {[], warnings}
+          {:error, errors, warnings} -> {errors, warnings}
+        end
+      Enum.map(warnings, &compiler_diagnostic(&1, :warning, tmp_file, file)) ++
+        Enum.map(errors, &compiler_diagnostic(&1, :error, tmp_file, file))
+    after
+      File.rm_rf(dir)
+    end
+  end
+
+  # Replaces `__DIR__` and `__ENV__` in `buffer` by the directory and the
+  # environment of `file`, so the code reading files next to it at compile
+  # time finds them. Lines are kept, to keep the lines of the diagnostics.
+  defp locate_in(buffer, file) do
+    if String.contains?(buffer, ["__DIR__", "__ENV__"]) do
+      {:ok, ast} = Code.string_to_quoted(buffer, file: file, columns: true)
+      {_ast, replacements} = Macro.prewalk(ast, [], &location_replacement(&1, &2, Path.expand(file)))
+      buffer
+      |> String.split("\n")
+      |> replace_at(Enum.sort(replacements, &>=/2))
+      |> Enum.join("\n")
+    else
+      buffer
+    end
+  end
+
+  defp location_replacement({name, meta, context} = node, replacements, file)
+      when name in [:__DIR__, :__ENV__] and is_atom(context) do
+    replacement =
+      case name do
+        :__DIR__ -> inspect(Path.dirname(file))
+        :__ENV__ -> "%{__ENV__ | file: #{inspect(file)}}"
+      end
+    if meta[:line] && meta[:column] do
+      {node, [{meta[:line], meta[:column], Atom.to_string(name), replacement} | replacements]}
+    else
+      {node, replacements}
+    end
+  end
+  defp location_replacement(node, replacements, _file), do: {node, replacements}
+
+  # the replacements of a line go from its end, so the columns of the
+  # others still hold
+  defp replace_at(lines, replacements) do
+    Enum.reduce(replacements, lines, fn {line, column, name, replacement}, lines ->
+      List.update_at(lines, line - 1, fn text ->
+        {before, rest} = String.split_at(text, column - 1)
+        if String.starts_with?(rest, name) do
+          before <> replacement <> String.replace_prefix(rest, name, "")
+        else
+          text
+        end
+      end)
+    end)
+  end
+
+  # Before, warnings are only printed to stderr
+  defp compile_string(buffer, file) do
+    Code.compile_string(buffer, file)
+    []
+  rescue
+    exception -> [exception_diagnostic(exception, System.stacktrace, file)]
+  end
+
+  defp compiler_diagnostic({diagnostic_file, line, message}, severity, tmp_file, file) do
+    message = message |> to_string() |> String.replace(tmp_file, file)
+    diagnostic_file = if diagnostic_file == tmp_file, do: file, else: diagnostic_file
+    %{diagnostic(file, line, severity, message) | file: diagnostic_file}
+  end
+
+  defp exception_diagnostic(%{file: error_file, line: line, description: description}, _stacktrace, file)
+      when error_file == file do
+    diagnostic(file, line, :error, description)
+  end
+  defp exception_diagnostic(exception, stacktrace, file) do
+    line = Enum.find_value(stacktrace, fn {_m, _f, _a, location} ->
+      to_string(location[:file]) == file && location[:line]
+    end)
+    diagnostic(file, line, :error, Exception.message(exception))
+  end
+
+  defp diagnostic(file, line, severity, message) do
+    line = if is_integer(line) and line > 0, do: line, else: nil
+    %{file: file, line: line, column: nil, severity: severity, message: String.trim(message)}
+  end
+
+  defp format_message({prefix, suffix}), do: "#{prefix}#{suffix}"
+  defp format_message(message), do: to_string(message)
+
+  defp defined_modules({:defmodule, _, [{:__aliases__, _, parts}, body]}, parent) do
+    module = Module.concat(List.wrap(parent) ++ parts)
+    [module | defined_modules(body, module)]
+  end
+  defp defined_modules({call, _, args}, parent) when is_list(args) do
+    defined_modules(call, parent) ++ defined_modules(args, parent)
+  end
+  defp defined_modules({left, right}, parent) do
+    defined_modules(left, parent) ++ defined_modules(right, parent)
+  end
+  defp defined_modules(list, parent) when is_list(list) do
+    Enum.flat_map(list, &defined_modules(&1, parent))
+  end
+  defp defined_modules(_ast, _parent), do: []
+
+  defp restore_module(module) do
+    :code.purge(module)
+    :code.delete(module)
+    :code.purge(module)
+    Code.ensure_loaded(module)
+    ModuleIndex.invalidate(module)
+  end
+
+end
@@ -4,13 +4,19 @@ defmodule ElixirSense.Providers.Docs do
   """
   alias ElixirSense.Core.Introspection
 
-  @spec all(String.t, [module], [{module, module}], module) :: {actual_mod_fun :: String.t, docs :: Introspection.docs}
+  @typedoc """
+  The module and function the subject resolved to. Docs cover every arity of
+  the function, so the symbol has none.
+  """
+  @type symbol :: %{module: module | nil, function: atom | nil}
+
+  @spec all(String.t, [module], [{module, module}], module) :: {actual_mod_fun :: String.t, docs :: Introspection.docs, symbol}
   def all(subject, imports, aliases, module) do
-    mod_fun =
+    {mod, fun} = mod_fun =
       subject
       |> Introspection.split_mod_fun_call
       |> Introspection.actual_mod_fun(imports, aliases, module)
-    {mod_fun_to_string(mod_fun), Introspection.get_all_docs(mod_fun)}
+    {mod_fun_to_string(mod_fun), Introspection.get_all_docs(mod_fun), %{module: mod, function: fun}}
   end
 
   defp mod_fun_to_string({nil, fun}) do
@@ -59,6 +59,8 @@ defmodule ElixirSense.Providers.Suggestion do
     value: String.t
   }
 
+  @type ranking :: :none | :relevance
+
   @type suggestion :: attribute
                     | variable
                     | return
@@ -88,6 +90,52 @@ defmodule ElixirSense.Providers.Suggestion do
     |> Enum.uniq_by(&(&1))
   end
 
+  @doc """
+  Keeps the hint and the best `max_results` other suggestions.
+
+  With the `:none` ranking suggestions keep the order of `find/7`. With
+  `:relevance` the ones named like the hint come first, then the ones starting
+  with it; variables and attributes before callbacks and returns, those before
+  functions and macros, and modules last; then shorter names first. Also tells
+  whether suggestions were left out.
+  """
+  @spec top([suggestion], String.t, ranking, non_neg_integer) :: %{suggestions: [suggestion], truncated: boolean}
+  def top([hint_suggestion | suggestions], hint, ranking, max_results) do
+    ranked =
+      case ranking do
+        :none ->
+          suggestions
+        :relevance ->
+          prefix = hint |> String.split(".") |> List.last()
+          Enum.sort_by(suggestions, &relevance(&1, prefix))
+      end
+
+    %{
+      suggestions: [hint_suggestion | Enum.take(ranked, max_results)],
+      truncated: length(ranked) > max_results
+    }
+  end
+
+  defp relevance(suggestion, prefix) do
+    name = suggestion_name(suggestion)
+    {
+      if(name == prefix, do: 0, else: 1),
+      if(String.starts_with?(name, prefix), do: 0, else: 1),
+      kind_relevance(suggestion),
+      String.length(name),
+      name
+    }
+  end
+
+  defp suggestion_name(%{type: :return, description: description}), do: description
+  defp suggestion_name(%{name: name}), do: to_string(name)
+  defp suggestion_name(_), do: ""
+
+  defp kind_relevance(%{type: type}) when type in [:variable, :attribute], do: 0
+  defp kind_relevance(%{type: type}) when type in [:callback, :return], do: 1
+  defp kind_relevance(%{type: :module}), do: 3
+  defp kind_relevance(_function_or_macro), do: 2
+
   @spec find_hint_mods_funcs(String.t, [module], [{module, module}]) :: %{hint: hint, suggestions: [mod | func]}
   defp find_hint_mods_funcs(hint, imports, aliases) do
     Application.put_env(:"alchemist.el", :aliases, aliases)
@@ -1,17 +1,41 @@
 defmodule ElixirSense.Server.ContextLoader do
   @moduledoc """
   Server Context Loader
+
+  Keeps the `ebin` directories and applications under `_build/<env>/lib` of
+  the project loaded. They are polled for changes, and only the applications
+  and modules whose files changed are reloaded, so requests never wait for
+  a reload.
+
+  An `ebin` directory is only scanned when its own mtime, its `.app` file or
+  one of the Mix manifests of its application changed. Files modified in the
+  last second are checked again on the next poll, as mtimes have a
+  resolution of one second.
   """
   use GenServer
 
-  @minimal_reload_time 2000
+  alias ElixirSense.Core.ModuleIndex
+
+  @check_interval 1000
+
+  @type stats :: %{
+    checks: non_neg_integer,
+    last_check_time: non_neg_integer,
+    reloads: non_neg_integer,
+    reloaded_modules: non_neg_integer,
+    reloaded_apps: non_neg_integer,
+    last_reload_time: non_neg_integer,
+    max_reload_time: non_neg_integer,
+    total_reload_time: non_neg_integer
+  }
 
   def start_link(env) do
     GenServer.start_link(__MODULE__, env, [name: __MODULE__])
   end
 
   def init(env) do
-    {:ok, {all_loaded(), [], [], env, Path.expand("."), 0}}
+    send(self(), :check)
+    {:ok, %{env: env, cwd: Path.expand("."), ebins: %{}, stats: initial_stats()}}
   end
 
   def set_context(env, cwd) do
@@ -22,74 +46,203 @@ defmodule ElixirSense.Server.ContextLoader do
     GenServer.call(__MODULE__, :get_state)
   end
 
+  @doc """
+  Reloads right away whatever changed since the last poll.
+  """
   def reload do
     GenServer.call(__MODULE__, :reload)
   end
 
-  def handle_call(:reload, _from, {loaded, paths, apps, env, cwd, last_load_time}) do
-    time = :erlang.system_time(:milli_seconds)
-    reload = time - last_load_time > @minimal_reload_time
+  @doc """
+  Counters of the polls and of the reloads they triggered. Times are in
+  microseconds.
+  """
+  @spec stats() :: stats
+  def stats do
+    GenServer.call(__MODULE__, :stats)
+  end
 
-    {new_paths, new_apps} =
-      if reload do
-        purge_modules(loaded)
-        purge_paths(paths)
-        purge_apps(apps)
-        {load_paths(env, cwd), load_apps(env, cwd)}
-      else
-        {paths, apps}
-      end
+  @doc """
+  Identifies the build the docs of `module` come from, so clients can cache
+  them. Modules outside the `_build` of the project get the Elixir and OTP
+  versions, the same in every project. The ones of the project, or not
+  compiled yet, get the project path and the count of reloads.
+  """
+  @spec generation(module | nil) :: String.t
+  def generation(module) do
+    GenServer.call(__MODULE__, {:generation, module})
+  end
 
-    {:reply, :ok, {loaded, new_paths, new_apps, env, cwd, time}}
+  def handle_call(:reload, _from, state) do
+    {:reply, :ok, check(state)}
   end
 
-  def handle_call({:set_context, {env, cwd}}, _from, {loaded, paths, apps, _env, _cwd, last_load_time}) do
-    {:reply, {env, cwd}, {loaded, paths, apps, env, cwd, last_load_time}}
+  def handle_call({:set_context, {env, cwd}}, _from, state) do
+    {:reply, {env, cwd}, check(%{state | env: env, cwd: cwd})}
   end
 
   def handle_call(:get_state, _from, state) do
     {:reply, state, state}
   end
 
-  defp preload_modules(modules) do
-    modules |> Enum.each(fn mod ->
-      {:module, _} = Code.ensure_loaded(mod)
-    end)
+  def handle_call(:stats, _from, %{stats: stats} = state) do
+    {:reply, stats, state}
   end
 
-  defp all_loaded do
-    preload_modules([Inspect, :base64, :crypto])
-    for {m, _} <- :code.all_loaded, do: m
+  def handle_call({:generation, module}, _from, %{cwd: cwd, stats: stats} = state) do
+    generation =
+      if project_module?(module, cwd) do
+        "#{cwd}:#{stats.reloads}"
+      else
+        "elixir-#{System.version}-otp-#{System.otp_release}"
+      end
+    {:reply, generation, state}
   end
 
-  defp load_paths(env, cwd) do
-    for path <- Path.wildcard(Path.join(cwd, "_build/#{env}/lib/*/ebin")) do
-      Code.prepend_path(path)
-      path
-    end
+  def handle_info(:check, state) do
+    Process.send_after(self(), :check, @check_interval)
+    {:noreply, check(state)}
   end
 
-  defp load_apps(env, cwd) do
-    for path <- Path.wildcard(Path.join(cwd, "_build/#{env}/lib/*/ebin/*.app")) do
-      app = path |> Path.basename() |> Path.rootname() |> String.to_atom
-      Application.load(app)
-      app
+  defp project_module?(nil, _cwd), do: true
+  defp project_module?(module, cwd) do
+    case :code.which(module) do
+      :preloaded -> false
+      path when is_list(path) -> String.starts_with?(List.to_string(path), Path.join(cwd, "_build"))
+      _not_loaded -> true
     end
   end
 
-  defp purge_modules(loaded) do
-    for m <- (all_loaded() -- loaded) do
-      :code.delete(m)
-      :code.purge(m)
+  defp initial_stats do
+    %{
+      checks: 0,
+      last_check_time: 0,
+      reloads: 0,
+      reloaded_modules: 0,
+      reloaded_apps: 0,
+      last_reload_time: 0,
+      max_reload_time: 0,
+      total_reload_time: 0
+    }
+  end
+
+  defp check(%{env: env, cwd: cwd, ebins: ebins, stats: stats} = state) do
+    started = :erlang.monotonic_time(:micro_seconds)
+    now = :os.system_time(:seconds)
+    dirs = Path.wildcard(Path.join(cwd, "_build/#{env}/lib/*/ebin"))
+
+    removed =
+      for {dir, ebin} <- ebins, not Enum.member?(dirs, dir) do
+        unload_ebin(dir, ebin)
+      end
+
+    {new_ebins, changed} =
+      Enum.reduce(dirs, {%{}, removed}, fn dir, {new_ebins, changed} ->
+        {ebin, ebin_changes} = check_ebin(dir, Map.get(ebins, dir), now)
+        {Map.put(new_ebins, dir, ebin), [ebin_changes | changed]}
+      end)
+
+    {modules, apps} =
+      Enum.reduce(changed, {0, 0}, fn {m, a}, {modules, apps} -> {modules + m, apps + a} end)
+
+    time = :erlang.monotonic_time(:micro_seconds) - started
+    stats = %{stats | checks: stats.checks + 1, last_check_time: time}
+    stats =
+      if modules + apps > 0 do
+        ModuleIndex.invalidate_modules()
+        %{stats |
+          reloads: stats.reloads + 1,
+          reloaded_modules: stats.reloaded_modules + modules,
+          reloaded_apps: stats.reloaded_apps + apps,
+          last_reload_time: time,
+          max_reload_time: max(stats.max_reload_time, time),
+          total_reload_time: stats.total_reload_time + time
+        }
+      else
+        stats
+      end
+
+    %{state | ebins: new_ebins, stats: stats}
+  end
+
+  defp check_ebin(dir, nil, now) do
+    Code.prepend_path(dir)
+    ebin = scan_ebin(dir, now)
+    if ebin.app, do: Application.load(ebin.app)
+    {ebin, {0, if(ebin.app, do: 1, else: 0)}}
+  end
+
+  defp check_ebin(dir, ebin, now) do
+    signature = signature(dir, now)
+    if signature != nil and signature == ebin.signature do
+      {ebin, {0, 0}}
+    else
+      new_ebin = scan_ebin(dir, now)
+
+      changed_modules =
+        for {module, stamp} <- Map.merge(ebin.beams, new_ebin.beams),
+            stamp == nil or Map.get(ebin.beams, module) != Map.get(new_ebin.beams, module) do
+          purge_module(module)
+        end
+
+      reloaded_apps =
+        if new_ebin.app_stamp == nil or new_ebin.app_stamp != ebin.app_stamp do
+          if ebin.app, do: Application.unload(ebin.app)
+          if new_ebin.app, do: Application.load(new_ebin.app)
+          1
+        else
+          0
+        end
+
+      {new_ebin, {length(changed_modules), reloaded_apps}}
     end
   end
 
-  defp purge_paths(paths) do
-    for p <- paths, do: Code.delete_path(p)
+  defp scan_ebin(dir, now) do
+    beams =
+      for path <- Path.wildcard(Path.join(dir, "*.beam")), into: %{} do
+        {path |> Path.basename(".beam") |> String.to_atom(), stamp(path, now)}
+      end
+
+    {app, app_stamp} =
+      case Path.wildcard(Path.join(dir, "*.app")) do
+        [path | _] -> {path |> Path.basename(".app") |> String.to_atom(), stamp(path, now)}
+        [] -> {nil, :missing}
+      end
+
+    %{signature: signature(dir, now), beams: beams, app: app, app_stamp: app_stamp}
+  end
+
+  defp unload_ebin(dir, ebin) do
+    Code.delete_path(dir)
+    for {module, _} <- ebin.beams, do: purge_module(module)
+    if ebin.app, do: Application.unload(ebin.app)
+    {map_size(ebin.beams), if(ebin.app, do: 1, else: 0)}
   end
 
-  defp purge_apps(apps) do
-    for a <- apps, do: Application.unload(a)
+  # The module is loaded again from the code path the next time it is used
+  defp purge_module(module) do
+    :code.purge(module)
+    :code.delete(module)
+    :code.purge(module)
+    ModuleIndex.invalidate(module)
+  end
+
+  # Changes to the directory itself, its .app file and the Mix manifests of
+  # the application, `nil` when something changed too recently to tell
+  defp signature(dir, now) do
+    manifests = Path.wildcard(Path.join([Path.dirname(dir), ".mix", "*"]))
+    files = [dir | Path.wildcard(Path.join(dir, "*.app")) ++ manifests]
+    stamps = Enum.map(files, &{&1, stamp(&1, now)})
+    if Enum.any?(stamps, &match?({_, nil}, &1)), do: nil, else: stamps
+  end
+
+  defp stamp(path, now) do
+    case File.stat(path, time: :posix) do
+      {:ok, %File.Stat{mtime: mtime, size: size}} when mtime < now - 1 -> {mtime, size}
+      {:ok, _} -> nil
+      {:error, _} -> :missing
+    end
   end
 
 end
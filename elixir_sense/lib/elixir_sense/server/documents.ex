@@ -0,0 +1,118 @@
+defmodule ElixirSense.Server.Documents do
+  @moduledoc """
+  Keeps the buffers opened by the client, so requests can refer to a buffer
+  by `file_id` and `version` instead of sending the whole text every time.
+
+  Changes are applied in order as text edits. Each edit is a map with the new
+  `"text"` and, optionally, the `"start"` and `"end"` of the replaced range as
+  zero-based `[line, column]` pairs, where the column is counted in code
+  points. An edit without range replaces the whole buffer.
+  """
+  use GenServer
+
+  alias ElixirSense.Core.MetadataCache
+
+  @type file_id :: String.t
+  @type version :: integer
+  @type change :: %{required(String.t) => String.t | [non_neg_integer]}
+
+  def start_link do
+    GenServer.start_link(__MODULE__, %{}, [name: __MODULE__])
+  end
+
+  def init(documents) do
+    {:ok, documents}
+  end
+
+  @spec open(file_id, version, String.t) :: version
+  def open(file_id, version, buffer) do
+    GenServer.call(__MODULE__, {:open, file_id, version, buffer})
+  end
+
+  @spec change(file_id, version, version, [change]) :: version
+  def change(file_id, previous_version, version, _changes) when version <= previous_version do
+    raise "Change to version #{version} of document #{file_id} is not newer than #{previous_version}"
+  end
+  def change(file_id, previous_version, version, changes) do
+    case get(file_id) do
+      {^previous_version, buffer} ->
+        open(file_id, version, apply_changes(buffer, changes))
+      _ ->
+        raise "Document #{file_id} is out of sync, it must be opened again"
+    end
+  end
+
+  @spec close(file_id) :: :ok
+  def close(file_id) do
+    MetadataCache.forget(file_id)
+    GenServer.call(__MODULE__, {:close, file_id})
+  end
+
+  @spec get(file_id) :: {version, String.t} | nil
+  def get(file_id) do
+    GenServer.call(__MODULE__, {:get, file_id})
+  end
+
+  @doc """
+  Returns the buffer of an opened document.
+
+  A request for an older version gets the latest buffer, its result is most
+  likely discarded by the client anyway.
+  """
+  @spec fetch!(file_id, version) :: String.t
+  def fetch!(file_id, version) do
+    case get(file_id) do
+      {current_version, buffer} when current_version >= version ->
+        buffer
+      _ ->
+        raise "Document #{file_id} (version #{version}) is not opened"
+    end
+  end
+
+  @spec apply_changes(String.t, [change]) :: String.t
+  def apply_changes(buffer, changes) do
+    Enum.reduce(changes, buffer, &apply_change(&2, &1))
+  end
+
+  def handle_call({:open, file_id, version, buffer}, _from, documents) do
+    {:reply, version, Map.put(documents, file_id, {version, buffer})}
+  end
+
+  def handle_call({:close, file_id}, _from, documents) do
+    {:reply, :ok, Map.delete(documents, file_id)}
+  end
+
+  def handle_call({:get, file_id}, _from, documents) do
+    {:reply, Map.get(documents, file_id), documents}
+  end
+
+  defp apply_change(buffer, %{"start" => [start_line, start_column], "end" => [end_line, end_column], "text" => text}) do
+    start_offset = byte_offset(buffer, start_line, start_column)
+    end_offset = byte_offset(buffer, end_line, end_column)
+    binary_part(buffer, 0, start_offset) <> text <> binary_part(buffer, end_offset, byte_size(buffer) - end_offset)
+  end
+
+  defp apply_change(_buffer, %{"text" => text}) do
+    text
+  end
+
+  defp byte_offset(buffer, line, column) do
+    {previous_lines, rest} = buffer |> :binary.split("\n", [:global]) |> Enum.split(line)
+    line_offset = Enum.reduce(previous_lines, 0, &(byte_size(&1) + 1 + &2))
+
+    column_offset =
+      case rest do
+        [current_line | _] ->
+          current_line
+          |> String.to_charlist()
+          |> Enum.take(column)
+          |> List.to_string()
+          |> byte_size()
+        [] ->
+          0
+      end
+
+    min(line_offset + column_offset, byte_size(buffer))
+  end
+
+end
@@ -4,14 +4,18 @@ defmodule ElixirSense.Server.RequestHandler do
   Handles all requests received by the TCP Server and maps those requests to ElixirSense API calls.
   """
 
-  alias ElixirSense.Server.ContextLoader
+  alias ElixirSense.Server.{ContextLoader, Documents}
+  alias ElixirSense.Core.Parser
+
+  @buffer_requests ["signature", "docs", "definition", "suggestions", "expand_full", "diagnostics"]
 
   def handle_request("signature", %{"buffer" => buffer, "line" => line, "column" => column}) do
     ElixirSense.signature(buffer, line, column)
   end
 
   def handle_request("docs", %{"buffer" => buffer, "line" => line, "column" => column}) do
-    ElixirSense.docs(buffer, line, column)
+    %{symbol: %{module: module}} = docs = ElixirSense.docs(buffer, line, column)
+    Map.put(docs, :generation, ContextLoader.generation(module))
   end
 
   def handle_request("definition", %{"buffer" => buffer, "line" => line, "column" => column}) do
@@ -22,14 +26,42 @@ defmodule ElixirSense.Server.RequestHandler do
     end
   end
 
+  def handle_request("suggestions", %{"buffer" => buffer, "line" => line, "column" => column, "max_results" => max_results} = payload) do
+    ranking = payload |> Map.get("ranking", "none") |> ranking()
+    ElixirSense.top_suggestions(buffer, line, column, ranking, max_results)
+  end
+
   def handle_request("suggestions", %{"buffer" => buffer, "line" => line, "column" => column}) do
     ElixirSense.suggestions(buffer, line, column)
   end
 
+  def handle_request("diagnostics", %{"buffer" => buffer, "file" => file}) do
+    ElixirSense.diagnostics(buffer, file)
+  end
+
   def handle_request("expand_full", %{"buffer" => buffer, "selected_code" => selected_code, "line" => line}) do
     ElixirSense.expand_full(buffer, selected_code, line)
   end
 
+  def handle_request(request, %{"file_id" => file_id, "version" => version} = payload) when request in @buffer_requests do
+    buffer = Documents.fetch!(file_id, version)
+    Parser.with_file(file_id, fn ->
+      handle_request(request, Map.put(payload, "buffer", buffer))
+    end)
+  end
+
+  def handle_request("open", %{"file_id" => file_id, "version" => version, "buffer" => buffer}) do
+    Documents.open(file_id, version, buffer)
+  end
+
+  def handle_request("change", %{"file_id" => file_id, "previous_version" => previous_version, "version" => version, "changes" => changes}) do
+    Documents.change(file_id, previous_version, version, changes)
+  end
+
+  def handle_request("close", %{"file_id" => file_id}) do
+    Documents.close(file_id)
+  end
+
   def handle_request("quote", %{"code" => code}) do
     ElixirSense.quote(code)
   end
@@ -46,10 +78,15 @@ defmodule ElixirSense.Server.RequestHandler do
     env |> ContextLoader.set_context(cwd) |> Tuple.to_list()
   end
 
+  def handle_request("reload_stats", %{}) do
+    ContextLoader.stats()
+  end
+
   def handle_request("version", %{}) do
     %{
       elixir: System.version,
-      otp: System.otp_release
+      otp: System.otp_release,
+      memory: :erlang.memory(:total)
     }
   end
 
@@ -57,4 +94,8 @@ defmodule ElixirSense.Server.RequestHandler do
     IO.puts :stderr, "Cannot handle request \"#{request}\". Payload: #{inspect(payload)}"
   end
 
+  defp ranking("none"), do: :none
+  defp ranking("relevance"), do: :relevance
+  defp ranking(ranking), do: raise ArgumentError, "Unknown ranking \"#{ranking}\""
+
 end
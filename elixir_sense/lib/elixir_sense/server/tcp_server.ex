@@ -4,10 +4,12 @@ defmodule ElixirSense.Server.TCPServer do
   """
   use Bitwise
 
-  alias ElixirSense.Server.{RequestHandler, ContextLoader}
+  alias ElixirSense.Server.{RequestHandler, ContextLoader, Documents}
+  alias ElixirSense.Core.{MetadataCache, ModuleIndex}
 
   @connection_handler_supervisor ElixirSense.Server.TCPServer.ConnectionHandlerSupervisor
   @default_listen_options [:binary, active: false, reuseaddr: true, packet: 4]
+  @document_requests ["open", "change", "close"]
 
   def start([socket_type: socket_type, port: port, env: env]) do
     import Supervisor.Spec
@@ -15,7 +17,10 @@ defmodule ElixirSense.Server.TCPServer do
     children = [
       worker(Task, [__MODULE__, :listen, [socket_type, "localhost", port]]),
       supervisor(Task.Supervisor, [[name: @connection_handler_supervisor]]),
-      worker(ContextLoader, [env])
+      worker(ContextLoader, [env]),
+      worker(Documents, []),
+      worker(MetadataCache, []),
+      worker(ModuleIndex, [])
     ]
 
     opts = [strategy: :one_for_one, name: __MODULE__]
@@ -77,16 +82,33 @@ defmodule ElixirSense.Server.TCPServer do
       {:error, :closed} ->
         IO.puts :stderr, "Client socket is closed"
       {:ok, data} ->
-        data
-        |> process_request(auth_token)
-        |> send_response(socket)
+        case decode_request_data(data) do
+          {:ok, %{"request" => request}} = decoded when request in @document_requests ->
+            decoded
+            |> process_request(auth_token)
+            |> send_response(socket)
+          decoded ->
+            {:ok, _pid} = start_request_handler(decoded, socket, auth_token)
+        end
         connection_handler(socket, auth_token)
     end
   end
 
-  defp process_request(data, auth_token) do
+  # Each request is processed in its own task so a slow request does not block
+  # the ones pipelined behind it. Clients match responses by `request_id`.
+  # Document changes are processed in place, so they are applied in order and
+  # before any request sent after them.
+  defp start_request_handler(decoded, socket, auth_token) do
+    Task.Supervisor.start_child(@connection_handler_supervisor, fn ->
+      decoded
+      |> process_request(auth_token)
+      |> send_response(socket)
+    end)
+  end
+
+  defp process_request(decoded, auth_token) do
     with \
-      {:ok, decoded_data} <- decode_request_data(data),
+      {:ok, decoded_data} <- decoded,
       {:ok, result} <- dispatch_request(decoded_data, auth_token)
     do
       :erlang.term_to_binary(result)
@@ -108,7 +130,6 @@ defmodule ElixirSense.Server.TCPServer do
     try do
       result =
         if secure_compare(auth_token, req_token) do
-          ContextLoader.reload()
           payload = RequestHandler.handle_request(request, payload)
           %{request_id: request_id, payload: payload, error: nil}
         else
@@ -1,9 +1,11 @@
 requires = [
+  "elixir_sense/core/module_index.ex",
   "elixir_sense/core/introspection.ex",
   "elixir_sense/core/ast.ex",
   "elixir_sense/core/state.ex",
   "elixir_sense/core/metadata_builder.ex",
   "elixir_sense/core/metadata.ex",
+  "elixir_sense/core/metadata_cache.ex",
   "elixir_sense/core/parser.ex",
   "elixir_sense/core/source.ex",
   "alchemist/helpers/module_info.ex",
@@ -14,15 +16,66 @@ requires = [
   "elixir_sense/providers/signature.ex",
   "elixir_sense/providers/expand.ex",
   "elixir_sense/providers/eval.ex",
+  "elixir_sense/providers/diagnostics.ex",
   "elixir_sense/server/request_handler.ex",
   "elixir_sense/server/context_loader.ex",
+  "elixir_sense/server/documents.ex",
   "elixir_sense/server/tcp_server.ex",
   "elixir_sense.ex",
   "elixir_sense/server.ex"
 ]
 
-requires |> Enum.each(fn file ->
-  Code.require_file("lib/#{file}", __DIR__)
-end)
+sources = Enum.map(requires, &Path.expand("lib/#{&1}", __DIR__))
+
+# The server is compiled once for each version of Elixir, OTP and of its
+# sources, later starts just load the .beam files from the cache.
+cache_root = System.get_env("ELIXIR_SENSE_CACHE") ||
+  to_string(:filename.basedir(:user_cache, 'elixir_sense'))
+version_dir = Path.join(cache_root,
+  "elixir-#{System.version}-otp-#{:erlang.system_info(:otp_release)}")
+sources_hash =
+  sources
+  |> Enum.map(&File.read!/1)
+  |> :erlang.md5()
+  |> Base.encode16(case: :lower)
+cache_dir = Path.join(version_dir, sources_hash)
+manifest = Path.join(cache_dir, "modules")
+
+case File.read(manifest) do
+  {:ok, modules} ->
+    Code.prepend_path(cache_dir)
+    modules
+    |> :erlang.binary_to_term()
+    |> Enum.each(fn module -> {:module, _} = Code.ensure_loaded(module) end)
+  {:error, _} ->
+    # Code.compile_file/1 only exists since Elixir 1.7, load_file/1 also
+    # returns the modules and binaries before it
+    compile = if function_exported?(Code, :compile_file, 1), do: :compile_file, else: :load_file
+    compiled = Enum.flat_map(sources, &apply(Code, compile, [&1]))
+    # written aside and renamed, so servers starting at the same time never
+    # see an incomplete cache
+    tmp_dir = "#{cache_dir}.#{System.unique_integer([:positive])}"
+    try do
+      File.mkdir_p!(tmp_dir)
+      for {module, binary} <- compiled do
+        File.write!(Path.join(tmp_dir, "#{module}.beam"), binary)
+      end
+      modules = for {module, _} <- compiled, do: module
+      File.write!(Path.join(tmp_dir, "modules"), :erlang.term_to_binary(modules))
+      case File.rename(tmp_dir, cache_dir) do
+        :ok ->
+          version_dir
+          |> File.ls!()
+          |> Enum.reject(&(&1 == sources_hash or String.starts_with?(&1, sources_hash <> ".")))
+          |> Enum.each(&File.rm_rf(Path.join(version_dir, &1)))
+        {:error, _} ->
+          File.rm_rf(tmp_dir)
+      end
+    rescue
+      e in File.Error ->
+        File.rm_rf(tmp_dir)
+        IO.puts(:stderr, "Warning: cannot cache the compiled server: #{Exception.message(e)}")
+    end
+end
 
 ElixirSense.Server.start(System.argv)
@@ -0,0 +1,42 @@
+defmodule ElixirSense.Core.MetadataCacheTest do
+  use ExUnit.Case
+
+  alias ElixirSense.Core.{Metadata, MetadataCache}
+
+  setup_all do
+    {:ok, _} = MetadataCache.start_link()
+    :ok
+  end
+
+  test "fetch builds the metadata once" do
+    test_pid = self()
+    build = fn ->
+      send(test_pid, :built)
+      %Metadata{source: "once"}
+    end
+
+    assert MetadataCache.fetch({:once, 1}, build) == %Metadata{source: "once"}
+    assert MetadataCache.fetch({:once, 1}, build) == %Metadata{source: "once"}
+    assert_received :built
+    refute_received :built
+  end
+
+  test "fetch evicts the least recently used metadata" do
+    MetadataCache.fetch({:lru, 0}, fn -> %Metadata{source: "first"} end)
+    for i <- 1..40 do
+      MetadataCache.fetch({:lru, 1}, fn -> flunk("used metadata evicted") end)
+      MetadataCache.fetch({:lru, i + 1}, fn -> %Metadata{} end)
+    end
+
+    assert MetadataCache.fetch({:lru, 0}, fn -> %Metadata{source: "rebuilt"} end) == %Metadata{source: "rebuilt"}
+  end
+
+  test "last_good is kept per file until it is forgotten" do
+    assert MetadataCache.last_good("lib/last_good.ex") == nil
+    MetadataCache.put_last_good("lib/last_good.ex", %Metadata{source: "good"})
+    assert MetadataCache.last_good("lib/last_good.ex") == %Metadata{source: "good"}
+    MetadataCache.forget("lib/last_good.ex")
+    assert MetadataCache.last_good("lib/last_good.ex") == nil
+  end
+
+end
@@ -0,0 +1,50 @@
+defmodule ElixirSense.Core.ModuleIndexTest do
+  use ExUnit.Case
+
+  alias ElixirSense.Core.ModuleIndex
+  alias Alchemist.Helpers.Complete
+
+  setup_all do
+    {:ok, _} = ModuleIndex.start_link()
+    :ok
+  end
+
+  test "fetch builds each entry of a module once" do
+    test_pid = self()
+    build = fn ->
+      send(test_pid, :built)
+      [:entry]
+    end
+
+    assert ModuleIndex.fetch(:funs, ModuleIndexTest.Once, build) == [:entry]
+    assert ModuleIndex.fetch(:funs, ModuleIndexTest.Once, build) == [:entry]
+    assert_received :built
+    refute_received :built
+  end
+
+  test "invalidate drops only the entries of the module" do
+    ModuleIndex.fetch(:funs, ModuleIndexTest.Invalidated, fn -> :old end)
+    ModuleIndex.fetch(:funs, ModuleIndexTest.Kept, fn -> :kept end)
+
+    ModuleIndex.invalidate(ModuleIndexTest.Invalidated)
+
+    assert ModuleIndex.fetch(:funs, ModuleIndexTest.Invalidated, fn -> :new end) == :new
+    assert ModuleIndex.fetch(:funs, ModuleIndexTest.Kept, fn -> :rebuilt end) == :kept
+  end
+
+  test "modules are built again after invalidate_modules" do
+    assert ModuleIndex.modules(:test, fn -> ["A"] end) == ["A"]
+    assert ModuleIndex.modules(:test, fn -> ["B"] end) == ["A"]
+    ModuleIndex.invalidate_modules()
+    assert ModuleIndex.modules(:test, fn -> ["B"] end) == ["B"]
+  end
+
+  test "completions from the index are the same as the ones built" do
+    ModuleIndex.invalidate(Enum)
+    built = Complete.run("Enum.ma")
+    assert Complete.run("Enum.ma") == built
+    assert %{type: :hint, value: "Enum.ma"} in built
+    assert Enum.any?(built, &match?(%{name: "map", arity: 2, origin: "Enum"}, &1))
+  end
+
+end
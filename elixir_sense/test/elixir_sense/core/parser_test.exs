@@ -116,6 +116,30 @@ defmodule ElixirSense.Core.ParserTest do
       }
   end
 
+  test "parse_string within with_file falls back to the last metadata of the file that parsed" do
+    {:ok, cache} = ElixirSense.Core.MetadataCache.start_link()
+    good = """
+    defmodule MyModule do
+      import List
+
+    end
+    """
+    broken = """
+    defmodule MyModule do
+      import List
+
+    """
+
+    {good_metadata, broken_metadata} = with_file("lib/my_module.ex", fn ->
+      {parse_string(good, true, true, 3), parse_string(broken, true, true, 3)}
+    end)
+    assert broken_metadata == good_metadata
+    assert %Metadata{error: {3, "missing terminator: end" <> _, _}} = parse_string(broken, true, true, 3)
+
+    Process.unlink(cache)
+    GenServer.stop(cache)
+  end
+
   test "parse_string ignores non existing modules in `use`" do
     source = """
     defmodule MyModule do
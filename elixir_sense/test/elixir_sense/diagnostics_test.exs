@@ -0,0 +1,81 @@
+defmodule ElixirSense.DiagnosticsTest do
+
+  use ExUnit.Case
+
+  describe "diagnostics" do
+
+    test "syntax errors" do
+      buffer = """
+      defmodule MyModule do
+        def run(x) do
+          x +
+      end
+      """
+
+      assert [%{severity: :error, line: line, file: "lib/my_module.ex"}] =
+        ElixirSense.diagnostics(buffer, "lib/my_module.ex")
+      assert line in 3..5
+    end
+
+    test "compile errors" do
+      buffer = """
+      defmodule ElixirSense.DiagnosticsTest.CompileError do
+        def run, do: undefined_function()
+      end
+      """
+
+      assert [%{severity: :error, line: 2, message: message}] =
+        ElixirSense.diagnostics(buffer, "lib/compile_error.ex")
+      assert message =~ "undefined_function"
+    end
+
+    # the compiler only returns warnings since Elixir 1.6
+    @tag skip: not function_exported?(Kernel.ParallelCompiler, :compile, 2)
+    test "warnings" do
+      buffer = """
+      defmodule ElixirSense.DiagnosticsTest.Warnings do
+        def run(list), do: :ok
+      end
+      """
+
+      assert [%{severity: :warning, line: 2, file: "lib/warnings.ex", message: message}] =
+        ElixirSense.diagnostics(buffer, "lib/warnings.ex")
+      assert message =~ "unused"
+    end
+
+    test "code reading files next to the buffer's file finds them" do
+      dir = Path.join(System.tmp_dir!(), "elixir_sense_diagnostics_test")
+      File.mkdir_p!(dir)
+      File.write!(Path.join(dir, "fixture.txt"), "fixture")
+      on_exit(fn -> File.rm_rf(dir) end)
+
+      buffer = """
+      defmodule ElixirSense.DiagnosticsTest.ReadsDir do
+        @external_resource Path.join(__DIR__, "fixture.txt")
+        @fixture File.read!(Path.join(__DIR__, "fixture.txt"))
+        @dir Path.dirname(__ENV__.file)
+        def fixture, do: {@fixture, @dir, "__DIR__"}
+      end
+      """
+
+      assert ElixirSense.diagnostics(buffer, Path.join(dir, "reads_dir.ex")) == []
+    end
+
+    test "the modules compiled are not kept" do
+      buffer = """
+      defmodule ElixirSense.DiagnosticsTest.NotKept do
+        def run, do: :ok
+      end
+      """
+
+      assert ElixirSense.diagnostics(buffer, "lib/not_kept.ex") == []
+      refute Code.ensure_loaded?(ElixirSense.DiagnosticsTest.NotKept)
+    end
+
+    test "scripts are only parsed" do
+      assert ElixirSense.diagnostics("raise \"not run\"", "test/script.exs") == []
+    end
+
+  end
+
+end
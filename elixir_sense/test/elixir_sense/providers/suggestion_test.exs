@@ -52,4 +52,31 @@ defmodule ElixirSense.Providers.SuggestionTest do
     ]
   end
 
+  describe "top/4" do
+
+    @suggestions [
+      %{type: :hint, value: "ma"},
+      %{type: :module, name: "Map", subtype: nil, summary: ""},
+      %{type: "function", name: "max", arity: 2},
+      %{type: :variable, name: :map},
+      %{type: "function", name: "map", arity: 2}
+    ]
+
+    test "ranks by relevance and truncates" do
+      assert Suggestion.top(@suggestions, "Enum.ma", :relevance, 2) == %{
+        suggestions: [
+          %{type: :hint, value: "ma"},
+          %{type: :variable, name: :map},
+          %{type: "function", name: "map", arity: 2}
+        ],
+        truncated: true
+      }
+    end
+
+    test "keeps the order without ranking" do
+      assert Suggestion.top(@suggestions, "ma", :none, 4) == %{suggestions: @suggestions, truncated: false}
+    end
+
+  end
+
 end
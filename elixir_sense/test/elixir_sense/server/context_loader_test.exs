@@ -0,0 +1,67 @@
+defmodule ElixirSense.Server.ContextLoaderTest do
+  use ExUnit.Case
+
+  alias ElixirSense.Server.ContextLoader
+  import ExUnit.CaptureIO
+
+  setup_all do
+    capture_io(fn ->
+      ElixirSense.Server.start(["unix", "0", "dev"])
+    end)
+    :ok
+  end
+
+  setup do
+    project = Path.join(System.tmp_dir!(), "context_loader_test_#{System.unique_integer([:positive])}")
+    ebin = Path.join(project, "_build/dev/lib/reloaded/ebin")
+    File.mkdir_p!(ebin)
+    on_exit(fn -> File.rm_rf!(project) end)
+    {:ok, project: project, ebin: ebin}
+  end
+
+  test "reloads only the modules whose beams changed", %{project: project, ebin: ebin} do
+    write_module(ebin, ContextLoaderTest.Changed, 1, {{2000, 1, 1}, {0, 0, 0}})
+    write_module(ebin, ContextLoaderTest.Unchanged, 1, {{2000, 1, 1}, {0, 0, 0}})
+    ContextLoader.set_context("dev", project)
+
+    assert apply(ContextLoaderTest.Changed, :version, []) == 1
+    assert apply(ContextLoaderTest.Unchanged, :version, []) == 1
+
+    stats = ContextLoader.stats()
+    write_module(ebin, ContextLoaderTest.Changed, 2, {{2001, 1, 1}, {0, 0, 0}})
+    ContextLoader.reload()
+
+    assert :code.is_loaded(ContextLoaderTest.Unchanged) != false
+    assert apply(ContextLoaderTest.Changed, :version, []) == 2
+    assert ContextLoader.stats().reloaded_modules == stats.reloaded_modules + 1
+  end
+
+  test "unloads the modules of removed ebin directories", %{project: project, ebin: ebin} do
+    write_module(ebin, ContextLoaderTest.Removed, 1, {{2000, 1, 1}, {0, 0, 0}})
+    ContextLoader.set_context("dev", project)
+    assert apply(ContextLoaderTest.Removed, :version, []) == 1
+
+    File.rm_rf!(ebin)
+    ContextLoader.reload()
+
+    assert :code.is_loaded(ContextLoaderTest.Removed) == false
+    assert Code.ensure_loaded(ContextLoaderTest.Removed) == {:error, :nofile}
+  end
+
+  # Writes the beam without loading the module
+  defp write_module(ebin, module, version, mtime) do
+    [{^module, binary}] = Code.compile_string("""
+      defmodule #{inspect(module)} do
+        def version, do: #{version}
+      end
+    """)
+    :code.purge(module)
+    :code.delete(module)
+    :code.purge(module)
+
+    path = Path.join(ebin, "#{module}.beam")
+    File.write!(path, binary)
+    File.touch!(path, mtime)
+  end
+
+end
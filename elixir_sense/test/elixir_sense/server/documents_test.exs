@@ -0,0 +1,67 @@
+defmodule ElixirSense.Server.DocumentsTest do
+  use ExUnit.Case
+
+  alias ElixirSense.Server.Documents
+
+  import ElixirSense.Server.Documents, only: [apply_changes: 2]
+
+  describe "change/4" do
+
+    setup_all do
+      {:ok, _} = Documents.start_link()
+      :ok
+    end
+
+    test "applies the changes to the previous version" do
+      Documents.open("lib/changed.ex", 1, "ab")
+      Documents.change("lib/changed.ex", 1, 2, [%{"start" => [0, 1], "end" => [0, 1], "text" => "x"}])
+      assert Documents.get("lib/changed.ex") == {2, "axb"}
+    end
+
+    test "rejects a change to a document reopened with it" do
+      # opened again at the version of the edit, before the edit was sent
+      Documents.open("lib/reopened.ex", 2, "axb")
+      change = [%{"start" => [0, 1], "end" => [0, 1], "text" => "x"}]
+      assert_raise RuntimeError, ~r/not newer/, fn ->
+        Documents.change("lib/reopened.ex", 2, 2, change)
+      end
+      assert Documents.get("lib/reopened.ex") == {2, "axb"}
+    end
+
+  end
+
+  describe "apply_changes/2" do
+
+    test "replaces a range within a line" do
+      buffer = "defmodule MyModule do\n  Lis.flatten\nend"
+      changes = [%{"start" => [1, 2], "end" => [1, 5], "text" => "List"}]
+      assert apply_changes(buffer, changes) == "defmodule MyModule do\n  List.flatten\nend"
+    end
+
+    test "replaces a range spanning several lines" do
+      buffer = "line 1\nline 2\nline 3"
+      changes = [%{"start" => [0, 4], "end" => [2, 4], "text" => ""}]
+      assert apply_changes(buffer, changes) == "line 3"
+    end
+
+    test "counts columns in code points" do
+      buffer = "ñandú = 1"
+      changes = [%{"start" => [0, 5], "end" => [0, 5], "text" => "s"}]
+      assert apply_changes(buffer, changes) == "ñandús = 1"
+    end
+
+    test "applies changes in order" do
+      changes = [
+        %{"start" => [0, 0], "end" => [0, 0], "text" => "List."},
+        %{"start" => [0, 5], "end" => [0, 5], "text" => "flatten"}
+      ]
+      assert apply_changes("", changes) == "List.flatten"
+    end
+
+    test "a change without range replaces the whole buffer" do
+      assert apply_changes("old", [%{"text" => "new"}]) == "new"
+    end
+
+  end
+
+end
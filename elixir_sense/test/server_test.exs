@@ -113,6 +113,22 @@ defmodule ElixirSense.ServerTest do
     assert send_request(socket, request).docs.docs =~ "> Enum.to_list"
   end
 
+  test "docs request with the symbol and its generation", %{socket: socket, auth_token: auth_token} do
+    request = %{
+      "request_id" => 1,
+      "auth_token" => auth_token,
+      "request" => "docs",
+      "payload" => %{
+        "buffer" => "Enum.to_list",
+        "line" => 1,
+        "column" => 6
+      }
+    }
+    %{symbol: symbol, generation: generation} = send_request(socket, request)
+    assert symbol == %{module: Enum, function: :to_list}
+    assert generation == "elixir-#{System.version}-otp-#{System.otp_release}"
+  end
+
   test "suggestions request", %{socket: socket, auth_token: auth_token} do
     request = %{
       "request_id" => 1,
@@ -127,8 +143,24 @@ defmodule ElixirSense.ServerTest do
     assert send_request(socket, request) |> Enum.at(0) == %{type: :hint, value: "List."}
   end
 
+  test "suggestions request with max_results", %{socket: socket, auth_token: auth_token} do
+    request = %{
+      "request_id" => 1,
+      "auth_token" => auth_token,
+      "request" => "suggestions",
+      "payload" => %{
+        "buffer" => "List.",
+        "line" => 1,
+        "column" => 6,
+        "max_results" => 2,
+        "ranking" => "relevance"
+      }
+    }
+    assert %{suggestions: [%{type: :hint, value: "List."}, _, _], truncated: true} = send_request(socket, request)
+  end
+
   test "set_context request", %{socket: socket, auth_token: auth_token} do
-    {_, _, _, env, cwd, _} = ContextLoader.get_state()
+    %{env: env, cwd: cwd} = ContextLoader.get_state()
 
     assert env == "dev"
 
@@ -143,10 +175,128 @@ defmodule ElixirSense.ServerTest do
     }
     send_request(socket, request)
 
-    {_, _, _, env, _, _} = ContextLoader.get_state()
+    %{env: env} = ContextLoader.get_state()
     assert env == "test"
   end
 
+  test "reload_stats request", %{socket: socket, auth_token: auth_token} do
+    request = %{
+      "request_id" => 1,
+      "auth_token" => auth_token,
+      "request" => "reload_stats",
+      "payload" => %{}
+    }
+    stats = send_request(socket, request)
+
+    assert stats.checks > 0
+    assert stats.reloads <= stats.checks
+    assert stats.max_reload_time >= stats.last_reload_time
+  end
+
+  test "version request", %{socket: socket, auth_token: auth_token} do
+    request = %{
+      "request_id" => 1,
+      "auth_token" => auth_token,
+      "request" => "version",
+      "payload" => %{}
+    }
+    version = send_request(socket, request)
+
+    assert version.elixir == System.version
+    assert version.otp == System.otp_release
+    assert version.memory > 0
+  end
+
+  test "requests on opened documents", %{socket: socket, auth_token: auth_token} do
+    request = %{
+      "request_id" => 1,
+      "auth_token" => auth_token,
+      "request" => "open",
+      "payload" => %{
+        "file_id" => "lib/my_module.ex",
+        "version" => 1,
+        "buffer" => "Enum.to_lis"
+      }
+    }
+    assert send_request(socket, request) == 1
+
+    request = %{
+      "request_id" => 2,
+      "auth_token" => auth_token,
+      "request" => "change",
+      "payload" => %{
+        "file_id" => "lib/my_module.ex",
+        "previous_version" => 1,
+        "version" => 2,
+        "changes" => [%{"start" => [0, 11], "end" => [0, 11], "text" => "t"}]
+      }
+    }
+    assert send_request(socket, request) == 2
+
+    request = %{
+      "request_id" => 3,
+      "auth_token" => auth_token,
+      "request" => "definition",
+      "payload" => %{
+        "file_id" => "lib/my_module.ex",
+        "version" => 2,
+        "line" => 1,
+        "column" => 6
+      }
+    }
+    assert send_request(socket, request) =~ "enum.ex:2583"
+
+    request = %{
+      "request_id" => 4,
+      "auth_token" => auth_token,
+      "request" => "close",
+      "payload" => %{
+        "file_id" => "lib/my_module.ex"
+      }
+    }
+    assert send_request(socket, request) == :ok
+
+    request = %{
+      "request_id" => 5,
+      "auth_token" => auth_token,
+      "request" => "definition",
+      "payload" => %{
+        "file_id" => "lib/my_module.ex",
+        "version" => 2,
+        "line" => 1,
+        "column" => 6
+      }
+    }
+    response = send_and_recv(socket, :erlang.term_to_binary(request)) |> :erlang.binary_to_term
+    assert response.error =~ "is not opened"
+  end
+
+  test "pipelined requests are answered by request_id", %{socket: socket, auth_token: auth_token} do
+    for {request_id, code} <- [{1, "{var1, var2} = {1, 2}"}, {2, "var = 1"}] do
+      request = %{
+        "request_id" => request_id,
+        "auth_token" => auth_token,
+        "request" => "match",
+        "payload" => %{
+          "code" => code,
+        }
+      }
+      :ok = :gen_tcp.send(socket, :erlang.term_to_binary(request))
+    end
+
+    responses =
+      for _ <- 1..2 do
+        {:ok, response} = :gen_tcp.recv(socket, 0, 1000)
+        response = :erlang.binary_to_term(response)
+        {response.request_id, response.payload}
+      end
+
+    assert Enum.sort(responses) == [
+      {1, "# Bindings\n\nvar1 = 1\n\nvar2 = 2"},
+      {2, "# Bindings\n\nvar = 1"}
+    ]
+  end
+
   test "unauthorized request", %{socket: socket} do
     request = %{
       "request_id" => 1,
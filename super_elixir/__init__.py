@@ -1,6 +1,11 @@
 from .autocomplete import *  # noqa
+from .documents import *  # noqa
 from .go_to import *  # noqa
+from .metrics import *  # noqa
 from .navigate_modules import *  # noqa
+from .servers import *  # noqa
+from .signature_help import *  # noqa
+from .warm_up import *  # noqa
 
 try:
     from .linter import *  # noqa
@@ -1,17 +1,255 @@
 import re
+from collections import OrderedDict
+from functools import partial
 
 import sublime
 import sublime_plugin
 
-from .utils import is_elixir, get_buffer_line_column
-from .sense_client import get_elixir_sense
+from .utils import is_elixir
+from .settings import get_settings_param
+from .documents import get_document_line_column
+from .background import query_sense
+from .metrics import METRICS
+from .ranking import CompletionIndex, RECENT_NAMES, RECENT_ORIGINS
 
 
 FOLLOWING_CHARS = set(["\r", "\n", "\t", " ", ")", "]", ";", "}", "\x00"])
 
 
+COMPLETION_FLAGS = (
+    sublime.INHIBIT_WORD_COMPLETIONS |
+    sublime.INHIBIT_EXPLICIT_COMPLETIONS
+)
+
+DOCS_POPUPS_SIZE = 128
+DOCS_HOVER_DELAY = 300
+
+
+class CompletionSession:
+    """
+    Raw suggestions of the last completion request of a view.
+
+    While the user keeps typing the same token, in the same context, the
+    completions are ranked again from these suggestions instead of asking
+    elixir_sense again. Unless elixir_sense left suggestions out, then the
+    ones for the longer prefix may be missing.
+    """
+
+    def __init__(self, view, location, prefix, param_auto_completion):
+        self.token_start = location - len(prefix)
+        self.context = self._context(view, location, self.token_start)
+        self.prefix = prefix
+        self.version = view.change_count()
+        self.param_auto_completion = param_auto_completion
+        self.suggestions = None
+        self.truncated = False
+        self.index = None
+
+    def covers(self, view, location, prefix, param_auto_completion):
+        token_start = location - len(prefix)
+        typed = len(prefix) - len(self.prefix)
+        return (
+            self.suggestions is not None and
+            (not self.truncated or prefix == self.prefix) and
+            param_auto_completion == self.param_auto_completion and
+            token_start == self.token_start and
+            prefix.startswith(self.prefix) and
+            # nothing but the token was edited since the request
+            view.change_count() - self.version <= typed and
+            self._context(view, location, token_start) == self.context
+        )
+
+    def set_result(self, result):
+        # no result while the server is not ready, nothing is cached so the
+        # next keystroke asks again
+        if result is None:
+            return
+        self.suggestions = result.get('suggestions') or []
+        self.truncated = result.get('truncated', False)
+        self.index = CompletionIndex(self.suggestions, self._build_completion)
+
+    def completions(self, prefix):
+        if self.index is None:
+            return []
+        if self.param_auto_completion:
+            return self.index.rows_named(prefix)
+        return self.index.rank(prefix)
+
+    def _build_completion(self, s, hint):
+        name = str(s.get('name', s.get('description', '')))
+        if hint.startswith(name):
+            name = hint
+
+        show = completion = name
+        hint = ('%s %s' % (
+            s.get('origin', ''),
+            s['type'].replace('_', ' ')
+        )).strip()
+
+        if self._is_function(s):
+            arity = s.get('arity')
+            args = s.get('args', '').split(',')
+
+            if not args and arity:
+                args = ['_'] * arity
+
+            completion_args = [
+                '${%s:%s}' % (i, a) for i, a in enumerate(args, 1)
+            ]
+
+            if self.param_auto_completion:
+                show = ', '.join(args)
+                completion = ', '.join(completion_args)
+            else:
+                show += '(' + ', '.join(args) + ')'
+                completion += '(' + ', '.join(completion_args) + ')'
+
+        return ['{}\t{}'.format(show, hint), completion]
+
+    def _is_function(self, suggestion):
+        return (
+            suggestion['type'].endswith('function') or
+            suggestion['type'] == 'macro'
+        )
+
+    def _context(self, view, location, token_start):
+        return view.substr(sublime.Region(view.line(location).a, token_start))
+
+
+class DocsPopups:
+    """
+    Rendered docs popups by the symbol they document and the generation of
+    its code, given by elixir_sense. Symbols outside of the projects share
+    the generation of their Elixir version, so are cached across projects.
+
+    The symbol at each hovered word is kept until the view changes, so
+    hovering the word again needs no request.
+    """
+
+    def __init__(self, size=DOCS_POPUPS_SIZE):
+        self.size = size
+        self._popups = OrderedDict()
+        # view id -> (change count, symbol key by word region)
+        self._hovered = {}
+
+    def hovered(self, view, region):
+        """Popup of the symbol last hovered at `region`, if still valid"""
+        change_count, keys = self._hovered.get(view.id(), (None, {}))
+        if change_count != view.change_count():
+            return None
+        return self._get(keys.get((region.a, region.b)))
+
+    def render(self, view, change_count, region, docs):
+        """Popup of `docs` hovered at `region`, rendered once per symbol"""
+        if docs['symbol']['module'] is None:
+            # unresolved symbols would all share the same key
+            return render_docs(docs)
+
+        key = (
+            docs['symbol']['module'],
+            docs['symbol']['function'],
+            docs['generation'],
+        )
+        hovered_count, keys = self._hovered.get(view.id(), (None, {}))
+        if hovered_count != change_count:
+            keys = {}
+            self._hovered[view.id()] = (change_count, keys)
+        keys[region.a, region.b] = key
+
+        popup = self._get(key)
+        if popup is None:
+            popup = self._popups[key] = render_docs(docs)
+            if len(self._popups) > self.size:
+                self._popups.popitem(last=False)
+        return popup
+
+    def forget(self, view):
+        self._hovered.pop(view.id(), None)
+
+    def _get(self, key):
+        popup = self._popups.get(key)
+        if popup is not None:
+            self._popups.move_to_end(key)
+        return popup
+
+
+DOCS_POPUPS = DocsPopups()
+
+
+class HoverScheduler:
+    """
+    Asks for the docs of a hovered word once the pointer dwelled over it.
+
+    Hovering another word cancels the pending hover of the view, and docs
+    arriving once the pointer moved to another word are dropped.
+    """
+
+    def __init__(self, metrics=METRICS):
+        self.metrics = metrics
+        # view id -> (word region, token, whether it was sent)
+        self._hovers = {}
+
+    def schedule(self, view, region, delay, request):
+        """Calls `request(token)` if `region` is still hovered after `delay`"""
+        region = (region.a, region.b)
+        current = self._hovers.get(view.id())
+        if current is not None and current[0] == region:
+            return  # still the same hover
+
+        self.cancel(view)
+        token = object()
+        self._hovers[view.id()] = (region, token, False)
+        sublime.set_timeout(partial(self._send, view, token, request), delay)
+
+    def is_current(self, view, token):
+        current = self._hovers.get(view.id())
+        return current is not None and current[1] is token
+
+    def done(self, view, token):
+        """Ends the hover of `token`, returns whether it was still current"""
+        if not self.is_current(view, token):
+            self.metrics.add('docs', 'dropped')
+            return False
+        del self._hovers[view.id()]
+        return True
+
+    def fail(self, view, token):
+        """Ends the hover of `token` whose request failed"""
+        if self.is_current(view, token):
+            del self._hovers[view.id()]
+
+    def cancel(self, view):
+        current = self._hovers.pop(view.id(), None)
+        if current is not None and not current[2]:
+            self.metrics.add('docs', 'cancelled')
+
+    def _send(self, view, token, request):
+        if self.is_current(view, token):
+            region, token, _ = self._hovers[view.id()]
+            self._hovers[view.id()] = (region, token, True)
+            request(token)
+
+
+HOVERS = HoverScheduler()
+
+
+def render_docs(docs):
+    types = docs['docs']['types']
+    types = ''.join(re.compile(r'`([^`]+)`').findall(types))
+
+    return (
+        '<div>' +
+        types.replace('\n', '</div><div>') +
+        docs['docs']['docs'].replace('\n', '</div><div>') +
+        '</div>'
+    )
+
+
 class Autocomplete(sublime_plugin.EventListener):
 
+    # last completion session by view id
+    _sessions = {}
+
     def on_query_completions(self, view, prefix, locations):
         if not is_elixir(view):
             return
@@ -29,101 +267,126 @@ class Autocomplete(sublime_plugin.EventListener):
             location -= 1
             prefix = view.substr(view.word(location))
 
-        buffer, line, column = get_buffer_line_column(view, location)
-
-        sense = get_elixir_sense(view)
-        suggestions = sense.suggestions(buffer, line, column)
-
-        completions = []
-        hint = ''
-        for s in suggestions:
-            if s['type'] == 'hint':
-                hint = s['value']
-                continue
-
-            if param_auto_completion and s['name'] != prefix:
-                continue
-
-            if hint.startswith(s['name']):
-                s['name'] = hint
-
-            c = {
-                'name': s['name'],
-                'show': s['name'],
-                'hint': (
-                    '%s %s' % (
-                        s.get('origin', ''),
-                        s['type'].replace('_', ' ')
-                    )
-                ).strip(),
-                'completion': s['name'],
-            }
-
-            if self._is_function(s):
-                arity = s.get('arity')
-                args = s.get('args', '').split(',')
-
-                if not args and arity:
-                    args = ['_'] * arity
-
-                completion_args = [
-                    '${%s:%s}' % (i, a) for i, a in enumerate(args, 1)
-                ]
-
-                if param_auto_completion:
-                    c['show'] = ', '.join(args)
-                    c['completion'] = ', '.join(completion_args)
-                else:
-                    c['show'] += '(' + ', '.join(args) + ')'
-                    c['completion'] += '(' + ', '.join(completion_args) + ')'
-
-            completions.append(c)
-
-        completions.sort(key=lambda c: (
-            len(c['name']) - len(c['name'].strip('_')),  # less underscores wins
-            c['name'],  # alphabetically
-        ))
-
-        completions = [
-            ['{show}\t{hint}'.format(**c), c['completion']]
-            for c in completions
-        ]
-        return (
-            completions,
-            sublime.INHIBIT_WORD_COMPLETIONS |
-            sublime.INHIBIT_EXPLICIT_COMPLETIONS
-        )
+        session = self._sessions.get(view.id())
+        if session and session.covers(
+                view, location, prefix, param_auto_completion):
+            return (session.completions(prefix), COMPLETION_FLAGS)
 
-    def _is_function(self, suggestion):
-        return (
-            suggestion['type'].endswith('function') or
-            suggestion['type'] == 'macro'
+        session = self._sessions[view.id()] = CompletionSession(
+            view, location, prefix, param_auto_completion
         )
+        buffer, line, column = get_document_line_column(view, location)
+        max_results = get_settings_param(view, 'max_suggestions', 200)
 
-    def on_hover(self, view, point, hover_zone):
-        if hover_zone == sublime.HOVER_TEXT and is_elixir(view):
+        def query(sense):
+            return sense.suggestions(
+                buffer, line, column, max_results=max_results
+            )
+
+        if hasattr(sublime, 'CompletionList'):
+            completion_list = sublime.CompletionList()
+
+            def complete(result):
+                session.set_result(result)
+                completion_list.set_completions(
+                    session.completions(prefix), COMPLETION_FLAGS
+                )
+
+            query_sense(view, 'suggestions', query, complete)
+            return completion_list
 
-            buffer, line, column = get_buffer_line_column(view, point)
-            sense = get_elixir_sense(view)
-            docs = sense.docs(buffer, line, column)
+        # without CompletionList, `auto_complete` is triggered again once the
+        # suggestions arrive, and the session answers it
+        cursor = view.sel()[0].b
 
-            types = docs['docs']['types']
-            types = ''.join(re.compile(r'`([^`]+)`').findall(types))
+        def show(result):
+            session.set_result(result)
+            if result is not None:
+                self._show_completions(view, cursor)
+
+        query_sense(view, 'suggestions', query, show)
+        return ([], COMPLETION_FLAGS)
+
+    def on_close(self, view):
+        self._sessions.pop(view.id(), None)
+        DOCS_POPUPS.forget(view)
+        HOVERS.cancel(view)
+
+    def on_post_text_command(self, view, command_name, args):
+        if command_name not in ('commit_completion', 'insert_best_completion'):
+            return
 
-            html = (
-                '<div>' +
-                types.replace('\n', '</div><div>') +
-                docs['docs']['docs'].replace('\n', '</div><div>') +
-                '</div>'
+        # remember the name completed and its module, they rank higher the
+        # next times
+        session = self._sessions.get(view.id())
+        if session and view.sel():
+            inserted = view.substr(
+                sublime.Region(session.token_start, view.sel()[0].b)
             )
+            name = re.match(r'[@:]?[\w?!]*', inserted).group()
+            if name:
+                RECENT_NAMES.add(name)
+                for suggestion in session.suggestions or ():
+                    if suggestion.get('name') == name and \
+                            suggestion.get('origin'):
+                        RECENT_ORIGINS.add(suggestion['origin'])
+                        break
+
+    def _show_completions(self, view, cursor):
+        if not view.sel() or view.sel()[0].b != cursor:
+            return  # the cursor moved, the completions are stale
+
+        view.run_command('hide_auto_complete')
+        view.run_command('auto_complete', {
+            'disable_auto_insert': True,
+            'api_completions_only': True,
+            'next_completion_if_showing': False,
+        })
 
-            view.show_popup(
-                html,
-                flags=sublime.HIDE_ON_MOUSE_MOVE_AWAY,
-                location=point,
-                max_width=1024,
+    def on_hover(self, view, point, hover_zone):
+        if hover_zone != sublime.HOVER_TEXT or not is_elixir(view):
+            return
+
+        region = view.word(point)
+        popup = DOCS_POPUPS.hovered(view, region)
+        if popup is not None:
+            HOVERS.cancel(view)
+            self._show_popup(view, point, popup)
+            return
+
+        def request(token):
+            change_count = view.change_count()
+            try:
+                buffer, line, column = get_document_line_column(view, point)
+            except Exception:
+                HOVERS.fail(view, token)
+                raise
+
+            def show(docs):
+                if HOVERS.done(view, token) and docs:
+                    self._show_popup(view, point, DOCS_POPUPS.render(
+                        view, change_count, region, docs
+                    ))
+
+            query_sense(
+                view, 'docs',
+                lambda sense: sense.docs(buffer, line, column),
+                show,
+                on_failed=partial(HOVERS.fail, view, token),
             )
 
+        HOVERS.schedule(view, region, get_settings_param(
+            view, 'docs_hover_delay', DOCS_HOVER_DELAY
+        ), request)
+
+    def _show_popup(self, view, point, html):
+        view.show_popup(
+            html,
+            flags=sublime.HIDE_ON_MOUSE_MOVE_AWAY,
+            location=point,
+            max_width=1024,
+        )
+
 
 class SuperElixirParamsAutocomplete(sublime_plugin.TextCommand):
 
@@ -0,0 +1,117 @@
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from functools import partial
+
+import sublime
+
+from .sense_client import get_elixir_sense
+from .metrics import METRICS
+
+
+WORKERS = 4
+
+
+class LatestWinsQueue:
+    """
+    Runs jobs on worker threads, keeping only the latest job for each key.
+
+    Submitting a job drops the pending one with the same key, and the result
+    of a job that was superseded while running is never delivered. What
+    happens to the jobs is counted in `metrics` by their kind.
+    """
+
+    def __init__(self, workers=WORKERS, metrics=METRICS):
+        self.metrics = metrics
+        self._jobs = OrderedDict()
+        self._generations = {}
+        self._condition = threading.Condition()
+        for _ in range(workers):
+            worker = threading.Thread(target=self._work)
+            worker.daemon = True
+            worker.start()
+
+    def submit(self, key, job, on_done, kind='job', on_failed=None):
+        """
+        Runs `job()` in background and `on_done(result)` in the UI thread,
+        or `on_failed()` if it raised or its result is never delivered.
+        """
+        self.metrics.add(kind, 'submitted')
+        with self._condition:
+            generation = self._generations.get(key, 0) + 1
+            self._generations[key] = generation
+            superseded = self._jobs.pop(key, None)
+            self._jobs[key] = (generation, job, on_done, kind, on_failed)
+            self._condition.notify()
+        if superseded is not None:
+            self.metrics.add(superseded[3], 'superseded')
+            self._failed(superseded[4])
+
+    def is_current(self, key, generation):
+        with self._condition:
+            return self._generations.get(key) == generation
+
+    def _work(self):
+        while True:
+            with self._condition:
+                while not self._jobs:
+                    self._condition.wait()
+                key, (generation, job, on_done, kind, on_failed) = \
+                    self._jobs.popitem(last=False)
+
+            started = time.monotonic()
+            try:
+                result = job()
+            except Exception:
+                traceback.print_exc()
+                self.metrics.add(kind, 'failed')
+                self._failed(on_failed)
+                continue
+            finally:
+                elapsed = time.monotonic() - started
+                self.metrics.add(kind, 'time', elapsed)
+
+            if self.is_current(key, generation):
+                sublime.set_timeout(partial(
+                    self._deliver, key, generation, on_done, result, kind,
+                    elapsed, on_failed
+                ), 0)
+            else:
+                self._discard(kind, elapsed, on_failed)
+
+    def _deliver(
+            self, key, generation, on_done, result, kind, elapsed, on_failed):
+        if self.is_current(key, generation):
+            self.metrics.add(kind, 'delivered')
+            on_done(result)
+        else:
+            self._discard(kind, elapsed, on_failed)
+
+    def _discard(self, kind, elapsed, on_failed):
+        self.metrics.add(kind, 'stale')
+        self.metrics.add(kind, 'wasted_time', elapsed)
+        self._failed(on_failed)
+
+    def _failed(self, on_failed):
+        if on_failed is not None:
+            sublime.set_timeout(on_failed, 0)
+
+
+QUEUE = LatestWinsQueue()
+
+
+def query_sense(view, kind, call, on_done, on_failed=None):
+    """
+    Runs `call(sense)` off the UI thread for the elixir_sense of `view`.
+
+    A newer query of the same `kind` on the same view drops this one.
+    `on_failed()` is called instead of `on_done` if the call raised or was
+    dropped.
+    """
+    def job():
+        sense = get_elixir_sense(view)
+        if sense is not None:
+            return call(sense)
+
+    QUEUE.submit((view.id(), kind), job, on_done, kind, on_failed)
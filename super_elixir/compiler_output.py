@@ -0,0 +1,179 @@
+"""
+Parser of the errors and warnings in the output of the Elixir compiler.
+
+The output is read once, a line at a time, by a state machine. Each line is
+looked at a bounded number of times, so parsing takes time linear in the
+size of the output, whatever the stack traces in it.
+
+Error formats:
+
+1) Error type 1:
+|== Compilation error on file {filename} ==
+|** ({error_name}) {filename}:{line}: {message}
+
+2) Error type 2, the line is the first one of the trace in the file:
+|== Compilation error on file {filename} ==
+|** ({error_name}) {message}
+|    (libname) {other_filename}:{line}: ...
+|    {function_name}()
+|    {filename}:{line}: ...
+
+3) Error type 3:
+|** ({error_name}) {filename}:{line}: {message}
+|...<trace lines>...
+
+Warning formats:
+
+1) Warning type 1:
+|{filename}:{line}: warning: {message}
+
+2) Warning type 2, the message can span several lines:
+|warning: {message}
+|  {filename}:{line}
+
+Locations can also have a column, as `{filename}:{line}:{column}`, and
+the filename a drive, as `c:/{filename}` on Windows.
+"""
+import re
+
+
+ERROR_HEADER_RE = re.compile(r'== Compilation error (?:on|in) file (.+) ==$')
+LOCATION_RE = re.compile(
+    r'(?P<file>(?:[A-Za-z]:)?[^:\s][^:]*):(?P<line>\d+)'
+    r'(?::(?P<column>\d+))?(?::\s*(?P<rest>.*))?$'
+)
+DEPENDENCY_RE = re.compile(r'\([\w.]+\) ')
+
+MAX_MESSAGE_LINES = 10
+
+IDLE, HEADER, TRACE, WARNING = range(4)
+
+
+def parse_location(text):
+    """`(file, line, column, rest)` of `text` starting with a location"""
+    match = LOCATION_RE.match(text)
+    if match is None:
+        return None
+    column = match.group('column')
+    return (
+        match.group('file'),
+        int(match.group('line')),
+        int(column) if column else None,
+        match.group('rest'),
+    )
+
+
+def diagnostic(file, line, column, severity, message):
+    return {
+        'file': file,
+        'line': line,
+        'column': column,
+        'severity': severity,
+        'message': message.strip(),
+    }
+
+
+def parse(lines):
+    """
+    Yields the diagnostics of every file in `lines` of compiler output, as
+    they are found. `lines` can be any iterable, like a stream.
+    """
+    state = IDLE
+    file = None
+    message = None
+    message_lines = []
+
+    for line in lines:
+        line = line.rstrip('\r\n')
+
+        if state == HEADER:
+            state = IDLE
+            if line.startswith('** ('):
+                _name, _, rest = line.partition(') ')
+                location = parse_location(rest)
+                if location is not None and location[3] is not None:
+                    yield diagnostic(
+                        location[0], location[1], location[2], 'error',
+                        location[3]
+                    )
+                else:
+                    message = rest
+                    state = TRACE
+                continue
+
+        elif state == TRACE:
+            if line[:1].isspace():
+                if file is not None and file not in line:
+                    continue
+                text = line.strip()
+                dependency = DEPENDENCY_RE.match(text)
+                location = parse_location(
+                    text[dependency.end():] if dependency else text
+                )
+                if location is not None and (
+                        location[0] == file or
+                        file is None and dependency is None):
+                    yield diagnostic(
+                        location[0], location[1], location[2], 'error',
+                        message
+                    )
+                    state = IDLE
+                continue
+            # no line of the trace was in the file
+            if file is not None:
+                yield diagnostic(file, None, None, 'error', message)
+            state = IDLE
+
+        elif state == WARNING:
+            location = (
+                parse_location(line[2:]) if line.startswith('  ') else None
+            )
+            if location is not None:
+                yield diagnostic(
+                    location[0], location[1], location[2], 'warning',
+                    ' '.join(message_lines)
+                )
+                state = IDLE
+                continue
+            if line.strip() and len(message_lines) < MAX_MESSAGE_LINES:
+                message_lines.append(line.strip())
+                continue
+            state = IDLE
+
+        # IDLE, or a line that ended the previous state
+        if line.startswith('== '):
+            header = ERROR_HEADER_RE.match(line)
+            if header is not None:
+                file = header.group(1)
+                state = HEADER
+        elif line.startswith('** ('):
+            _name, _, rest = line.partition(') ')
+            location = parse_location(rest)
+            if location is not None and location[3] is not None:
+                yield diagnostic(
+                    location[0], location[1], location[2], 'error',
+                    location[3]
+                )
+            else:
+                file = None
+                message = rest
+                state = TRACE
+        elif line.startswith('warning: '):
+            message_lines = [line[len('warning: '):]]
+            state = WARNING
+        elif ': warning: ' in line:
+            location = parse_location(line)
+            if location is not None and location[3] is not None and \
+                    location[3].startswith('warning: '):
+                yield diagnostic(
+                    location[0], location[1], location[2], 'warning',
+                    location[3][len('warning: '):]
+                )
+
+    if state == TRACE and file is not None:
+        yield diagnostic(file, None, None, 'error', message)
+
+
+def parse_output(output):
+    """The diagnostics of every file in the compiler output `output`"""
+    return list(parse((output or '').splitlines()))
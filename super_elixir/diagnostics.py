@@ -0,0 +1,139 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import sublime
+
+from .metrics import METRICS
+from .utils import find_mix_project
+
+
+DIAGNOSTICS_CACHE_SIZE = 256
+
+PROJECTS = {}
+_projects_lock = threading.Lock()
+
+
+def content_hash(code):
+    return hashlib.sha1(code.encode('utf-8')).hexdigest()
+
+
+class DiagnosticList(list):
+    """
+    Diagnostics returned as the output of a linter, printed like the
+    compiler output by SublimeLinter in debug mode.
+    """
+
+    def replace(self, old, new):
+        return str(self).replace(old, new)
+
+    def __str__(self):
+        return '\n'.join(
+            '%(file)s:%(line)s: %(severity)s: %(message)s' % diagnostic
+            for diagnostic in self
+        )
+
+
+class ProjectDiagnostics:
+    """
+    Diagnostics of the files of a mix project.
+
+    The project is compiled once per generation, a new generation starts
+    when a file is saved after the last compile. Its diagnostics are kept by
+    file and handed to every open view of the project, the first lint of a
+    saved file compiles and the lints of the other views wait for it.
+
+    The diagnostics of edited buffers are cached by file and content hash,
+    so linting a buffer again without changing it is free. A new generation
+    clears them, as changes to a file can fix or break the others.
+    """
+
+    def __init__(self, project_path, size=DIAGNOSTICS_CACHE_SIZE):
+        self.project_path = project_path
+        self.size = size
+        self.generation = 0
+        self._compile_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._compiled_at = None
+        self._compiled = {}
+        self._cache = OrderedDict()
+
+    def cached(self, filename, digest):
+        with self._lock:
+            diagnostics = self._cache.get((filename, digest))
+            if diagnostics is not None:
+                self._cache.move_to_end((filename, digest))
+        METRICS.add(
+            'diagnostics', 'misses' if diagnostics is None else 'hits'
+        )
+        return diagnostics
+
+    def store(self, filename, digest, diagnostics):
+        with self._lock:
+            self._cache[filename, digest] = diagnostics
+            if len(self._cache) > self.size:
+                self._cache.popitem(last=False)
+
+    def is_stale(self, filename):
+        """Whether `filename` was saved after the last compile"""
+        try:
+            modified = os.path.getmtime(filename)
+        except OSError:
+            return True
+        return self._compiled_at is None or modified > self._compiled_at
+
+    def compile(self, filename, compile, parse):
+        """
+        Diagnostics of `filename` from the compile of the current generation,
+        runs `compile` and groups what `parse` finds in its output by file
+        when `filename` is newer than the last compile.
+        Returns them and whether a compile was run.
+        """
+        with self._compile_lock:
+            if not self.is_stale(filename):
+                return self._compiled.get(filename, []), False
+
+            started_at = time.time()
+            compiled = {}
+            for diagnostic in parse(compile()):
+                path = os.path.normpath(
+                    os.path.join(self.project_path, diagnostic['file'])
+                )
+                compiled.setdefault(path, []).append(diagnostic)
+            METRICS.add('diagnostics', 'compiles')
+            METRICS.add(
+                'diagnostics', 'compile_time', time.time() - started_at
+            )
+
+            with self._lock:
+                self.generation += 1
+                self._compiled_at = started_at
+                self._compiled = compiled
+                self._cache.clear()
+            return compiled.get(filename, []), True
+
+    def relint_views(self, except_view):
+        """Lints again the saved views of the project with the new results"""
+        sublime.set_timeout(lambda: self._relint_views(except_view.id()), 0)
+
+    def _relint_views(self, except_view_id):
+        for window in sublime.windows():
+            for view in window.views():
+                if (
+                    view.id() != except_view_id and
+                    (view.file_name() or '').endswith('.ex') and
+                    not view.is_dirty() and
+                    find_mix_project(view.file_name()) == self.project_path
+                ):
+                    METRICS.add('diagnostics', 'fan_out')
+                    view.run_command('sublimelinter_lint')
+
+
+def project_diagnostics(project_path):
+    with _projects_lock:
+        project = PROJECTS.get(project_path)
+        if project is None:
+            project = PROJECTS[project_path] = ProjectDiagnostics(project_path)
+        return project
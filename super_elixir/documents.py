@@ -0,0 +1,79 @@
+import sublime
+import sublime_plugin
+
+from .sense_client import find_elixir_sense
+from .utils import is_elixir
+
+
+def get_document_line_column(view, point=None):
+    """
+    Like `utils.get_buffer_line_column`, but when elixir_sense is running
+    the buffer is synchronized with it and a `(file_id, version)` reference
+    is returned instead of the whole text.
+    """
+    if point is None:
+        point = view.sel()[0].a
+    line, column = view.rowcol(point)
+    return get_document(view), line + 1, column + 1
+
+
+def get_document(view):
+    sense = find_elixir_sense(view)
+    if sense is None:
+        return view.substr(sublime.Region(0, view.size()))
+
+    file_id = view.file_name()
+    version = view.change_count()
+    if sense.document_version(file_id) != version:
+        buffer = view.substr(sublime.Region(0, view.size()))
+        sense.open_document(file_id, version, buffer)
+    return (file_id, version)
+
+
+class DocumentListener(sublime_plugin.EventListener):
+
+    def on_close(self, view):
+        if is_elixir(view):
+            sense = find_elixir_sense(view)
+            if sense is not None:
+                sense.close_document(view.file_name())
+
+
+if hasattr(sublime_plugin, 'TextChangeListener'):
+
+    class DocumentChangeListener(sublime_plugin.TextChangeListener):
+        """Sends the edits of opened documents as they happen"""
+
+        @classmethod
+        def is_applicable(cls, buffer):
+            view = buffer.primary_view()
+            return view is not None and is_elixir(view)
+
+        def on_text_changed(self, changes):
+            view = self.buffer.primary_view()
+            sense = find_elixir_sense(view)
+            if sense is None:
+                return
+
+            # callbacks are batched and delayed, the view may already be at
+            # a later version than the one these changes made
+            file_id = view.file_name()
+            in_sync = sense.change_document(
+                file_id,
+                changes[0].a.change_count,
+                changes[-1].b.change_count,
+                [
+                    {
+                        'start': [change.a.row, change.a.col],
+                        'end': [change.b.row, change.b.col],
+                        'text': change.str,
+                    }
+                    for change in changes
+                ]
+            )
+            if not in_sync:
+                # some edits were missed, the whole text is sent instead
+                sense.open_document(
+                    file_id, view.change_count(),
+                    view.substr(sublime.Region(0, view.size()))
+                )
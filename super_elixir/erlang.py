@@ -170,27 +170,9 @@ class OtpErlangList(object):
         self.value = value
         self.improper = improper # no empty list tail?
     def binary(self):
-        if type(self.value) == list:
-            length = len(self.value)
-            if length == 0:
-                return b_chr(_TAG_NIL_EXT)
-            elif length > 4294967295:
-                raise OutputException('uint32 overflow')
-            elif self.improper:
-                return (b_chr(_TAG_LIST_EXT) +
-                    struct.pack(b'>I', length - 1) +
-                    b''.join([_term_to_binary(element)
-                              for element in self.value])
-                )
-            else:
-                return (b_chr(_TAG_LIST_EXT) +
-                    struct.pack(b'>I', length) +
-                    b''.join([_term_to_binary(element)
-                              for element in self.value]) +
-                    b_chr(_TAG_NIL_EXT)
-                )
-        else:
-            raise OutputException('unknown list type')
+        out = bytearray()
+        _encode_otp_list(self, out)
+        return bytes(out)
     def __repr__(self):
         return '%s(%s,improper=%s)' % (
             self.__class__.__name__, repr(self.value), repr(self.improper)
@@ -246,7 +228,7 @@ class OtpErlangReference(object):
         self.id = id
         self.creation = creation
     def binary(self):
-        length = len(self.id) / 4
+        length = len(self.id) // 4
         if length == 0:
             return (b_chr(_TAG_REFERENCE_EXT) +
                 self.node.binary() + self.id + self.creation
@@ -313,16 +295,38 @@ class frozendict(dict):
 
 # core functionality
 
-def binary_to_term(data):
-    if type(data) != bytes:
+def binary_to_term(data, native=False):
+    """
+    With native=True binaries are decoded as str, atoms as str (or None,
+    True and False for nil, true and false) and lists and map values
+    recursively the same way, in a single pass.
+    """
+    if not isinstance(data, (bytes, bytearray, memoryview)):
         raise ParseException('not bytes input')
+    if type(data) != bytes:
+        # decoded terms must not share memory with a (reusable) buffer, and
+        # slicing values out of bytes is faster than out of a memoryview
+        data = bytes(data)
     size = len(data)
     if size <= 1:
         raise ParseException('null input')
-    if b_ord(data[0]) != _TAG_VERSION:
+    if data[0] != _TAG_VERSION:
         raise ParseException('invalid version')
+    decoders = native and _NATIVE_DECODERS or _DECODERS
     try:
-        i, term = _binary_to_term(1, data)
+        if data[1] == _TAG_COMPRESSED_ZLIB:
+            size_uncompressed = _UINT32.unpack_from(data, 2)[0]
+            if size_uncompressed == 0:
+                raise ParseException('compressed data null')
+            data = zlib.decompress(data[6:])
+            if size_uncompressed != len(data):
+                raise ParseException('compression corrupt')
+            size = size_uncompressed
+            i, term = _decode(0, data, decoders)
+        else:
+            i, term = _decode(1, data, decoders)
+        if i > size:
+            raise ParseException('missing data')
         if i != size:
             raise ParseException('unparsed data')
         return term
@@ -331,397 +335,556 @@ def binary_to_term(data):
     except IndexError:
         raise ParseException('missing data')
 
-def term_to_binary(term, compressed=False):
-    data_uncompressed = _term_to_binary(term)
+def term_to_binary(term, compressed=False, buffer=None):
+    """
+    The term is encoded into a single growing bytearray. When `buffer` (a
+    bytearray) is given the encoding is appended to it and the buffer is
+    returned, otherwise the encoding is returned as bytes.
+    """
     if compressed is False:
-        return b_chr(_TAG_VERSION) + data_uncompressed
+        out = bytearray() if buffer is None else buffer
+        out.append(_TAG_VERSION)
+        _encode(term, out)
+        return bytes(out) if buffer is None else out
     else:
         if compressed is True:
             compressed = 6
         if compressed < 0 or compressed > 9:
             raise InputException('compressed in [0..9]')
+        data_uncompressed = bytearray()
+        _encode(term, data_uncompressed)
         data_compressed = zlib.compress(data_uncompressed, compressed)
         size_uncompressed = len(data_uncompressed)
         if size_uncompressed > 4294967295:
             raise OutputException('uint32 overflow')
-        return (
-            b_chr(_TAG_VERSION) + b_chr(_TAG_COMPRESSED_ZLIB) +
-            struct.pack(b'>I', size_uncompressed) + data_compressed
-        )
+        out = bytearray() if buffer is None else buffer
+        out.append(_TAG_VERSION)
+        out.append(_TAG_COMPRESSED_ZLIB)
+        out += _UINT32.pack(size_uncompressed)
+        out += data_compressed
+        return bytes(out) if buffer is None else out
 
 # binary_to_term implementation functions
 
-def _binary_to_term(i, data):
-    tag = b_ord(data[i])
-    i += 1
-    if tag == _TAG_NEW_FLOAT_EXT:
-        return (i + 8, struct.unpack(b'>d', data[i:i + 8])[0])
-    elif tag == _TAG_BIT_BINARY_EXT:
-        j = struct.unpack(b'>I', data[i:i + 4])[0]
-        i += 4
-        bits = b_ord(data[i])
-        i += 1
-        return (i + j, OtpErlangBinary(data[i:i + j], bits))
-    elif tag == _TAG_ATOM_CACHE_REF:
-        return (i + 1, OtpErlangAtom(b_ord(data[i:i + 1])))
-    elif tag == _TAG_SMALL_INTEGER_EXT:
-        return (i + 1, b_ord(data[i]))
-    elif tag == _TAG_INTEGER_EXT:
-        return (i + 4, struct.unpack(b'>i', data[i:i + 4])[0])
-    elif tag == _TAG_FLOAT_EXT:
-        value = float(data[i:i + 31].partition(b_chr(0))[0])
-        return (i + 31, value)
-    elif tag == _TAG_ATOM_EXT:
-        j = struct.unpack(b'>H', data[i:i + 2])[0]
-        i += 2
-        return (i + j, OtpErlangAtom(data[i:i + j]))
-    elif tag == _TAG_REFERENCE_EXT or tag == _TAG_PORT_EXT:
-        i, node = _binary_to_atom(i, data)
-        id = data[i:i + 4]
-        i += 4
-        creation = data[i:i + 1]
-        i += 1
-        if tag == _TAG_REFERENCE_EXT:
-            return (i, OtpErlangReference(node, id, creation))
-        elif tag == _TAG_PORT_EXT:
-            return (i, OtpErlangPort(node, id, creation))
-    elif tag == _TAG_PID_EXT:
-        i, node = _binary_to_atom(i, data)
-        id = data[i:i + 4]
-        i += 4
-        serial = data[i:i + 4]
-        i += 4
-        creation = data[i:i + 1]
-        i += 1
-        return (i, OtpErlangPid(node, id, serial, creation))
-    elif tag == _TAG_SMALL_TUPLE_EXT or tag == _TAG_LARGE_TUPLE_EXT:
-        if tag == _TAG_SMALL_TUPLE_EXT:
-            length = b_ord(data[i])
-            i += 1
-        elif tag == _TAG_LARGE_TUPLE_EXT:
-            length = struct.unpack(b'>I', data[i:i + 4])[0]
-            i += 4
-        i, tmp = _binary_to_term_sequence(i, length, data)
-        return (i, tuple(tmp))
-    elif tag == _TAG_NIL_EXT:
-        return (i, [])
-    elif tag == _TAG_STRING_EXT:
-        j = struct.unpack(b'>H', data[i:i + 2])[0]
-        i += 2
-        return (i + j, data[i:i + j])
-    elif tag == _TAG_LIST_EXT:
-        length = struct.unpack(b'>I', data[i:i + 4])[0]
-        i += 4
-        i, tmp = _binary_to_term_sequence(i, length, data)
-        i, tail = _binary_to_term(i, data)
-        if type(tail) != list or tail != []:
-            tmp.append(tail)
-            tmp = OtpErlangList(tmp, improper=True)
-        return (i, tmp)
-    elif tag == _TAG_BINARY_EXT:
-        j = struct.unpack(b'>I', data[i:i + 4])[0]
-        i += 4
-        return (i + j, OtpErlangBinary(data[i:i + j], 8))
-    elif tag == _TAG_SMALL_BIG_EXT or tag == _TAG_LARGE_BIG_EXT:
-        if tag == _TAG_SMALL_BIG_EXT:
-            j = b_ord(data[i])
-            i += 1
-        elif tag == _TAG_LARGE_BIG_EXT:
-            j = struct.unpack(b'>I', data[i:i + 4])[0]
-            i += 4
-        sign = b_ord(data[i])
-        bignum = 0
-        for bignum_index in range(j):
-            digit = b_ord(data[i + j - bignum_index])
-            bignum = bignum * 256 + int(digit)
-        if sign == 1:
-            bignum *= -1
-        i += 1
-        return (i + j, bignum)
-    elif tag == _TAG_NEW_FUN_EXT:
-        length = struct.unpack(b'>I', data[i:i + 4])[0]
-        return (i + length, OtpErlangFunction(tag, data[i:i + length]))
-    elif tag == _TAG_EXPORT_EXT:
-        old_i = i
-        i, module = _binary_to_atom(i, data)
-        i, function = _binary_to_atom(i, data)
-        if b_ord(data[i]) != _TAG_SMALL_INTEGER_EXT:
-            raise ParseException('invalid small integer tag')
-        i += 1
-        arity = b_ord(data[i])
-        i += 1
-        return (i, OtpErlangFunction(tag, data[old_i:i]))
-    elif tag == _TAG_NEW_REFERENCE_EXT:
-        j = struct.unpack(b'>H', data[i:i + 2])[0] * 4
-        i += 2
-        i, node = _binary_to_atom(i, data)
-        creation = data[i:i + 1]
-        i += 1
-        return (i + j, OtpErlangReference(node, data[i: i + j], creation))
-    elif tag == _TAG_SMALL_ATOM_EXT:
-        j = b_ord(data[i])
-        i += 1
-        atom_name = data[i:i + j]
-        if atom_name == b'true':
-            tmp = True
-        elif atom_name == b'false':
-            tmp = False
-        elif atom_name == b'nil':
-            tmp = None
+_UINT16 = struct.Struct(b'>H')
+_UINT32 = struct.Struct(b'>I')
+_INT32 = struct.Struct(b'>i')
+_DOUBLE = struct.Struct(b'>d')
+
+_LIST = 0
+_MAP = 1
+_TUPLE = 2
+_NO_TERM = object()
+
+def _decode(i, data, decoders):
+    # Terms without elements are decoded by the function registered for their
+    # tag in `decoders`. Lists, maps and tuples are filled in a loop, from an
+    # explicit stack of frames [kind, elements, missing elements, decoders,
+    # map key], so deeply nested terms do not hit the recursion limit.
+    decoder = decoders[data[i]]
+    if decoder is not None:
+        return decoder(i + 1, data)
+
+    stack = []
+    term = _NO_TERM  # a complete container for the frame on top
+    while True:
+        if term is _NO_TERM:
+            i, frame = _decode_container(i, data, decoders)
+            stack.append(frame)
+        kind, elements, missing, decoders, key = stack[-1]
+
+        if kind == _MAP:
+            while missing:
+                if term is _NO_TERM:
+                    decoder = decoders[data[i]]
+                    if decoder is None:
+                        break
+                    i, term = decoder(i + 1, data)
+                if key is _NO_TERM:
+                    if type(term) == dict:
+                        key = frozendict(term)
+                    elif type(term) == list:
+                        key = OtpErlangList(term)
+                    else:
+                        key = term
+                else:
+                    elements[key] = term
+                    key = _NO_TERM
+                    missing -= 1
+                term = _NO_TERM
+        elif kind == _LIST:
+            while missing:
+                if term is _NO_TERM:
+                    decoder = decoders[data[i]]
+                    if decoder is None:
+                        break
+                    i, term = decoder(i + 1, data)
+                missing -= 1
+                if missing:
+                    elements.append(term)
+                elif type(term) != list or term != []:
+                    elements.append(term)
+                    elements = OtpErlangList(elements, improper=True)
+                term = _NO_TERM
         else:
-            tmp = OtpErlangAtom(atom_name)
-        return (i + j, tmp)
+            while missing:
+                if term is _NO_TERM:
+                    decoder = decoders[data[i]]
+                    if decoder is None:
+                        break
+                    i, term = decoder(i + 1, data)
+                elements.append(term)
+                missing -= 1
+                term = _NO_TERM
+
+        if missing:
+            # the next element is a container, save the frame and go into it
+            frame = stack[-1]
+            frame[2] = missing
+            frame[4] = key
+            continue
+
+        stack.pop()
+        term = tuple(elements) if kind == _TUPLE else elements
+        if not stack:
+            return (i, term)
+
+def _decode_container(i, data, decoders):
+    tag = data[i]
+    i += 1
+    if tag == _TAG_LIST_EXT:
+        # the elements and the tail
+        length = _UINT32.unpack_from(data, i)[0] + 1
+        return (i + 4, [_LIST, [], length, decoders, _NO_TERM])
     elif tag == _TAG_MAP_EXT:
-        length = struct.unpack(b'>I', data[i:i + 4])[0]
-        i += 4
-        pairs = {}
-        for length_index in range(length):
-            i, key = _binary_to_term(i, data)
-            i, value = _binary_to_term(i, data)
-            if type(key) == dict:
-                pairs[frozendict(key)] = value
-            elif type(key) == list:
-                pairs[OtpErlangList(key)] = value
-            else:
-                pairs[key] = value
-        return (i, pairs)
-    elif tag == _TAG_FUN_EXT:
-        old_i = i
-        numfree = struct.unpack(b'>I', data[i:i + 4])[0]
-        i += 4
-        i, pid = _binary_to_pid(i, data)
-        i, module = _binary_to_atom(i, data)
-        i, index = _binary_to_integer(i, data)
-        i, uniq = _binary_to_integer(i, data)
-        i, free = _binary_to_term_sequence(i, numfree, data)
-        return (i, OtpErlangFunction(tag, data[old_i:i]))
-    elif tag == _TAG_ATOM_UTF8_EXT:
-        j = struct.unpack(b'>H', data[i:i + 2])[0]
-        i += 2
-        atom_name = unicode(data[i:i + j], encoding='utf-8', errors='strict')
-        return (i + j, OtpErlangAtom(atom_name))
-    elif tag == _TAG_SMALL_ATOM_UTF8_EXT:
-        j = b_ord(data[i:i + 1])
+        length = _UINT32.unpack_from(data, i)[0]
+        return (i + 4, [_MAP, {}, length, decoders, _NO_TERM])
+    elif tag == _TAG_SMALL_TUPLE_EXT:
+        # tuple elements are always decoded as Erlang types
+        return (i + 1, [_TUPLE, [], data[i], _DECODERS, _NO_TERM])
+    else:
+        length = _UINT32.unpack_from(data, i)[0]
+        return (i + 4, [_TUPLE, [], length, _DECODERS, _NO_TERM])
+
+def _decode_new_float(i, data):
+    return (i + 8, _DOUBLE.unpack_from(data, i)[0])
+
+def _decode_bit_binary(i, data):
+    j = _UINT32.unpack_from(data, i)[0]
+    bits = data[i + 4]
+    i += 5
+    return (i + j, OtpErlangBinary(data[i:i + j], bits))
+
+def _decode_atom_cache_ref(i, data):
+    return (i + 1, OtpErlangAtom(data[i]))
+
+def _decode_small_integer(i, data):
+    return (i + 1, data[i])
+
+def _decode_integer(i, data, unpack_from=_INT32.unpack_from):
+    return (i + 4, unpack_from(data, i)[0])
+
+def _decode_float(i, data):
+    value = float(data[i:i + 31].partition(b_chr(0))[0])
+    return (i + 31, value)
+
+def _decode_atom(i, data):
+    j = _UINT16.unpack_from(data, i)[0]
+    i += 2
+    return (i + j, OtpErlangAtom(data[i:i + j]))
+
+def _decode_reference_or_port(i, data):
+    tag = data[i - 1]
+    i, node = _decode_node(i, data)
+    id = data[i:i + 4]
+    creation = data[i + 4:i + 5]
+    i += 5
+    if tag == _TAG_REFERENCE_EXT:
+        return (i, OtpErlangReference(node, id, creation))
+    else:
+        return (i, OtpErlangPort(node, id, creation))
+
+def _decode_pid(i, data):
+    i, node = _decode_node(i, data)
+    id = data[i:i + 4]
+    serial = data[i + 4:i + 8]
+    creation = data[i + 8:i + 9]
+    return (i + 9, OtpErlangPid(node, id, serial, creation))
+
+def _decode_nil(i, data):
+    return (i, [])
+
+def _decode_string(i, data):
+    j = _UINT16.unpack_from(data, i)[0]
+    i += 2
+    return (i + j, data[i:i + j])
+
+def _decode_binary(i, data, unpack_from=_UINT32.unpack_from):
+    j = unpack_from(data, i)[0]
+    i += 4
+    return (i + j, OtpErlangBinary(data[i:i + j], 8))
+
+def _decode_big(i, data):
+    if data[i - 1] == _TAG_SMALL_BIG_EXT:
+        j = data[i]
         i += 1
-        atom_name = unicode(data[i:i + j], encoding='utf-8', errors='strict')
-        return (i + j, OtpErlangAtom(atom_name))
-    elif tag == _TAG_COMPRESSED_ZLIB:
-        size_uncompressed = struct.unpack(b'>I', data[i:i + 4])[0]
-        if size_uncompressed == 0:
-            raise ParseException('compressed data null')
-        i += 4
-        data_compressed = data[i:]
-        j = len(data_compressed)
-        data_uncompressed = zlib.decompress(data_compressed)
-        if size_uncompressed != len(data_uncompressed):
-            raise ParseException('compression corrupt')
-        (i_new, term) = _binary_to_term(0, data_uncompressed)
-        if i_new != size_uncompressed:
-            raise ParseException('unparsed data')
-        return (i + j, term)
     else:
-        raise ParseException('invalid tag')
-
-def _binary_to_term_sequence(i, length, data):
-    sequence = []
-    for length_index in range(length):
-        i, element = _binary_to_term(i, data)
-        sequence.append(element)
-    return (i, sequence)
-
-# (binary_to_term Erlang term primitive type functions)
-
-def _binary_to_integer(i, data):
-    tag = b_ord(data[i])
+        j = _UINT32.unpack_from(data, i)[0]
+        i += 4
+    sign = data[i]
     i += 1
-    if tag == _TAG_SMALL_INTEGER_EXT:
-        return (i + 1, b_ord(data[i]))
-    elif tag == _TAG_INTEGER_EXT:
-        return (i + 4, struct.unpack(b'>i', data[i:i + 4])[0])
-    else:
-        raise ParseException('invalid integer tag')
+    if i + j > len(data):
+        raise IndexError()
+    bignum = int.from_bytes(data[i:i + j], 'little')
+    if sign == 1:
+        bignum *= -1
+    return (i + j, bignum)
+
+def _decode_new_fun(i, data):
+    length = _UINT32.unpack_from(data, i)[0]
+    return (i + length,
+            OtpErlangFunction(_TAG_NEW_FUN_EXT, data[i:i + length]))
+
+def _decode_export(i, data):
+    old_i = i
+    i, module = _decode_node(i, data)
+    i, function = _decode_node(i, data)
+    if data[i] != _TAG_SMALL_INTEGER_EXT:
+        raise ParseException('invalid small integer tag')
+    i += 2
+    return (i, OtpErlangFunction(_TAG_EXPORT_EXT, data[old_i:i]))
+
+def _decode_new_reference(i, data):
+    j = _UINT16.unpack_from(data, i)[0] * 4
+    i, node = _decode_node(i + 2, data)
+    creation = data[i:i + 1]
+    i += 1
+    return (i + j, OtpErlangReference(node, data[i:i + j], creation))
 
-def _binary_to_pid(i, data):
-    tag = b_ord(data[i])
+def _decode_small_atom(i, data):
+    j = data[i]
     i += 1
-    if tag == _TAG_PID_EXT:
-        i, node = _binary_to_atom(i, data)
-        id = data[i:i + 4]
-        i += 4
-        serial = data[i:i + 4]
-        i += 4
-        creation = data[i:i + 1]
-        i += 1
-        return (i, OtpErlangPid(node, id, serial, creation))
+    atom_name = data[i:i + j]
+    if atom_name == b'true':
+        tmp = True
+    elif atom_name == b'false':
+        tmp = False
+    elif atom_name == b'nil':
+        tmp = None
     else:
+        tmp = OtpErlangAtom(atom_name)
+    return (i + j, tmp)
+
+def _decode_fun(i, data):
+    old_i = i
+    numfree = _UINT32.unpack_from(data, i)[0]
+    i += 4
+    if data[i] != _TAG_PID_EXT:
         raise ParseException('invalid pid tag')
+    i, pid = _decode_pid(i + 1, data)
+    i, module = _decode_node(i, data)
+    for integer in ('index', 'uniq'):
+        tag = data[i]
+        if tag == _TAG_SMALL_INTEGER_EXT:
+            i += 2
+        elif tag == _TAG_INTEGER_EXT:
+            i += 5
+        else:
+            raise ParseException('invalid integer tag')
+    for free_index in range(numfree):
+        i, free = _decode(i, data, _DECODERS)
+    return (i, OtpErlangFunction(_TAG_FUN_EXT, data[old_i:i]))
+
+def _decode_atom_utf8(i, data):
+    j = _UINT16.unpack_from(data, i)[0]
+    i += 2
+    return (i + j, OtpErlangAtom(data[i:i + j].decode('utf-8')))
+
+def _decode_small_atom_utf8(i, data):
+    j = data[i]
+    i += 1
+    return (i + j, OtpErlangAtom(data[i:i + j].decode('utf-8')))
+
+def _decode_invalid(i, data):
+    raise ParseException('invalid tag')
 
-def _binary_to_atom(i, data):
-    tag = b_ord(data[i])
+def _decode_node(i, data):
+    # atoms in pids, ports, references and functions are never booleans
+    tag = data[i]
     i += 1
     if tag == _TAG_ATOM_EXT:
-        j = struct.unpack(b'>H', data[i:i + 2])[0]
-        i += 2
-        return (i + j, OtpErlangAtom(data[i:i + j]))
+        return _decode_atom(i, data)
     elif tag == _TAG_ATOM_CACHE_REF:
-        return (i + 1, OtpErlangAtom(b_ord(data[i:i + 1])))
+        return _decode_atom_cache_ref(i, data)
     elif tag == _TAG_SMALL_ATOM_EXT:
-        j = b_ord(data[i:i + 1])
+        j = data[i]
         i += 1
         return (i + j, OtpErlangAtom(data[i:i + j]))
     elif tag == _TAG_ATOM_UTF8_EXT:
-        j = struct.unpack(b'>H', data[i:i + 2])[0]
-        i += 2
-        atom_name = unicode(data[i:i + j], encoding='utf-8', errors='strict')
-        return (i + j, OtpErlangAtom(atom_name))
+        return _decode_atom_utf8(i, data)
     elif tag == _TAG_SMALL_ATOM_UTF8_EXT:
-        j = b_ord(data[i:i + 1])
-        i += 1
-        atom_name = unicode(data[i:i + j], encoding='utf-8', errors='strict')
-        return (i + j, OtpErlangAtom(atom_name))
+        return _decode_small_atom_utf8(i, data)
     else:
         raise ParseException('invalid atom tag')
 
+# decoder for each tag, None for lists, maps and tuples
+_DECODERS = [_decode_invalid] * 256
+_DECODERS[_TAG_NEW_FLOAT_EXT] = _decode_new_float
+_DECODERS[_TAG_BIT_BINARY_EXT] = _decode_bit_binary
+_DECODERS[_TAG_ATOM_CACHE_REF] = _decode_atom_cache_ref
+_DECODERS[_TAG_SMALL_INTEGER_EXT] = _decode_small_integer
+_DECODERS[_TAG_INTEGER_EXT] = _decode_integer
+_DECODERS[_TAG_FLOAT_EXT] = _decode_float
+_DECODERS[_TAG_ATOM_EXT] = _decode_atom
+_DECODERS[_TAG_REFERENCE_EXT] = _decode_reference_or_port
+_DECODERS[_TAG_PORT_EXT] = _decode_reference_or_port
+_DECODERS[_TAG_PID_EXT] = _decode_pid
+_DECODERS[_TAG_SMALL_TUPLE_EXT] = None
+_DECODERS[_TAG_LARGE_TUPLE_EXT] = None
+_DECODERS[_TAG_NIL_EXT] = _decode_nil
+_DECODERS[_TAG_STRING_EXT] = _decode_string
+_DECODERS[_TAG_LIST_EXT] = None
+_DECODERS[_TAG_BINARY_EXT] = _decode_binary
+_DECODERS[_TAG_SMALL_BIG_EXT] = _decode_big
+_DECODERS[_TAG_LARGE_BIG_EXT] = _decode_big
+_DECODERS[_TAG_NEW_FUN_EXT] = _decode_new_fun
+_DECODERS[_TAG_EXPORT_EXT] = _decode_export
+_DECODERS[_TAG_NEW_REFERENCE_EXT] = _decode_new_reference
+_DECODERS[_TAG_SMALL_ATOM_EXT] = _decode_small_atom
+_DECODERS[_TAG_MAP_EXT] = None
+_DECODERS[_TAG_FUN_EXT] = _decode_fun
+_DECODERS[_TAG_ATOM_UTF8_EXT] = _decode_atom_utf8
+_DECODERS[_TAG_SMALL_ATOM_UTF8_EXT] = _decode_small_atom_utf8
+
+# (binary_to_term native python type functions)
+
+_NATIVE_ATOMS = {
+    b'nil': None,
+    b'true': True,
+    b'false': False,
+}
+
+def _native_atom(name):
+    try:
+        return _NATIVE_ATOMS[name]
+    except KeyError:
+        atom = _NATIVE_ATOMS[name] = name.decode('utf-8')
+        return atom
+
+def _decode_native_binary(i, data, unpack_from=_UINT32.unpack_from):
+    j = unpack_from(data, i)[0]
+    i += 4
+    return (i + j, data[i:i + j].decode('utf-8'))
+
+def _decode_native_bit_binary(i, data):
+    j = _UINT32.unpack_from(data, i)[0]
+    i += 5
+    return (i + j, data[i:i + j].decode('utf-8'))
+
+def _decode_native_atom(i, data):
+    j = _UINT16.unpack_from(data, i)[0]
+    i += 2
+    return (i + j, _native_atom(data[i:i + j]))
+
+def _decode_native_small_atom(i, data):
+    j = data[i]
+    i += 1
+    return (i + j, _native_atom(data[i:i + j]))
+
+_NATIVE_DECODERS = list(_DECODERS)
+_NATIVE_DECODERS[_TAG_BINARY_EXT] = _decode_native_binary
+_NATIVE_DECODERS[_TAG_BIT_BINARY_EXT] = _decode_native_bit_binary
+_NATIVE_DECODERS[_TAG_ATOM_EXT] = _decode_native_atom
+_NATIVE_DECODERS[_TAG_ATOM_UTF8_EXT] = _decode_native_atom
+_NATIVE_DECODERS[_TAG_SMALL_ATOM_EXT] = _decode_native_small_atom
+_NATIVE_DECODERS[_TAG_SMALL_ATOM_UTF8_EXT] = _decode_native_small_atom
+
 # term_to_binary implementation functions
 
-def _term_to_binary(term):
-    if isinstance(term, (bytes, unicode)):
-        return _string_to_binary(term)
-    elif type(term) == list:
-        return OtpErlangList(term).binary()
-    elif type(term) == tuple:
-        return _tuple_to_binary(term)
-    elif type(term) == int or type(term) == long:
-        return _long_to_binary(term)
-    elif type(term) == float:
-        return _float_to_binary(term)
-    elif type(term) == dict:
-        return _dict_to_binary(term)
-    elif type(term) == bool:
-        return OtpErlangAtom(term and b'true' or b'false').binary()
-    elif term is None:
-        return OtpErlangAtom(b'nil').binary()
-    elif isinstance(term, OtpErlangAtom):
-        return term.binary()
+_ENCODED_MAX_LENGTH = 64
+_ENCODED_CACHE_SIZE = 4096
+_ENCODED = {}
+
+def _encode(term, out):
+    encoder = _ENCODERS.get(type(term))
+    if encoder is not None:
+        encoder(term, out)
+    elif isinstance(term, (OtpErlangAtom, OtpErlangBinary, OtpErlangFunction,
+                           OtpErlangReference, OtpErlangPort, OtpErlangPid)):
+        out += _cached_binary(term)
     elif isinstance(term, OtpErlangList):
-        return term.binary()
-    elif isinstance(term, OtpErlangBinary):
-        return term.binary()
-    elif isinstance(term, OtpErlangFunction):
-        return term.binary()
-    elif isinstance(term, OtpErlangReference):
-        return term.binary()
-    elif isinstance(term, OtpErlangPort):
-        return term.binary()
-    elif isinstance(term, OtpErlangPid):
-        return term.binary()
+        _encode_otp_list(term, out)
+    elif isinstance(term, bytes):
+        _encode_bytes(term, out)
+    elif isinstance(term, unicode):
+        _encode_unicode(term, out)
     else:
         raise OutputException('unknown python type {0}'.format(term))
 
-# (term_to_binary Erlang term composite type functions)
-
-
-def _string_to_binary(term):
-    if isinstance(term, unicode):
-        return _unicode_to_binary(term)
+def _cached_binary(term):
+    # atoms and short strings, like the keys of every request, are encoded
+    # once; any other term is encoded every time
+    if type(term) == OtpErlangAtom:
+        key = (OtpErlangAtom, term.value)
+    elif type(term) == unicode and len(term) <= _ENCODED_MAX_LENGTH:
+        key = term
     else:
-        return _bytes_to_binary(term)
+        return term.binary()
+    try:
+        return _ENCODED[key]
+    except KeyError:
+        if len(_ENCODED) >= _ENCODED_CACHE_SIZE:
+            _ENCODED.clear()
+        if type(term) == OtpErlangAtom:
+            encoded = _ENCODED[key] = term.binary()
+        else:
+            encoded = _ENCODED[key] = _unicode_to_binary(term)
+        return encoded
 
+# (term_to_binary Erlang term composite type functions)
 
-def _bytes_to_binary(term):
+def _encode_list(term, out):
     length = len(term)
     if length == 0:
-        return b_chr(_TAG_NIL_EXT)
-    elif length <= 65535:
-        return b_chr(_TAG_STRING_EXT) + struct.pack(b'>H', length) + term
-    elif length <= 4294967295:
-        return (
-            b_chr(_TAG_LIST_EXT) +
-            struct.pack(b'>I', length) +
-            b''.join([
-                b_chr(_TAG_SMALL_INTEGER_EXT) + b_chr(b_ord(c))
-                for c in term
-            ]) +
-            b_chr(_TAG_NIL_EXT)
-        )
+        out.append(_TAG_NIL_EXT)
+    elif length > 4294967295:
+        raise OutputException('uint32 overflow')
     else:
+        out.append(_TAG_LIST_EXT)
+        out += _UINT32.pack(length)
+        for element in term:
+            _encode(element, out)
+        out.append(_TAG_NIL_EXT)
+
+def _encode_otp_list(term, out):
+    if type(term.value) != list:
+        raise OutputException('unknown list type')
+    length = len(term.value)
+    if length == 0:
+        out.append(_TAG_NIL_EXT)
+    elif length > 4294967295:
         raise OutputException('uint32 overflow')
+    elif term.improper:
+        out.append(_TAG_LIST_EXT)
+        out += _UINT32.pack(length - 1)
+        for element in term.value:
+            _encode(element, out)
+    else:
+        _encode_list(term.value, out)
 
-
-def _unicode_to_binary(term):
-    term = term.encode(encoding='utf-8', errors='strict')
+def _encode_tuple(term, out):
     length = len(term)
-    if length <= 4294967295:
-        return (
-            b_chr(_TAG_BINARY_EXT) +
-            struct.pack(b'>I', length) +
-            b''.join(b_chr(c) for c in term)
-        )
+    if length <= 255:
+        out.append(_TAG_SMALL_TUPLE_EXT)
+        out.append(length)
+    elif length <= 4294967295:
+        out.append(_TAG_LARGE_TUPLE_EXT)
+        out += _UINT32.pack(length)
     else:
         raise OutputException('uint32 overflow')
+    for element in term:
+        _encode(element, out)
+
+def _encode_dict(term, out):
+    length = len(term)
+    if length > 4294967295:
+        raise OutputException('uint32 overflow')
+    out.append(_TAG_MAP_EXT)
+    out += _UINT32.pack(length)
+    for key, value in term.items():
+        _encode(key, out)
+        _encode(value, out)
 
+# (term_to_binary Erlang term primitive type functions)
 
-def _tuple_to_binary(term):
+def _encode_bytes(term, out):
     length = len(term)
-    if length <= 255:
-        return (b_chr(_TAG_SMALL_TUPLE_EXT) + b_chr(length) +
-            b''.join([_term_to_binary(element) for element in term])
-        )
+    if length == 0:
+        out.append(_TAG_NIL_EXT)
+    elif length <= 65535:
+        out.append(_TAG_STRING_EXT)
+        out += _UINT16.pack(length)
+        out += term
     elif length <= 4294967295:
-        return (b_chr(_TAG_LARGE_TUPLE_EXT) + struct.pack(b'>I', length) +
-            b''.join([_term_to_binary(element) for element in term])
-        )
+        out.append(_TAG_LIST_EXT)
+        out += _UINT32.pack(length)
+        for c in bytearray(term):
+            out.append(_TAG_SMALL_INTEGER_EXT)
+            out.append(c)
+        out.append(_TAG_NIL_EXT)
     else:
         raise OutputException('uint32 overflow')
 
-def _dict_to_binary(term):
+def _encode_unicode(term, out):
+    if len(term) <= _ENCODED_MAX_LENGTH:
+        out += _cached_binary(term)
+    else:
+        out += _unicode_to_binary(term)
+
+def _unicode_to_binary(term):
+    term = term.encode(encoding='utf-8', errors='strict')
     length = len(term)
     if length <= 4294967295:
-        return (b_chr(_TAG_MAP_EXT) + struct.pack(b'>I', length) +
-            b''.join([_term_to_binary(key) + _term_to_binary(value)
-                      for key, value in term.items()])
-        )
+        return b_chr(_TAG_BINARY_EXT) + _UINT32.pack(length) + term
     else:
         raise OutputException('uint32 overflow')
 
-# (term_to_binary Erlang term primitive type functions)
-
-def _integer_to_binary(term):
+def _encode_integer(term, out):
     if 0 <= term <= 255:
-        return b_chr(_TAG_SMALL_INTEGER_EXT) + b_chr(term)
+        out.append(_TAG_SMALL_INTEGER_EXT)
+        out.append(term)
+    elif -2147483648 <= term <= 2147483647:
+        out.append(_TAG_INTEGER_EXT)
+        out += _INT32.pack(term)
     else:
-        return b_chr(_TAG_INTEGER_EXT) + struct.pack(b'>i', term)
+        _encode_bignum(term, out)
 
-def _long_to_binary(term):
-    if -2147483648 <= term <= 2147483647:
-        return _integer_to_binary(term)
-    else:
-        return _bignum_to_binary(term)
-
-def _bignum_to_binary(term):
+def _encode_bignum(term, out):
     bignum = abs(term)
-    if term < 0:
-        sign = b_chr(1)
-    else:
-        sign = b_chr(0)
-    L = []
-    while bignum > 0:
-        L.append(b_chr(bignum & 255))
-        bignum >>= 8
-    length = len(L)
+    length = (bignum.bit_length() + 7) // 8
     if length <= 255:
-        return (b_chr(_TAG_SMALL_BIG_EXT) +
-            b_chr(length) + sign + b''.join(L)
-        )
+        out.append(_TAG_SMALL_BIG_EXT)
+        out.append(length)
     elif length <= 4294967295:
-        return (b_chr(_TAG_LARGE_BIG_EXT) +
-            struct.pack(b'>I', length) + sign + b''.join(L)
-        )
+        out.append(_TAG_LARGE_BIG_EXT)
+        out += _UINT32.pack(length)
     else:
         raise OutputException('uint32 overflow')
-
-def _float_to_binary(term):
-    return b_chr(_TAG_NEW_FLOAT_EXT) + struct.pack(b'>d', term)
+    out.append(1 if term < 0 else 0)
+    out += bignum.to_bytes(length, 'little')
+
+def _encode_float(term, out):
+    out.append(_TAG_NEW_FLOAT_EXT)
+    out += _DOUBLE.pack(term)
+
+_TRUE = OtpErlangAtom(b'true').binary()
+_FALSE = OtpErlangAtom(b'false').binary()
+_NIL = OtpErlangAtom(b'nil').binary()
+
+def _encode_bool(term, out):
+    out += _TRUE if term else _FALSE
+
+def _encode_none(term, out):
+    out += _NIL
+
+def _encode_atom(term, out):
+    out += _cached_binary(term)
+
+# encoder for each python type (subclasses are looked up in _encode)
+_ENCODERS = {
+    bytes: _encode_bytes,
+    unicode: _encode_unicode,
+    list: _encode_list,
+    tuple: _encode_tuple,
+    int: _encode_integer,
+    long: _encode_integer,
+    float: _encode_float,
+    dict: _encode_dict,
+    bool: _encode_bool,
+    type(None): _encode_none,
+    OtpErlangAtom: _encode_atom,
+    OtpErlangList: _encode_otp_list,
+}
 
 # Exception classes listed alphabetically
 
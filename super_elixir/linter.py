@@ -2,148 +2,31 @@
 
 import re
 
-import sublime
-
 from SublimeLinter.lint import Linter, persist
 
 from .utils import find_mix_project
+from .sense_client import find_elixir_sense
+from .compiler_output import LOCATION_RE, parse_output
+from .diagnostics import DiagnosticList, content_hash, project_diagnostics
+
+
+WORD_RE = re.compile(r'[\w.]+')
 
 
 class Elixirc(Linter):
     """
     Provides an interface to elixirc.
 
-    Error formats:
-
-    1) Error type 1:
-    |== Compilation error on file {filename} ==
-    |** ({error_name}) {filename}:{line}: {message}
-    |    ...
-
-    2.1) Error type 2 -- source file first in trace:
-    |== Compilation error on file {filename} ==
-    |** ({error_name}) {message}
-    |    {filename}:{line}
-    |    ...
-
-    2.2) Error type 2.2 -- lib files first in trace:
-    |== Compilation error on file {filename} ==
-    |** ({error_name}) {message}
-    |    (libname) {other_filename}:{line}
-    |    ...
-    |    {filename}:{line}
-    |    ...
-
-    2.3) Error type 2.3 -- function names first in trace:
-    |== Compilation error on file {filename} ==
-    |** ({error_name}) {message}
-    |    {function_name}()
-    |    ...
-    |    {filename}:{line}
-    |    ...
-
-    2.4) Error type 2.4 -- irrelevant files first in trace:
-    |== Compilation error on file {filename} ==
-    |** ({error_name}) {message}
-    |    {filename_2}:{line_2}
-    |    {filename_3}:{line_3}
-    |    ...
-    |    {filename}:{line}
-    |    ...
-
-    3) Error type 3:
-    |** ({error_name}) {filename}:{line}: {message}
-    |...<trace lines>...
-
-    Warning formats:
-
-    1) Warning type 1:
-    |{filename}:{line}: warning: {message}
-
-    2) Warning type 2:
-    |warning: {message}
-    |  {filename}:{line}
-
-    In order to cover all cases we need a complex regex.
-    Since a single regex does *not* allow to have several
-    groups with the same name, we introduce custom group
-    names.
-    The group names are then transformed back to the ones
-    expected by the Linter. This is done by overriding
-    the split_match method.
-
-
-    Examples (mix project of a Phoenix app):
-    1)
-    |== Compilation error on file web/router.ex ==
-    |** (CompileError) web/router.ex:19: undefined function get/2
-    |    ...
-
-    2.1) #todo
-
-    2.2) Insert a "resources :users, UserController" line in router.ex
-    |== Compilation error on file web/router.ex ==
-    |** (FunctionClauseError) no function clause matching in Phoenix.Router.Resource.build/3
-    |    (phoenix) lib/phoenix/router/resource.ex:30: Phoenix.Router.Resource.build(:users, UserController, [])
-    |    web/router.ex:20: (module)
-    |    ...
-
-    2.3) Modify line 2 to "use MyApp.Web, :dasdsadasda" in router.ex
-    |== Compilation error on file web/controllers/page_controller.ex ==
-    |** (UndefinedFunctionError) undefined function: MyApp.Web.controllers/0
-    |    MyApp.Web.controllers()
-    |    expanding macro: MyApp.Web.__using__/1
-    |    web/controllers/page_controller.ex:2: MyApp.PageController (module)
-    |    ...
-
-    2.4) Define an virtual attribute with the same name as an existing association
-    |== Compilation error on file web/models/user.ex ==
-    |** (ArgumentError) field/association :roles is already set on schema
-    |    lib/ecto/schema.ex:1196: Ecto.Schema.put_struct_field/3
-    |    lib/ecto/schema.ex:1176: Ecto.Schema.association/5
-    |    web/models/user.ex:20: (module)
-    |    (stdlib) erl_eval.erl:669: :erl_eval.do_apply/6
-    |    (elixir) lib/kernel/parallel_compiler.ex:97: anonymous fn/4 in Kernel.ParallelCompiler.spawn_compilers/8
-
-    3) #todo
-
+    The output of the compiler is parsed by `compiler_output`, which lists
+    the formats of its errors and warnings, into the same diagnostics the
+    running elixir_sense gives.
     """
 
     syntax = "elixir"
     tempfile_suffix = "ex"
 
-    regex_parts = (
-        # Error type 1
-        r"== Compilation error on file (?P<e_file1>.+) ==\n"
-        r"\*\* \(.+?\) (?P=e_file1):(?P<e_line1>\d+): (?P<e_msg1>.+)",
-
-        # Error type 2
-        r"== Compilation error on file (?P<e_file2>.+) ==\n"
-        r"\*\* \(.+?\) (?P<e_msg2>.+)\n"
-        r"(.+\n)*?"
-        r"    (?P=e_file2):(?P<e_line2>\d+)",
-
-        # Error type 3
-        r"\*\* \(.+?\) (?P<e_file3>.+):(?P<e_line3>\d+): (?P<e_msg3>.+)",
-
-        # Warning type 1
-        r"(?P<w_file1>.+):(?P<w_line1>\d+): warning: (?P<w_msg1>.+)",
-
-        # Warning type 2
-        r"warning: (?P<w_msg2>.+)\n"
-        r"  (?P<w_file2>.+):(?P<w_line2>\d+)"
-    )
-
-    regex = "|".join([r"^(?:%s)" % x for x in regex_parts])
-
-    dummy_regex = re.compile(
-        r"(?P<filename>.+):"
-        r"(?P<line>\d+):"
-        r"(?:(?P<error>error)|(?P<warning>warning)):"
-        r"(?P<message>.+)",
-        re.UNICODE
-    )
-
+    # Required by SublimeLinter, `find_errors` parses the output instead
+    regex = LOCATION_RE.pattern
 
     #
     # Make elixir 'lint' itself by at least checking the syntax
@@ -156,7 +39,6 @@ case Code.string_to_quoted(System.argv |> Enum.fetch!(0) |> File.read!) do
 end
 '''
 
-    multiline = True
     executable = "elixir"
 
     def get_chdir(self, settings):
@@ -182,123 +64,109 @@ end
                 '--ignore-module-conflict',
             ]
 
-    def find_errors(self, output):
-        print(output)
-        return super().find_errors(output)
-
-    def split_match(self, match):
+    def run(self, cmd, code):
         """
-        Pre-process the matchObject before passing it upstream.
-
-        Several reasons for this:
-          * unrelated library files can throw errors, and
-            we only want errors from the linted file.
-          * our regex contains more than just the basic
-            capture groups (filename, line, message, etc.)
-            but we still need to pass a match object that
-            contains the above groups upstream.
-          * Line is not reported for some macro errors
-          * etc..
-
+        Saved files are linted from the compile of their project, the first
+        lint after a save compiles it and lints the other saved views of the
+        project with the results. Edited buffers and scripts are linted by the
+        running elixir_sense of the project and cached by their content.
+        While it is not running, edited buffers get the project diagnostics.
         """
-        dummy_match = None
-
-        if match:
-            captures = match.groupdict()
-            dummy_string = self.build_dummy_string(captures)
-            dummy_match = re.match(self.dummy_regex, dummy_string)
+        project_path = self.filename and find_mix_project(self.filename)
+        if project_path is None:
+            return super().run(cmd, code)
+
+        project = project_diagnostics(project_path)
+        run = super().run
+        exs = self.filename.endswith('.exs')
+        if exs or self.view.is_dirty():
+            digest = content_hash(code)
+            diagnostics = project.cached(self.filename, digest)
+            if diagnostics is None:
+                diagnostics = self.buffer_diagnostics(code)
+            if diagnostics is None and exs:
+                diagnostics = DiagnosticList(
+                    diagnostic
+                    for diagnostic in parse_output(run(cmd, code))
+                    if self.filename.endswith(diagnostic['file'])
+                )
+            if diagnostics is not None:
+                project.store(self.filename, digest, diagnostics)
+                return diagnostics
+
+        diagnostics, compiled = project.compile(
+            self.filename, lambda: run(cmd, code), parse_output
+        )
+        if compiled:
+            project.relint_views(self.view)
+        return DiagnosticList(diagnostics)
+
+    def buffer_diagnostics(self, code):
+        """Diagnostics of the buffer by elixir_sense, if it is running"""
+        sense = find_elixir_sense(self.view)
+        if sense is None:
+            return None
+        try:
+            return DiagnosticList(sense.diagnostics(code, self.filename))
+        except Exception as e:
+            persist.debug('elixir_sense diagnostics failed: %s' % e)
+            return None
 
-        m = dummy_match.groupdict() if dummy_match else {}
-
-        if m and self.filename.endswith(m['filename']):
-            line = m['line']
-            near = None
-            if line:
-                line = int(line) - 1
-                near = self.find_near_what(m['message'], line)
-            print(
-                dummy_match,
-                line,
-                None,
-                m['error'],
-                m['warning'],
-                m['message'],
-                near
-            )
-            return (
-                dummy_match,
-                line,
-                None,
-                m['error'],
-                m['warning'],
-                m['message'],
-                near
-            )
-        return (None,) * 7
-
-    def find_near_what(self, message, err_line):
-        words = re.compile('([\w\.]+)').findall(message)
-        words.sort(key=lambda w: -len(w))
-        for word in words:
-            for region in self.view.find_all(word, sublime.LITERAL):
-                line, _ = self.view.rowcol(region.a)
-                if line == err_line:
-                    return word
-
-    def build_dummy_string(self, captures):
+    def find_errors(self, output):
+        if isinstance(output, str):
+            output = parse_output(output)
+        lines = self.code.split('\n')
+        return (
+            self.diagnostic_match(diagnostic, lines) for diagnostic in output
+        )
+
+    def diagnostic_match(self, diagnostic, lines):
         """
-        Build a string to be matched against self.dummy_regex.
-
-        It is used to ensure that a matchObject with the
-        appropriate group names is passed upstream.
-
-        Returns a string with the following format:
-        {filename}:{line}:{error_type}:{message}
-
+        The match SublimeLinter expects, for `diagnostic`.
+        The marker goes at the column of the compiler, or at the longest
+        word of the message found in the text of the line.
         """
-        if captures['e_file1'] is not None:
-            persist.debug('Error type 1')
-            dummy_str = '%s:%s:%s:%s' % (
-                captures['e_file1'],
-                captures['e_line1'],
-                'error',
-                captures['e_msg1']
-            )
-        elif captures['e_file2'] is not None:
-            persist.debug('Error type 2')
-            dummy_str = "%s:%s:%s:%s" % (
-                captures['e_file2'],
-                captures['e_line2'],
-                'error',
-                captures['e_msg2']
-            )
-        elif captures['e_file3'] is not None:
-            persist.debug('Error type 3')
-            dummy_str = "%s:%s:%s:%s" % (
-                captures['e_file3'],
-                captures['e_line3'],
-                'error',
-                captures['e_msg3']
-            )
-        elif captures['w_file1'] is not None:
-            persist.debug('Warning type 1')
-            dummy_str = "%s:%s:%s:%s" % (
-                captures['w_file1'],
-                captures['w_line1'],
-                'warning',
-                captures['w_msg1']
-            )
-        elif captures['w_file2'] is not None:
-            persist.debug('Warning type 2')
-            dummy_str = "%s:%s:%s:%s" % (
-                captures['w_file2'],
-                captures['w_line2'],
-                'warning',
-                captures['w_msg2']
-            )
+        if not self.filename.endswith(diagnostic['file']):
+            return (None,) * 7
+
+        line = (diagnostic['line'] or 1) - 1
+        error = diagnostic['severity'] == 'error'
+        message = diagnostic['message']
+        if diagnostic.get('column'):
+            col, near = diagnostic['column'] - 1, None
         else:
-            persist.debug('No match')
-            dummy_str = ""
-
-        persist.debug("Dummy string: %s" % dummy_str)
-        return dummy_str
+            text = lines[line] if line < len(lines) else ''
+            col, near = find_near(text, message)
+        return (
+            diagnostic,
+            line,
+            col,
+            'error' if error else None,
+            None if error else 'warning',
+            message,
+            near
+        )
+
+
+def find_near(text, message):
+    """
+    `(column, word)` of the longest word of `message` in the line `text`,
+    in a pass over each. The parts of dotted names count as words.
+    """
+    columns = {}
+    for match in WORD_RE.finditer(text):
+        word = match.group()
+        columns.setdefault(word, match.start())
+        if '.' in word:
+            offset = match.start()
+            for part in word.split('.'):
+                columns.setdefault(part, offset)
+                offset += len(part) + 1
+
+    near = None
+    for word in WORD_RE.findall(message):
+        if word in columns and (near is None or len(word) > len(near)):
+            near = word
+    if near is None:
+        return None, None
+    return columns[near], near
@@ -0,0 +1,58 @@
+import threading
+from collections import defaultdict
+
+import sublime_plugin
+
+
+PANEL_NAME = 'super_elixir_metrics'
+
+
+class RequestMetrics:
+    """
+    Counters of the requests to elixir_sense by kind.
+
+    `submitted` requests are either `superseded` by a newer one before
+    running, `failed`, `stale` when their result came too late to be used,
+    or `delivered`. `dropped` ones were delivered but no longer needed, and
+    `cancelled` ones were given up before being submitted.
+    `time` adds up the seconds spent running them, `wasted_time` the part
+    of it whose result was thrown away.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = defaultdict(lambda: defaultdict(int))
+
+    def add(self, kind, counter, value=1):
+        with self._lock:
+            self._counters[kind][counter] += value
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                kind: dict(counters)
+                for kind, counters in self._counters.items()
+            }
+
+    def report(self):
+        lines = []
+        for kind, counters in sorted(self.snapshot().items()):
+            lines.append(kind)
+            for counter, value in sorted(counters.items()):
+                if isinstance(value, float):
+                    value = '%.3fs' % value
+                lines.append('    {:<16}{}'.format(counter, value))
+        return '\n'.join(lines) or 'No requests yet'
+
+
+METRICS = RequestMetrics()
+
+
+class SuperElixirRequestMetrics(sublime_plugin.WindowCommand):
+
+    def run(self):
+        panel = self.window.create_output_panel(PANEL_NAME)
+        panel.run_command('append', {'characters': METRICS.report() + '\n'})
+        self.window.run_command('show_panel', {
+            'panel': 'output.' + PANEL_NAME
+        })
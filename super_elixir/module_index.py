@@ -0,0 +1,275 @@
+import glob
+import hashlib
+import json
+import os
+import re
+import struct
+import threading
+
+import sublime
+
+from . import erlang
+
+
+INDEX_VERSION = 2
+SOURCE_EXTENSIONS = ('.ex', '.exs', '.erl')
+SKIPPED_DIRS = set(['_build', 'deps', 'node_modules', 'priv', 'assets'])
+
+DEFMODULE_RE = re.compile(
+    r'(\s*)def(module|protocol|impl)\s+([A-Z][\w.]*)'
+    r'(?:\s*,\s*for:\s*(\[[\w.,\s]*\]|[A-Z][\w.]*))?'
+)
+MODULE_NAME_RE = re.compile(r'[A-Z][\w.]*')
+# a heredoc starts with its quotes at the end of a line
+HEREDOC_RE = re.compile(r'("""|\'\'\')\s*$')
+ERLANG_MODULE_RE = re.compile(r"-module\(\s*'?([a-z][\w@]*)")
+
+INDEXES = {}
+_indexes_lock = threading.Lock()
+
+
+def source_modules(path):
+    """
+    `[name, line]` of the modules defined in the source file at `path`.
+    A module defined at a deeper indentation than the one before is nested
+    in it, as the formatter lays them out. Heredocs are skipped, and an
+    implementation is named after its protocol and the modules it is for.
+    """
+    modules = []
+    parents = []
+    heredoc = None
+    erlang_source = path.endswith('.erl')
+    try:
+        with open(path, encoding='utf-8', errors='replace') as f:
+            for number, line in enumerate(f, 1):
+                if erlang_source:
+                    match = ERLANG_MODULE_RE.match(line)
+                    if match is not None:
+                        return [[':' + match.group(1), number]]
+                    continue
+
+                if heredoc is not None:
+                    if line.lstrip().startswith(heredoc):
+                        heredoc = None
+                    continue
+
+                match = DEFMODULE_RE.match(line)
+                if match is None:
+                    heredoc_start = HEREDOC_RE.search(line)
+                    if heredoc_start is not None:
+                        heredoc = heredoc_start.group(1)
+                    continue
+                indent = len(match.group(1))
+                while parents and parents[-1][0] >= indent:
+                    parents.pop()
+                kind, name, targets = match.group(2, 3, 4)
+                if kind == 'impl':
+                    # `for:` defaults to the module it is defined in
+                    targets = (
+                        MODULE_NAME_RE.findall(targets) if targets
+                        else [parents[-1][1]] if parents else []
+                    )
+                    names = [name + '.' + target for target in targets]
+                elif parents:
+                    names = [parents[-1][1] + '.' + name]
+                else:
+                    names = [name]
+                if not names:
+                    continue
+                parents.append((indent, names[0]))
+                modules.extend([module, number] for module in names)
+    except OSError:
+        pass
+    return modules
+
+
+def beam_source(path):
+    """Source file a `.beam` was compiled from, as kept in its `CInf` chunk"""
+    with open(path, 'rb') as f:
+        header = f.read(12)
+        if header[:4] != b'FOR1' or header[8:] != b'BEAM':
+            return None
+        while True:
+            chunk = f.read(8)
+            if len(chunk) < 8:
+                return None
+            name, size = chunk[:4], struct.unpack('>I', chunk[4:])[0]
+            if name == b'CInf':
+                info = erlang.binary_to_term(f.read(size), native=True)
+                for key, value in info:
+                    if _atom_name(key) == 'source':
+                        return _charlist(value)
+                return None
+            # chunks are aligned on 4 bytes
+            f.seek((size + 3) & ~3, 1)
+
+
+def _atom_name(term):
+    """Name of an atom however it was decoded, atoms in tuples stay atoms"""
+    if isinstance(term, erlang.OtpErlangAtom):
+        term = term.value
+    if isinstance(term, bytes):
+        return term.decode('latin-1')
+    return term
+
+
+def _charlist(term):
+    """Text of a charlist, decoded as latin-1 bytes or as code points"""
+    if isinstance(term, erlang.OtpErlangList):
+        term = term.value
+    if isinstance(term, bytes):
+        return term.decode('latin-1')
+    if isinstance(term, str):
+        return term
+    return ''.join(map(chr, term))
+
+
+def beam_module(path):
+    name = os.path.basename(path)[:-len('.beam')]
+    if name.startswith('Elixir.'):
+        return name[len('Elixir.'):]
+    return ':' + name
+
+
+class ModuleIndex:
+    """
+    Modules of a mix project and its dependencies, with the file and line
+    they are defined at, saved on disk across sessions.
+
+    The modules come from the `.beam` files of `_build/<env>/lib/*/ebin`,
+    which tell the source they were compiled from, and from the sources of
+    the project, which give the lines and the modules not compiled yet.
+    Refreshing only reads again the files modified since they were indexed.
+    """
+
+    def __init__(self, project_path, mix_env, path):
+        self.project_path = project_path
+        self.mix_env = mix_env
+        self.path = path
+        # source path -> {'mtime': ..., 'modules': [[name, line], ...]}
+        self.sources = {}
+        # beam path -> {'mtime': ..., 'module': ..., 'source': ...}
+        self.beams = {}
+        self._lock = threading.Lock()
+
+    def load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get('version') == INDEX_VERSION:
+            self.sources = data['sources']
+            self.beams = data['beams']
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = '%s.%s' % (self.path, threading.get_ident())
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'version': INDEX_VERSION,
+                'project_path': self.project_path,
+                'sources': self.sources,
+                'beams': self.beams,
+            }, f)
+        os.replace(tmp_path, self.path)
+
+    def refresh(self):
+        """Indexes the files modified since the last refresh, and saves"""
+        with self._lock:
+            changed = False
+            beams = {}
+            for path in glob.glob(os.path.join(
+                    self.project_path, '_build', self.mix_env, 'lib', '*',
+                    'ebin', '*.beam')):
+                beam, indexed = self._indexed(self.beams, path)
+                if not indexed:
+                    changed = True
+                    try:
+                        beam['source'] = beam_source(path)
+                    except (OSError, erlang.ParseException):
+                        beam['source'] = None
+                    beam['module'] = beam_module(path)
+                beams[path] = beam
+
+            sources = {}
+            paths = set(self._project_sources())
+            paths.update(
+                beam['source'] for beam in beams.values()
+                if beam['source'] and os.path.exists(beam['source'])
+            )
+            for path in paths:
+                source, indexed = self._indexed(self.sources, path)
+                if not indexed:
+                    changed = True
+                    source['modules'] = source_modules(path)
+                sources[path] = source
+
+            changed = (
+                changed or
+                len(beams) != len(self.beams) or
+                len(sources) != len(self.sources)
+            )
+            self.beams = beams
+            self.sources = sources
+            if changed:
+                self.save()
+            return changed
+
+    def modules(self):
+        """Sorted `(name, file, line)` of the modules indexed"""
+        modules = {}
+        sources = self.sources
+        for beam in self.beams.values():
+            # only the sources found are indexed
+            source = sources.get(beam['source'])
+            if source is not None:
+                lines = dict(source['modules'])
+                modules[beam['module']] = (
+                    beam['source'], lines.get(beam['module'], 1)
+                )
+        for path, source in sources.items():
+            for name, line in source['modules']:
+                modules[name] = (path, line)
+        return sorted(
+            (name, path, line) for name, (path, line) in modules.items()
+        )
+
+    def _indexed(self, entries, path):
+        """The entry of `path`, and whether it is up to date"""
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            mtime = None
+        entry = entries.get(path)
+        if entry is not None and entry['mtime'] == mtime:
+            return entry, True
+        return {'mtime': mtime}, False
+
+    def _project_sources(self):
+        for root, dirs, files in os.walk(self.project_path):
+            dirs[:] = [
+                d for d in dirs
+                if d not in SKIPPED_DIRS and not d.startswith('.')
+            ]
+            for name in files:
+                if name.endswith(SOURCE_EXTENSIONS):
+                    yield os.path.join(root, name)
+
+
+def project_module_index(project_path, mix_env):
+    """The index of the project, loaded from disk the first time"""
+    with _indexes_lock:
+        index = INDEXES.get((project_path, mix_env))
+        if index is None:
+            key = hashlib.sha1(
+                ('%s:%s' % (project_path, mix_env)).encode('utf-8')
+            ).hexdigest()
+            index = INDEXES[project_path, mix_env] = ModuleIndex(
+                project_path, mix_env, os.path.join(
+                    sublime.cache_path(), 'SuperElixir', 'module_index',
+                    key + '.json'
+                )
+            )
+            index.load()
+        return index
@@ -1,26 +1,60 @@
+import os
 from functools import partial
 
+import sublime
 import sublime_plugin
-from .utils import BaseLookUpJediCommand
-from .sense_client import get_elixir_sense
+from .utils import BaseLookUpJediCommand, find_mix_project
+from .settings import get_settings_param
+from .module_index import project_module_index
 
 
 class SuperElixirNavigateModules(
         BaseLookUpJediCommand, sublime_plugin.TextCommand):
+    """
+    Lists the modules of the project from its module index, the index is
+    refreshed in background for the next time, or before listing them when
+    there is no index yet.
+    """
 
     def run(self, edit):
-        sense = get_elixir_sense(self.view)
-        all_modules = sense.all_modules
+        file_name = self.view.file_name()
+        project_path = file_name and find_mix_project(file_name)
+        if project_path is None:
+            sublime.status_message('Not in a mix project')
+            return
+
+        mix_env = get_settings_param(self.view, 'mix_env', 'test').lower()
+        index = project_module_index(project_path, mix_env)
+        modules = index.modules()
+        if modules:
+            self._show_modules(project_path, modules)
+        sublime.set_timeout_async(
+            partial(self._refresh, index, show=not modules), 0
+        )
+
+    def _refresh(self, index, show):
+        index.refresh()
+        if show:
+            sublime.set_timeout(partial(
+                self._show_modules, index.project_path, index.modules()
+            ), 0)
+
+    def _show_modules(self, project_path, modules):
+        if not modules:
+            sublime.status_message('No modules found')
+            return
+
         self.view.window().show_quick_panel(
-            all_modules,
-            partial(self._select_module, modules=all_modules),
+            [
+                [name, os.path.relpath(path, project_path)]
+                for name, path, _line in modules
+            ],
+            partial(self._select_module, modules=modules),
         )
 
     def _select_module(self, i, modules=None):
         if i < 0:
             return
 
-        module = modules[i]
-        sense = get_elixir_sense(self.view)
-        definition = sense.definition(module, 0, len(module))
-        self.go_to_definition(definition)
+        _name, path, line = modules[i]
+        self._jump_to_in_window(path, line)
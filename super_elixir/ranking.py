@@ -0,0 +1,253 @@
+from collections import OrderedDict
+
+
+# scores of the parts of a match
+EXACT = 30
+PREFIX = 20
+BOUNDARY = 10
+CONSECUTIVE = 5
+MAX_GAP = 5
+UNDERSCORE = 3
+LENGTH = 0.05
+RECENT = 10
+RECENT_ORIGIN = 4
+
+# base score of each kind of suggestion
+KINDS = {
+    'variable': 6,
+    'attribute': 6,
+    'public_function': 5,
+    'private_function': 5,
+    'public_macro': 5,
+    'callback': 4,
+    'return': 4,
+    'function': 3,
+    'macro': 3,
+    'module': 2,
+}
+
+QUERY_CACHE_SIZE = 8
+RECENT_SIZE = 200
+
+
+class RecentNames:
+    """The names of the last completions used, the most recent last"""
+
+    def __init__(self, size=RECENT_SIZE, weight=RECENT):
+        self.size = size
+        self.weight = weight
+        self._names = OrderedDict()
+
+    def add(self, name):
+        self._names.pop(name, None)
+        self._names[name] = None
+        if len(self._names) > self.size:
+            self._names.popitem(last=False)
+
+    def scores(self):
+        """Score of each recent name, from `weight` for the last one down"""
+        return {
+            name: self.weight * (i + 1) / len(self._names)
+            for i, name in enumerate(self._names)
+        }
+
+
+RECENT_NAMES = RecentNames()
+# the modules the last completions used came from
+RECENT_ORIGINS = RecentNames(weight=RECENT_ORIGIN)
+
+
+class CompletionIndex:
+    """
+    Ranks a list of suggestions against the prefix being typed.
+
+    Everything that does not depend on the prefix is computed once: the
+    completion rows, the lower cased names, their word boundaries, the set
+    of their characters as a bit mask and a score from their kind,
+    underscores, length and the recent use of them and of the module they
+    come from.
+
+    Names match when the prefix is a subsequence of them starting at a word
+    boundary, so `fm` matches `flat_map`. The names matching a prefix are
+    kept, and the next keystroke only looks into those.
+    """
+
+    def __init__(self, suggestions, build_row, recent=RECENT_NAMES,
+                 recent_origins=RECENT_ORIGINS):
+        self.hint = ''
+        self.names = []
+        self.rows = []
+        lowers = []
+        boundaries = []
+        masks = []
+        scores = []
+        recent_scores = recent.scores()
+        origin_scores = recent_origins.scores()
+
+        for s in suggestions:
+            if s['type'] == 'hint':
+                self.hint = s['value']
+                continue
+
+            name = str(s.get('name', s.get('description', '')))
+            bare_name = name.lstrip('@:')
+            self.names.append(name)
+            self.rows.append(build_row(s, self.hint))
+            lowers.append(bare_name.lower())
+            boundaries.append(_boundaries(bare_name))
+            masks.append(_mask(lowers[-1]))
+            scores.append(
+                KINDS.get(s['type'], 0) -
+                UNDERSCORE * (len(bare_name) - len(bare_name.strip('_'))) -
+                LENGTH * len(bare_name) +
+                recent_scores.get(name, 0) +
+                origin_scores.get(s.get('origin'), 0)
+            )
+
+        self._lowers = lowers
+        self._boundaries = boundaries
+        self._masks = masks
+        self._scores = scores
+
+        # ties of a match are broken by this order
+        order = sorted(
+            range(len(lowers)), key=lambda i: (-scores[i], lowers[i])
+        )
+        self._ordered_rows = [self.rows[i] for i in order]
+
+        # entries by the character at each of their boundaries, in the
+        # order above, as are the matches filtered out of them
+        self._by_initial = {}
+        for i in order:
+            for char in boundaries[i]:
+                self._by_initial.setdefault(char, []).append(i)
+
+        self._matches = OrderedDict()
+
+    def rank(self, prefix):
+        """Rows of the suggestions matching `prefix`, the best first"""
+        query = prefix.lower()
+        if not query:
+            return list(self._ordered_rows)
+
+        # the sort is stable, ties stay in the default order
+        scored = self._match(query)
+        rows = self.rows
+        return [rows[i] for i in sorted(scored, key=scored.__getitem__)]
+
+    def rows_named(self, name):
+        return [
+            row for row_name, row in zip(self.names, self.rows)
+            if row_name == name
+        ]
+
+    def _match(self, query):
+        candidates = self._candidates(query)
+        lowers = self._lowers
+        boundaries = self._boundaries
+        scores = self._scores
+        # index -> minus the score, comparing floats alone sorts faster
+        if len(query) == 1:
+            # every candidate starts a word with it
+            prefix = PREFIX + CONSECUTIVE
+            scored = {
+                i: -scores[i] -
+                (prefix if lowers[i][0] == query else BOUNDARY) -
+                (EXACT if lowers[i] == query else 0)
+                for i in candidates
+            }
+        else:
+            # names without all the characters of the query can't match, and
+            # are the most of the candidates of short queries
+            needed = _mask(query)
+            masks = self._masks
+            scored = {}
+            for i in candidates:
+                if masks[i] & needed != needed:
+                    continue
+                score = _score(lowers[i], boundaries[i], query)
+                if score is not None:
+                    scored[i] = -score - scores[i]
+
+        self._matches[query] = list(scored)
+        if len(self._matches) > QUERY_CACHE_SIZE:
+            self._matches.popitem(last=False)
+        return scored
+
+    def _candidates(self, query):
+        # the matches of a shorter query include the ones of this one
+        for end in range(len(query), 0, -1):
+            matches = self._matches.get(query[:end])
+            if matches is not None:
+                return matches
+        return self._by_initial.get(query[0], ())
+
+
+def _boundaries(name):
+    """Positions starting a word in `name`, by their lower cased character"""
+    bounds = {}
+    previous = ''
+    for i, char in enumerate(name):
+        if not previous or char.isalnum() and (
+            not previous.isalnum() or
+            (char.isupper() and previous.islower())
+        ):
+            bounds.setdefault(char.lower(), []).append(i)
+        previous = char
+    return bounds
+
+
+def _mask(text):
+    """Bit mask of the characters in `text`, some share a bit"""
+    mask = 0
+    for char in set(text):
+        mask |= 1 << (ord(char) & 63)
+    return mask
+
+
+def _score(name, bounds, query):
+    """Score of `query` as a subsequence of `name` or `None`"""
+    initial = bounds.get(query[0])
+    if not initial:
+        return None
+
+    if name.startswith(query):
+        exact = EXACT if name == query else 0
+        return exact + PREFIX + CONSECUTIVE * len(query)
+
+    last = initial[0]
+    score = BOUNDARY
+    end = len(query) - 1
+    for n, char in enumerate(query[1:], 1):
+        i = name.find(char, last + 1)
+        if i < 0:
+            return None
+        if i == last + 1:
+            score += CONSECUTIVE
+        else:
+            # rather jump to the start of a word, unless the rest of the
+            # query doesn't match after it
+            for bound in bounds.get(char, ()):
+                if bound >= i:
+                    break
+            else:
+                bound = -1
+            if bound >= 0 and (
+                    n == end or
+                    _is_subsequence(query[n + 1:], name, bound + 1)):
+                i = bound
+                score += BOUNDARY
+            else:
+                score -= min(i - last - 1, MAX_GAP)
+        last = i
+    return score
+
+
+def _is_subsequence(query, name, start):
+    """Whether `query` is a subsequence of `name` from `start`"""
+    i = start - 1
+    for char in query:
+        i = name.find(char, i + 1)
+        if i < 0:
+            return False
+    return True
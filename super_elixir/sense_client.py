@@ -2,9 +2,16 @@ import re
 import socket
 import struct
 import subprocess
+import threading
+import time
+import traceback
 import os
+from collections import deque
+from concurrent.futures import Future, TimeoutError
+from functools import partial
 
 from . import erlang
+from .metrics import METRICS
 from .utils import find_mix_project
 from . import settings
 
@@ -12,58 +19,232 @@ from . import settings
 CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
 ELIXIR_SENSE_EXEC = os.path.join(CURRENT_DIR, '../elixir_sense/run.exs')
 SOCKET_RE = re.compile(rb'ok:localhost:(?P<socket>.+)\n')
+REQUEST_TIMEOUT = 30
+RECV_BUFFER_SIZE = 64 * 1024
+LOG_SIZE = 1000
+# stderr lines starting an error report of the server
+ERROR_RE = re.compile(r'Server Error|Cannot handle request|\*\* \(')
 
 
-ERLANG_ATOMS = {
-    'nil': None,
-    'true': True,
-    'false': False,
-}
-
-
-def decode_term(term):
-    if isinstance(term, dict):
-        term = {
-            decode_term(k): decode_term(v)
-            for k, v in term.items()
-        }
-    elif isinstance(term, list):
-        term = [decode_term(i) for i in term]
-    elif isinstance(term, erlang.OtpErlangAtom):
-        if isinstance(term.value, bytes):
-            term = term.value.decode()
-        else:
-            term = term.value
-        term = ERLANG_ATOMS.get(term, term)
-    elif isinstance(term, erlang.OtpErlangBinary):
-        term = term.value.decode()
-    return term
+SERVERS = {}
+STARTUPS = {}
+STARTUP_RETRY_DELAY = 30
+MAX_RETRY_DELAY = 600
+# a server that dies sooner after starting counts as a failed start
+CRASH_LOOP_TIME = 60
+CHECK_INTERVAL = 30
+PING_TIMEOUT = 5
+_startups_lock = threading.Lock()
+# consecutive failed starts by project
+_failures = {}
+_monitor = None
 
 
-SERVERS = {}
+class StartupCancelled(RuntimeError):
+    """The server was stopped before it was ready"""
 
 
-def get_elixir_sense(view):
+def find_elixir_sense(view):
+    """Returns the elixir_sense of the view's project if it is running"""
     if view.file_name() is not None:
         project_path = find_mix_project(view.file_name())
         sense = SERVERS.get(project_path)
-        if not sense:
-            elixir_exec = settings.get_settings_param(
-                view,
-                'elixir_interpreter',
-                'elixir'
+        if sense is not None and not sense.is_alive():
+            restart_elixir_sense(project_path, sense)
+            return None
+        return sense
+
+
+def get_elixir_sense(view):
+    """
+    Returns the elixir_sense of the view's project, starting it in
+    background if needed. Returns `None` until it is ready.
+    """
+    sense = find_elixir_sense(view)
+    if sense is None:
+        start_elixir_sense(view)
+    return sense
+
+
+def start_elixir_sense(view):
+    """
+    Starts in background the elixir_sense of the view's project.
+
+    Returns a `Future` resolved with the `ElixirSense` once it is ready. A
+    server that failed to start is retried after `STARTUP_RETRY_DELAY`,
+    twice as long after each consecutive failure.
+    """
+    if view.file_name() is None:
+        return None
+
+    project_path = find_mix_project(view.file_name())
+    with _startups_lock:
+        future, started_at = STARTUPS.get(project_path, (None, 0))
+        if future is not None and not (
+            future.done() and future.exception() is not None and
+            time.time() - started_at > _retry_delay(
+                _failures.get(project_path, 1)
             )
-            mix_env = settings.get_settings_param(
-                view,
-                'mix_env',
-                'test'
-            ).lower()
-            sense = SERVERS[project_path] = ElixirSense(
-                project_path,
-                elixir_exec=elixir_exec,
-                mix_env=mix_env,
+        ):
+            return future
+
+        elixir_exec = settings.get_settings_param(
+            view,
+            'elixir_interpreter',
+            'elixir'
+        )
+        mix_env = settings.get_settings_param(
+            view,
+            'mix_env',
+            'test'
+        ).lower()
+        return _spawn_start(project_path, elixir_exec, mix_env)
+
+
+def restart_elixir_sense(project_path, sense):
+    """
+    Replaces a dead elixir_sense right away. When it dies again soon after
+    starting, it is restarted with the same backoff as the failed starts.
+    """
+    with _startups_lock:
+        if SERVERS.get(project_path) is not sense:
+            return  # already replaced
+        del SERVERS[project_path]
+        print('elixir_sense for {} died, restarting it'.format(project_path))
+        if time.time() - sense.started_at < CRASH_LOOP_TIME:
+            failures = _failures[project_path] = (
+                _failures.get(project_path, 0) + 1
             )
-        return sense
+        else:
+            failures = _failures[project_path] = 0
+        delay = _retry_delay(failures - 1) if failures > 1 else 0
+        _spawn_start(project_path, sense.elixir_exec, sense.mix_env, delay)
+    sense.close()
+
+
+def stop_elixir_sense(project_path):
+    """Shuts down the elixir_sense of a project, it starts again if needed"""
+    with _startups_lock:
+        sense = SERVERS.pop(project_path, None)
+        STARTUPS.pop(project_path, None)
+    if sense is not None:
+        print('Stopping elixir_sense for {}'.format(project_path))
+        sense.close()
+
+
+def check_servers():
+    """
+    Pings the running servers with a `version` request, restarting the
+    dead ones, then stops the ones idle for longer than
+    `server_idle_timeout` minutes and the least recently used ones above
+    `max_servers` or `max_servers_memory` megabytes.
+    """
+    plugin_settings = settings.get_plugin_settings()
+    idle_timeout = plugin_settings.get('server_idle_timeout', 30) * 60
+    max_servers = plugin_settings.get('max_servers', 3)
+    max_memory = plugin_settings.get('max_servers_memory', 0) * 1024 * 1024
+
+    for project_path, sense in list(SERVERS.items()):
+        if not sense.ping():
+            restart_elixir_sense(project_path, sense)
+            continue
+        if sense.uptime() > CRASH_LOOP_TIME:
+            _failures.pop(project_path, None)
+        if idle_timeout and sense.idle_time() > idle_timeout:
+            stop_elixir_sense(project_path)
+
+    _evict(max_servers, max_memory)
+
+
+def _evict(max_servers, max_memory):
+    servers = sorted(SERVERS.items(), key=lambda item: item[1].last_used)
+    memory = sum(sense.memory for _, sense in servers)
+    while len(servers) > 1 and (
+        max_servers and len(servers) > max_servers or
+        max_memory and memory > max_memory
+    ):
+        project_path, sense = servers.pop(0)
+        memory -= sense.memory
+        stop_elixir_sense(project_path)
+
+
+def _retry_delay(failures):
+    return min(STARTUP_RETRY_DELAY * 2 ** (failures - 1), MAX_RETRY_DELAY)
+
+
+def _spawn_start(project_path, elixir_exec, mix_env, delay=0):
+    """Starts a server in background, `_startups_lock` must be held"""
+    future = Future()
+    STARTUPS[project_path] = (future, time.time() + delay)
+
+    starter = threading.Thread(
+        target=_start_elixir_sense,
+        args=(future, project_path, elixir_exec, mix_env, delay),
+    )
+    starter.daemon = True
+    starter.start()
+    _start_monitor()
+    return future
+
+
+def _start_elixir_sense(future, project_path, elixir_exec, mix_env, delay):
+    time.sleep(delay)
+    try:
+        sense = ElixirSense(
+            project_path,
+            elixir_exec=elixir_exec,
+            mix_env=mix_env,
+        )
+    except Exception as e:
+        print("elixir_sense for {} failed to start: {}".format(
+            project_path, e
+        ))
+        with _startups_lock:
+            _failures[project_path] = _failures.get(project_path, 0) + 1
+        future.set_exception(e)
+    else:
+        # used from when it is ready, or the time it took to start would
+        # make it the least recently used
+        sense.last_used = time.time()
+        with _startups_lock:
+            stopped = STARTUPS.get(project_path, (None, 0))[0] is not future
+            if not stopped:
+                SERVERS[project_path] = sense
+        if stopped:
+            print('elixir_sense for {} was stopped while starting'.format(
+                project_path
+            ))
+            sense.close()
+            future.set_exception(StartupCancelled(project_path))
+            return
+        future.set_result(sense)
+        plugin_settings = settings.get_plugin_settings()
+        _evict(plugin_settings.get('max_servers', 3), 0)
+
+
+def _start_monitor():
+    global _monitor
+    if _monitor is None:
+        _monitor = threading.Thread(target=_monitor_servers)
+        _monitor.daemon = True
+        _monitor.start()
+
+
+def _monitor_servers():
+    while True:
+        time.sleep(CHECK_INTERVAL)
+        try:
+            check_servers()
+        except Exception:
+            traceback.print_exc()
+
+
+def _reap(proc, timeout=5):
+    try:
+        proc.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
 
 
 class ElixirSense:
@@ -71,6 +252,12 @@ class ElixirSense:
         self.project_path = project_path
         self.elixir_exec = elixir_exec
         self.mix_env = mix_env
+        self.started_at = time.time()
+        self.last_used = self.started_at
+        # bytes used by the server's BEAM, as of the last ping
+        self.memory = 0
+        # last lines of the server's output
+        self.log = deque(maxlen=LOG_SIZE)
         self._start_process()
 
     def _start_process(self):
@@ -82,47 +269,282 @@ class ElixirSense:
             stderr=subprocess.PIPE,
             cwd=self.project_path,
         )
+        self._drain(self._proc.stderr, 'stderr')
 
         # connect socket
         first_line = self._proc.stdout.readline()
         match = SOCKET_RE.match(first_line)
         if not match:
-            raise RuntimeError("Can't find the socket to talk to elixir_sense")
+            if self._proc.poll() is None:
+                self._proc.terminate()
+            _reap(self._proc)
+            raise RuntimeError(
+                "Can't find the socket to talk to elixir_sense\n" +
+                '\n'.join(list(self.log)[-20:])
+            )
+        self._drain(self._proc.stdout, 'stdout')
 
         socket_path = match.groupdict()['socket']
         self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
         self._socket.connect(socket_path)
         print(socket_path)
         self._request_n = 0
-
-    def _send_request(self, request, **kwargs):
-        self._request_n += 1
-        request = {
-            'request_id': self._request_n,
+        self._pending = {}
+        self._documents = {}
+        self._recv_buffer = bytearray(RECV_BUFFER_SIZE)
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._reader = threading.Thread(target=self._read_responses)
+        self._reader.daemon = True
+        self._reader.start()
+
+    def _drain(self, stream, name):
+        """
+        Reads `stream` into `log` on a thread, so the server never blocks
+        on a full pipe, and counts the errors it reports
+        """
+        def drain():
+            for line in iter(stream.readline, b''):
+                line = line.decode('utf-8', 'replace').rstrip()
+                self.log.append('{} [{}] {}'.format(
+                    time.strftime('%H:%M:%S'), name, line
+                ))
+                if name == 'stderr' and ERROR_RE.match(line):
+                    METRICS.add('elixir_sense', 'errors')
+            stream.close()
+
+        reader = threading.Thread(target=drain)
+        reader.daemon = True
+        reader.start()
+
+    def _recv_into(self, length):
+        """
+        Reads exactly `length` bytes into the receive buffer and returns a
+        view of them, the buffer grows to the largest frame received
+        """
+        if len(self._recv_buffer) < length:
+            self._recv_buffer = bytearray(
+                max(length, 2 * len(self._recv_buffer))
+            )
+        view = memoryview(self._recv_buffer)[:length]
+        received = 0
+        while received < length:
+            n = self._socket.recv_into(view[received:], length - received)
+            if not n:
+                raise IOError('elixir_sense closed the connection')
+            received += n
+        return view
+
+    def _recv_frame(self):
+        """Reads a `{packet, 4}` frame, returns a view of its payload"""
+        (length,) = struct.unpack_from('!I', self._recv_into(4))
+        return self._recv_into(length)
+
+    def _read_responses(self):
+        """Resolves the pending futures as the responses arrive"""
+        try:
+            while True:
+                frame = self._recv_frame()
+                try:
+                    data = erlang.binary_to_term(frame, native=True)
+                except (erlang.ParseException, UnicodeDecodeError) as e:
+                    # frames are read whole, the next one is still readable
+                    self._fail_frame(frame, e)
+                    continue
+                with self._lock:
+                    future = self._pending.pop(data.get('request_id'), None)
+                if future is None:
+                    print('Unexpected response from elixir_sense', data)
+                elif data.get('error'):
+                    METRICS.add('elixir_sense', 'error_responses')
+                    future.set_exception(IOError(data))
+                else:
+                    future.set_result(data.get('payload'))
+        except Exception as e:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            for future in pending.values():
+                future.set_exception(IOError(e))
+
+    def _fail_frame(self, frame, error):
+        """
+        Fails the request of a response that can't be decoded, when its id
+        can still be read with the binaries left undecoded
+        """
+        METRICS.add('elixir_sense', 'error_responses')
+        try:
+            data = erlang.binary_to_term(frame)
+        except erlang.ParseException:
+            data = {}
+        request_id = None
+        for key, value in data.items():
+            # atom keys aren't decoded either
+            if getattr(key, 'value', None) in (b'request_id', 'request_id'):
+                request_id = value
+        with self._lock:
+            future = self._pending.pop(request_id, None)
+        if future is None:
+            print('Undecodable response from elixir_sense:', error)
+        else:
+            future.set_exception(IOError(error))
+
+    def send_request_async(self, request, callback=None, **kwargs):
+        """
+        Sends a request without waiting for its response.
+
+        Returns a `Future` with the response payload, `callback` is called
+        with that future once it is resolved.
+        """
+        future = Future()
+        if callback is not None:
+            future.add_done_callback(callback)
+
+        self.last_used = time.time()
+        with self._lock:
+            self._request_n += 1
+            request_id = future.request_id = self._request_n
+            self._pending[request_id] = future
+
+        # the term is encoded after room for its length header, so the
+        # whole frame goes out with one `sendall` and no extra copy
+        frame = erlang.term_to_binary({
+            'request_id': request_id,
             'auth_token': None,
             'request': request,
             'payload': kwargs
-        }
-
-        payload = erlang.term_to_binary(request)
-        header = struct.pack('!I', len(payload))
-        self._socket.send(header + payload)
-
-        header = self._socket.recv(4)
-        if header:
-            (length,) = struct.unpack('!I', header)
-            response = self._socket.recv(length)
-            data = decode_term(erlang.binary_to_term(response))
-            if data.get('error'):
-                raise IOError(data)
-            else:
-                return data.get('payload')
+        }, buffer=bytearray(4))
+        struct.pack_into('!I', frame, 0, len(frame) - 4)
+        try:
+            with self._send_lock:
+                self._socket.sendall(frame)
+        except (IOError, OSError) as e:
+            with self._lock:
+                self._pending.pop(request_id, None)
+            future.set_exception(e)
+        return future
+
+    def _send_request(self, request, **kwargs):
+        future = self.send_request_async(request, **kwargs)
+        try:
+            return future.result(timeout=REQUEST_TIMEOUT)
+        except TimeoutError:
+            self._forget_request(future)
+            raise
+
+    def _forget_request(self, future):
+        """Stops waiting for a response, a late one is dropped as unexpected"""
+        with self._lock:
+            self._pending.pop(future.request_id, None)
+
+    def document_version(self, file_id):
+        """Version of the document as the server has it, if it is opened"""
+        return self._documents.get(file_id)
+
+    def open_document(self, file_id, version, buffer):
+        self._documents[file_id] = version
+        self.send_request_async(
+            'open',
+            callback=partial(self._check_document, file_id),
+            file_id=file_id,
+            version=version,
+            buffer=buffer,
+        )
+
+    def change_document(self, file_id, previous_version, version, changes):
+        """
+        Applies text edits, made from `previous_version` to `version`, to an
+        opened document.
+
+        Each change is a dict with the new `text` and the `start` and `end`
+        of the replaced range as zero-based `[line, column]` lists. Returns
+        `False` when the server's document misses edits made before these,
+        it must then be opened again.
+        """
+        opened_version = self._documents.get(file_id)
+        # not opened, or opened again with the changes already in it
+        if opened_version is None or version <= opened_version:
+            return True
+        if previous_version != opened_version:
+            return False
+
+        self._documents[file_id] = version
+        self.send_request_async(
+            'change',
+            callback=partial(self._check_document, file_id),
+            file_id=file_id,
+            previous_version=previous_version,
+            version=version,
+            changes=changes,
+        )
+        return True
+
+    def close_document(self, file_id):
+        if self._documents.pop(file_id, None) is not None:
+            self.send_request_async('close', file_id=file_id)
+
+    def _check_document(self, file_id, future):
+        if future.exception() is not None:
+            # out of sync, it will be opened again on the next request
+            self._documents.pop(file_id, None)
+
+    def _buffer_payload(self, buffer):
+        """
+        `buffer` is either the whole text or a `(file_id, version)` reference
+        to an opened document.
+        """
+        if isinstance(buffer, tuple):
+            file_id, version = buffer
+            return {'file_id': file_id, 'version': version}
+        return {'buffer': buffer}
+
+    def is_alive(self):
+        return self._proc.poll() is None and self._reader.is_alive()
+
+    def ping(self):
+        """Checks the server answers, and updates its `memory`"""
+        if not self.is_alive():
+            return False
+        last_used = self.last_used
+        future = self.send_request_async('version')
+        ping_time = self.last_used
+        try:
+            version = future.result(timeout=PING_TIMEOUT)
+        except TimeoutError:
+            self._forget_request(future)
+            return False
+        except Exception:
+            return False
+        finally:
+            # pings don't count as use, unlike the requests sent meanwhile
+            if self.last_used == ping_time:
+                self.last_used = last_used
+        self.memory = version.get('memory', 0)
+        return True
+
+    def idle_time(self):
+        return time.time() - self.last_used
+
+    def uptime(self):
+        return time.time() - self.started_at
+
+    def close(self):
+        """Stops the server, killing it if it did not exit after a while"""
+        socket_ = getattr(self, '_socket', None)
+        if socket_ is not None:
+            socket_.close()
+        proc = getattr(self, '_proc', None)
+        if proc is None or proc.poll() is not None:
+            return
+        proc.terminate()
+        reaper = threading.Thread(target=_reap, args=(proc,))
+        reaper.daemon = True
+        reaper.start()
 
     def __del__(self):
-        print('Cleaning up Elixir')
-        if hasattr(self, '_socket'):
-            self._socket.close()
-        self._proc.terminate()
+        proc = getattr(self, '_proc', None)
+        if proc is not None and proc.poll() is None:
+            print('Cleaning up Elixir')
+            self.close()
 
     @property
     def all_modules(self):
@@ -131,41 +553,61 @@ class ElixirSense:
     def signature(self, buffer, line, column):
         return self._send_request(
             'signature',
-            buffer=buffer,
             line=line,
             column=column,
+            **self._buffer_payload(buffer)
         )
 
     def docs(self, buffer, line, column):
         return self._send_request(
             'docs',
-            buffer=buffer,
             line=line,
             column=column,
+            **self._buffer_payload(buffer)
         )
 
     def definition(self, buffer, line, column):
         return self._send_request(
             'definition',
-            buffer=buffer,
             line=line,
             column=column,
+            **self._buffer_payload(buffer)
         )
 
-    def suggestions(self, buffer, line, column):
+    def suggestions(self, buffer, line, column, max_results=None,
+                    ranking='relevance'):
+        """
+        Returns the list of suggestions. With `max_results` returns a dict
+        with the hint and the best `max_results` other `suggestions`, and
+        whether some were `truncated`.
+        """
+        payload = self._buffer_payload(buffer)
+        if max_results is not None:
+            payload.update(max_results=max_results, ranking=ranking)
         return self._send_request(
             'suggestions',
-            buffer=buffer,
             line=line,
             column=column,
+            **payload
         )
 
     def expand_full(self, buffer, selected_code, line):
         return self._send_request(
             'expand_full',
-            buffer=buffer,
             selected_code=selected_code,
             line=line,
+            **self._buffer_payload(buffer)
+        )
+
+    def diagnostics(self, buffer, file):
+        """
+        Errors and warnings of compiling `buffer` as `file`, as dicts with
+        `file`, `line`, `column`, `severity` and `message`
+        """
+        return self._send_request(
+            'diagnostics',
+            file=file,
+            **self._buffer_payload(buffer)
         )
 
     def quote(self, code):
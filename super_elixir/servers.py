@@ -0,0 +1,61 @@
+import sublime
+import sublime_plugin
+
+from .sense_client import SERVERS, find_elixir_sense
+
+
+PANEL_NAME = 'super_elixir_servers'
+LOG_PANEL_NAME = 'super_elixir_server_log'
+
+
+def format_duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return '%dh %02dm' % (hours, minutes)
+    return '%dm %02ds' % (minutes, seconds)
+
+
+def servers_report():
+    """Memory, uptime and idle time of the running servers, pings them"""
+    lines = []
+    for project_path, sense in sorted(
+            SERVERS.items(), key=lambda item: item[0] or ''):
+        sense.ping()
+        lines.append(project_path or '(no mix project)')
+        lines.append('    memory  %.1f MB' % (sense.memory / 1024 / 1024))
+        lines.append('    uptime  ' + format_duration(sense.uptime()))
+        lines.append('    idle    ' + format_duration(sense.idle_time()))
+    return '\n'.join(lines) or 'No elixir_sense running'
+
+
+class SuperElixirListServers(sublime_plugin.WindowCommand):
+
+    def run(self):
+        sublime.set_timeout_async(self._show_servers, 0)
+
+    def _show_servers(self):
+        panel = self.window.create_output_panel(PANEL_NAME)
+        panel.run_command('append', {'characters': servers_report() + '\n'})
+        self.window.run_command('show_panel', {
+            'panel': 'output.' + PANEL_NAME
+        })
+
+
+class SuperElixirShowServerLog(sublime_plugin.WindowCommand):
+    """Shows the last lines the elixir_sense of the project wrote"""
+
+    def run(self):
+        view = self.window.active_view()
+        sense = view and find_elixir_sense(view)
+        if sense is None:
+            sublime.status_message('elixir_sense is not running')
+            return
+
+        panel = self.window.create_output_panel(LOG_PANEL_NAME)
+        panel.run_command('append', {
+            'characters': '\n'.join(sense.log) + '\n'
+        })
+        self.window.run_command('show_panel', {
+            'panel': 'output.' + LOG_PANEL_NAME
+        })
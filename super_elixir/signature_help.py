@@ -0,0 +1,266 @@
+import html
+import re
+from collections import OrderedDict
+from functools import partial
+
+import sublime
+import sublime_plugin
+
+from .background import query_sense
+from .documents import get_document_line_column
+from .metrics import METRICS
+from .settings import get_settings_param
+from .utils import is_elixir
+
+
+SIGNATURE_HELP_DELAY = 150
+CALL_SITES_SIZE = 16
+# characters looked back for the call the cursor is in
+SCAN_LIMIT = 2000
+
+CALLEE_RE = re.compile(r'[\w.:?!]+$')
+# text whose brackets and commas are not code
+QUOTED_SELECTOR = 'string, comment'
+
+
+def find_call_site(text, quoted=None):
+    """
+    Finds the innermost call open at the end of `text`.
+
+    Returns the offset of its opening parenthesis, the callee and how many
+    of its arguments are before the end of `text`, or `None`. The brackets
+    and commas at the offsets where `quoted(offset)` is true are skipped.
+    """
+    depth = 0
+    commas = 0
+    for i in range(len(text) - 1, -1, -1):
+        char = text[i]
+        if char not in '()[]{},':
+            continue
+        if quoted is not None and quoted(i):
+            continue
+        if char in ')]}':
+            depth += 1
+        elif char in '([{':
+            if depth > 0:
+                depth -= 1
+            elif char == '(':
+                callee = CALLEE_RE.search(text, 0, i)
+                if callee is None:
+                    return None
+                return i, callee.group(), commas
+            else:
+                # inside a list, tuple or map that is an argument
+                commas = 0
+        elif char == ',' and depth == 0:
+            commas += 1
+    return None
+
+
+class CallSites:
+    """
+    Signatures by call site: the view, where the parenthesis of the call is
+    and its callee. Moving through the arguments of a call only moves the
+    active parameter, so needs no request, but an edit out of them drops
+    the signatures of the view.
+    """
+
+    def __init__(self, size=CALL_SITES_SIZE):
+        self.size = size
+        self._signatures = OrderedDict()
+
+    def get(self, key):
+        signatures = self._signatures.get(key)
+        if signatures is not None:
+            self._signatures.move_to_end(key)
+        return signatures
+
+    def put(self, key, signatures):
+        self._signatures[key] = signatures
+        if len(self._signatures) > self.size:
+            self._signatures.popitem(last=False)
+
+    def has_view(self, view_id):
+        return any(key[0] == view_id for key in self._signatures)
+
+    def forget_view(self, view_id, keep=None):
+        """Drops the signatures of a view, but the ones of call site `keep`"""
+        for key in [
+                key for key in self._signatures
+                if key[0] == view_id and key[1:] != keep]:
+            del self._signatures[key]
+
+
+CALL_SITES = CallSites()
+
+
+def render_signatures(signatures, active_param):
+    rows = []
+    for signature in signatures['signatures']:
+        if signature['params'] and len(signature['params']) <= active_param:
+            continue
+        params = [
+            '<b>%s</b>' % html.escape(param) if i == active_param
+            else html.escape(param)
+            for i, param in enumerate(signature['params'])
+        ]
+        rows.append('<div>%s(%s)</div>' % (
+            html.escape(signature['name']), ', '.join(params)
+        ))
+
+    if not rows:
+        return None
+
+    documentation = signatures['signatures'][0].get('documentation')
+    if documentation:
+        rows.append('<div>%s</div>' % html.escape(documentation))
+    return ''.join(rows)
+
+
+class SignatureHelp(sublime_plugin.EventListener):
+    """
+    Shows the signatures of the call the cursor is in once `(` or `,` are
+    typed, and moves the active parameter as the cursor moves through its
+    arguments.
+
+    Requests wait for typing to pause and are dropped when the cursor left
+    the call meanwhile. They are not sent while completions are shown.
+    """
+
+    # view id -> token of the request waiting for typing to pause
+    _pending = {}
+    # view id -> (call site, signatures) of the popup shown
+    _shown = {}
+
+    def on_modified(self, view):
+        if not view.sel() or not is_elixir(view):
+            return
+
+        # an edit out of the arguments of a call can move it or change what
+        # its callee is
+        if CALL_SITES.has_view(view.id()):
+            call_site = self._call_site(view)
+            CALL_SITES.forget_view(view.id(), keep=call_site and call_site[0])
+
+        cursor = view.sel()[0].b
+        if view.substr(cursor - 1) not in ('(', ','):
+            return
+        if view.match_selector(cursor - 1, QUOTED_SELECTOR):
+            return
+        if not get_settings_param(view, 'signature_help', True):
+            return
+
+        token = object()
+        self._pending[view.id()] = token
+        sublime.set_timeout(
+            partial(self._request, view, cursor, token),
+            get_settings_param(
+                view, 'signature_help_delay', SIGNATURE_HELP_DELAY
+            )
+        )
+
+    def on_selection_modified(self, view):
+        shown = self._shown.get(view.id())
+        if shown is None:
+            return
+
+        if not view.is_popup_visible():
+            del self._shown[view.id()]
+            return
+
+        # the popup follows the edits of the arguments of its call
+        site, signatures = shown
+        call_site = self._call_site(view)
+        if call_site is None or call_site[0] != site:
+            view.hide_popup()
+            return
+
+        self._show(view, signatures, call_site[1])
+
+    def on_close(self, view):
+        self._pending.pop(view.id(), None)
+        self._shown.pop(view.id(), None)
+        CALL_SITES.forget_view(view.id())
+
+    def _request(self, view, cursor, token):
+        if self._pending.get(view.id()) is not token:
+            METRICS.add('signature', 'cancelled')
+            return
+        del self._pending[view.id()]
+
+        if (not view.sel() or view.sel()[0].b != cursor or
+                view.is_auto_complete_visible()):
+            METRICS.add('signature', 'cancelled')
+            return
+
+        call_site = self._call_site(view)
+        if call_site is None:
+            return
+
+        site, commas = call_site
+        key = (view.id(),) + site
+        signatures = CALL_SITES.get(key)
+        if signatures is not None:
+            self._show(view, signatures, commas)
+            return
+
+        buffer, line, column = get_document_line_column(view, cursor)
+
+        def show(signatures):
+            current = self._call_site(view)
+            if current is None or current[0] != site:
+                METRICS.add('signature', 'dropped')
+                return
+            if not signatures or signatures == 'none':
+                return
+            signatures['commas'] = commas
+            CALL_SITES.put(key, signatures)
+            self._show(view, signatures, current[1])
+
+        query_sense(
+            view, 'signature',
+            lambda sense: sense.signature(buffer, line, column),
+            show,
+        )
+
+    def _call_site(self, view):
+        """
+        The call site the cursor is in, as the offset of its parenthesis and
+        its callee, and the commas before the cursor
+        """
+        if not view.sel():
+            return None
+
+        cursor = view.sel()[0].b
+        start = max(0, cursor - SCAN_LIMIT)
+        call_site = find_call_site(
+            view.substr(sublime.Region(start, cursor)),
+            lambda i: view.match_selector(start + i, QUOTED_SELECTOR),
+        )
+        if call_site is None:
+            return None
+
+        offset, callee, commas = call_site
+        return (start + offset, callee), commas
+
+    def _show(self, view, signatures, commas):
+        active_param = signatures['active_param'] + commas - (
+            signatures['commas']
+        )
+        popup = render_signatures(signatures, active_param)
+        if popup is None:
+            view.hide_popup()
+            return
+
+        site = self._call_site(view)[0]
+        shown = self._shown.get(view.id())
+        if view.is_popup_visible() and shown and shown[0] == site:
+            view.update_popup(popup)
+        else:
+            view.show_popup(
+                popup,
+                flags=sublime.HIDE_ON_MOUSE_MOVE_AWAY,
+                location=view.sel()[0].b,
+                max_width=1024,
+            )
+        self._shown[view.id()] = (site, signatures)
@@ -166,6 +166,8 @@ class BaseLookUpJediCommand(ElixirCommandMixin):
 
     def go_to_definition(self, definition):
         print('GOTO', definition)
+        if not definition:
+            return
         file_name, def_line = definition.rsplit(':', 1)
         if file_name != 'non_existing':
             def_line = int(def_line)
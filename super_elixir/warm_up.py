@@ -0,0 +1,50 @@
+from functools import partial
+
+import sublime
+import sublime_plugin
+
+from .sense_client import StartupCancelled, start_elixir_sense
+from .utils import is_elixir
+
+
+STATUS_KEY = 'super_elixir'
+
+
+def plugin_loaded():
+    for window in sublime.windows():
+        for view in window.views():
+            warm_up_elixir_sense(view)
+
+
+def warm_up_elixir_sense(view):
+    """Starts the elixir_sense of the view's project before it is needed"""
+    if not is_elixir(view):
+        return
+
+    future = start_elixir_sense(view)
+    if future is None:
+        return
+
+    if future.done():
+        _show_status(view, future)
+    else:
+        view.set_status(STATUS_KEY, 'elixir_sense: starting...')
+        future.add_done_callback(
+            lambda future: sublime.set_timeout(
+                partial(_show_status, view, future), 0
+            )
+        )
+
+
+def _show_status(view, future):
+    if future.exception() is None or \
+            isinstance(future.exception(), StartupCancelled):
+        view.erase_status(STATUS_KEY)
+    else:
+        view.set_status(STATUS_KEY, 'elixir_sense: failed to start')
+
+
+class ElixirSenseWarmUp(sublime_plugin.EventListener):
+
+    def on_activated(self, view):
+        warm_up_elixir_sense(view)
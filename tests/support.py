@@ -0,0 +1,49 @@
+"""
+Makes `super_elixir` importable outside of Sublime Text.
+
+The `sublime` and `sublime_plugin` modules only exist inside the editor,
+when they are missing, stand-ins with what the plugin uses at import time
+are installed. Tests give the plugin fake views for the rest.
+"""
+import os
+import sys
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+try:
+    import sublime  # noqa
+    import sublime_plugin  # noqa
+except ImportError:
+    sublime = types.ModuleType('sublime')
+    for name in (
+            'INHIBIT_WORD_COMPLETIONS', 'INHIBIT_EXPLICIT_COMPLETIONS',
+            'HOVER_TEXT', 'HIDE_ON_MOUSE_MOVE_AWAY', 'ENCODED_POSITION',
+            'TRANSIENT'):
+        setattr(sublime, name, 0)
+
+    class Region:
+        def __init__(self, a, b=None):
+            self.a = a
+            self.b = a if b is None else b
+
+        def begin(self):
+            return min(self.a, self.b)
+
+        def end(self):
+            return max(self.a, self.b)
+
+    sublime.Region = Region
+    sublime.load_settings = lambda name: {}
+    sublime.set_timeout = lambda callback, delay=0: callback()
+    sublime.set_timeout_async = sublime.set_timeout
+    sublime.status_message = lambda message: None
+    sublime.windows = lambda: []
+    sys.modules['sublime'] = sublime
+
+    sublime_plugin = types.ModuleType('sublime_plugin')
+    for name in ('EventListener', 'TextCommand', 'WindowCommand'):
+        setattr(sublime_plugin, name, type(name, (object,), {}))
+    sys.modules['sublime_plugin'] = sublime_plugin
@@ -0,0 +1,106 @@
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+
+import support  # noqa
+
+from super_elixir.module_index import beam_module, beam_source, \
+    source_modules
+
+
+def chunk(name, data):
+    """A `.beam` chunk, padded to 4 bytes"""
+    padding = b'\0' * (-len(data) % 4)
+    return name + struct.pack('>I', len(data)) + data + padding
+
+
+def atom(name, utf8=True):
+    name = name.encode('utf-8')
+    if utf8:
+        return bytes([119, len(name)]) + name  # SMALL_ATOM_UTF8_EXT
+    return bytes([100]) + struct.pack('>H', len(name)) + name  # ATOM_EXT
+
+
+def compile_info(source, utf8_atoms=True):
+    """The `CInf` term `[{options, []}, {source, Source}]`"""
+    if all(ord(char) < 256 for char in source):
+        # STRING_EXT, a charlist of latin-1 characters
+        charlist = bytes([107]) + struct.pack('>H', len(source)) + \
+            source.encode('latin-1')
+    else:
+        # LIST_EXT of INTEGER_EXT code points
+        charlist = bytes([108]) + struct.pack('>I', len(source)) + b''.join(
+            bytes([98]) + struct.pack('>i', ord(char)) for char in source
+        ) + bytes([106])
+    return (
+        bytes([131, 108]) + struct.pack('>I', 2) +
+        bytes([104, 2]) + atom('options', utf8_atoms) + bytes([106]) +
+        bytes([104, 2]) + atom('source', utf8_atoms) + charlist +
+        bytes([106])
+    )
+
+
+class BeamSourceTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+
+    def beam(self, chunks, name='Elixir.App.User.beam'):
+        data = b'BEAM' + b''.join(chunks)
+        path = os.path.join(self.dir, name)
+        with open(path, 'wb') as f:
+            f.write(b'FOR1' + struct.pack('>I', len(data)) + data)
+        return path
+
+    def test_reads_the_source_of_the_compile_info(self):
+        path = self.beam([
+            # a chunk before, whose size needs padding
+            chunk(b'AtU8', b'\0\0\0\1\4User'),
+            chunk(b'CInf', compile_info('/app/lib/user.ex')),
+        ])
+        self.assertEqual(beam_source(path), '/app/lib/user.ex')
+
+    def test_reads_latin1_atoms_and_unicode_sources(self):
+        info = compile_info('/app/lib/ü/€.ex', utf8_atoms=False)
+        path = self.beam([chunk(b'CInf', info)])
+        self.assertEqual(beam_source(path), '/app/lib/ü/€.ex')
+
+    def test_without_compile_info(self):
+        path = self.beam([chunk(b'AtU8', b'\0\0\0\0')])
+        self.assertIsNone(beam_source(path))
+
+    def test_module_names(self):
+        self.assertEqual(beam_module('/ebin/Elixir.App.User.beam'), 'App.User')
+        self.assertEqual(beam_module('/ebin/lists.beam'), ':lists')
+
+
+class SourceModulesTest(unittest.TestCase):
+
+    def test_skips_heredocs_and_names_implementations(self):
+        with tempfile.NamedTemporaryFile(
+                'w', suffix='.ex', delete=False) as f:
+            f.write(
+                'defmodule App.User do\n'
+                '  @moduledoc """\n'
+                '      defmodule Example do\n'
+                '  """\n'
+                '  defimpl String.Chars do\n'
+                '  end\n'
+                'end\n'
+                'defimpl Inspect, for: [App.User, App.Admin] do\n'
+                'end\n'
+            )
+        self.addCleanup(os.remove, f.name)
+        self.assertEqual(source_modules(f.name), [
+            ['App.User', 1],
+            ['String.Chars.App.User', 5],
+            ['Inspect.App.User', 8],
+            ['Inspect.App.Admin', 8],
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import socket
+import threading
+import unittest
+from concurrent.futures import Future
+from unittest import mock
+
+import support  # noqa
+
+from super_elixir import sense_client
+from super_elixir.sense_client import ElixirSense, StartupCancelled
+
+
+def unstarted_sense():
+    """An `ElixirSense` talking to a socket nobody answers on"""
+    sense = ElixirSense.__new__(ElixirSense)
+    sense._socket, peer = socket.socketpair()
+    sense._request_n = 0
+    sense._pending = {}
+    sense._lock = threading.Lock()
+    sense._send_lock = threading.Lock()
+    sense.last_used = 0
+    return sense, peer
+
+
+class PingTest(unittest.TestCase):
+
+    def test_forgets_the_request_when_it_times_out(self):
+        sense, peer = unstarted_sense()
+        self.addCleanup(sense._socket.close)
+        self.addCleanup(peer.close)
+        with mock.patch.object(sense_client, 'PING_TIMEOUT', 0.01), \
+                mock.patch.object(ElixirSense, 'is_alive', lambda self: True):
+            self.assertFalse(sense.ping())
+        self.assertEqual(sense._pending, {})
+        self.assertEqual(sense.last_used, 0)
+
+
+class StartTest(unittest.TestCase):
+
+    def test_a_server_stopped_while_starting_is_closed(self):
+        project_path = '/project'
+        started = []
+
+        class Sense:
+            def __init__(self, project_path, **kwargs):
+                # stopped during the boot
+                sense_client.stop_elixir_sense(project_path)
+                started.append(self)
+                self.closed = False
+
+            def close(self):
+                self.closed = True
+
+        future = Future()
+        sense_client.STARTUPS[project_path] = (future, 0)
+        with mock.patch.object(sense_client, 'ElixirSense', Sense):
+            sense_client._start_elixir_sense(
+                future, project_path, 'elixir', 'test', 0
+            )
+
+        self.assertNotIn(project_path, sense_client.SERVERS)
+        self.assertTrue(started[0].closed)
+        self.assertIsInstance(future.exception(), StartupCancelled)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+import unittest
+from unittest import mock
+
+import support  # noqa
+
+import sublime
+from super_elixir import signature_help
+from super_elixir.signature_help import CALL_SITES, SignatureHelp, \
+    find_call_site
+
+
+SIGNATURES = {
+    'active_param': 0,
+    'pipe_before': False,
+    'signatures': [{
+        'name': 'reduce',
+        'params': ['enumerable', 'acc', 'fun'],
+        'documentation': 'Reduces the enumerable',
+    }],
+}
+
+
+class FakeView:
+    """A view of `text` with the cursor at its end, typed into"""
+
+    def __init__(self, text, quoted=()):
+        self.text = text
+        self.cursor = len(text)
+        self.count = 0
+        self.quoted = set(quoted)
+        self.popup = None
+
+    def id(self):
+        return 1
+
+    def file_name(self):
+        return '/project/lib/a.ex'
+
+    def sel(self):
+        return [sublime.Region(self.cursor)]
+
+    def substr(self, x):
+        if isinstance(x, int):
+            return self.text[x:x + 1]
+        return self.text[x.a:x.b]
+
+    def change_count(self):
+        return self.count
+
+    def match_selector(self, point, selector):
+        return point in self.quoted
+
+    def type(self, text, at=None):
+        at = self.cursor if at is None else at
+        self.text = self.text[:at] + text + self.text[at:]
+        self.cursor = at + len(text)
+        self.count += 1
+
+    def is_auto_complete_visible(self):
+        return False
+
+    def is_popup_visible(self):
+        return self.popup is not None
+
+    def show_popup(self, popup, **kwargs):
+        self.popup = popup
+
+    def update_popup(self, popup):
+        self.popup = popup
+
+    def hide_popup(self):
+        self.popup = None
+
+
+class FindCallSiteTest(unittest.TestCase):
+
+    def test_counts_the_arguments_before_the_end(self):
+        self.assertEqual(
+            find_call_site('Enum.map(list, fn x -> {x, '),
+            (8, 'Enum.map', 1)
+        )
+
+    def test_skips_quoted_brackets_and_commas(self):
+        text = 'foo("a, (b", '
+        quoted = set(range(text.index('"'), text.rindex('"') + 1))
+        self.assertEqual(
+            find_call_site(text, quoted.__contains__), (3, 'foo', 1)
+        )
+
+
+class SignatureHelpTest(unittest.TestCase):
+
+    def setUp(self):
+        self.requests = []
+        patches = [
+            mock.patch.object(
+                signature_help, 'query_sense',
+                lambda view, kind, call, on_done: self.requests.append(
+                    on_done
+                )
+            ),
+            mock.patch.object(
+                signature_help, 'get_document_line_column',
+                lambda view, point: ('/project/lib/a.ex', 1, 1)
+            ),
+            mock.patch.object(
+                signature_help, 'get_settings_param',
+                lambda view, name, default=None: default
+            ),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.addCleanup(CALL_SITES.forget_view, 1)
+        self.listener = SignatureHelp()
+
+    def type(self, view, text, at=None):
+        view.type(text, at)
+        self.listener.on_modified(view)
+        self.listener.on_selection_modified(view)
+
+    def test_typing_the_arguments_of_a_call_sends_one_request(self):
+        view = FakeView('  Enum.reduce')
+        self.type(view, '(')
+        self.assertEqual(len(self.requests), 1)
+        self.requests[0](dict(SIGNATURES))
+
+        self.type(view, 'list,')
+        self.type(view, ' 0,')
+        self.assertEqual(len(self.requests), 1)
+        self.assertIn('<b>fun</b>', view.popup)
+
+    def test_an_edit_out_of_the_call_drops_its_signatures(self):
+        view = FakeView('  Enum.reduce')
+        self.type(view, '(')
+        self.requests[0](dict(SIGNATURES))
+
+        self.type(view, 'alias Foo\n', at=0)
+        view.cursor = len(view.text)
+        self.type(view, 'list,')
+        self.assertEqual(len(self.requests), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()